@@ -1,10 +1,28 @@
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 import pandas as pd
-import gspread
-from google.oauth2 import service_account
 from datetime import datetime, timedelta
-import numpy as np
-import re
+import functools
+import sqlite3
+import time
+
+from cities import ANALYSIS_DAYS, SHEET_IDS
+from city_comparison import CityComparison
+from city_reports import load_report
+from data_sources import local_source_path, open_source
+from fact_table import FACT_COLUMNS, PriceFactTable
+from instrumentation import count, current_run, export_metrics, record_stage, start_run, timed
+from memory_manager import compact_frame, memory_manager
+from price_matrix import ROLLING_DATES, PriceMatrix
+from price_normalizer import normalize_prices
+from price_sql import MAX_QUERY_ROWS, PriceSQLEngine
+from ranking import SlidingWindowAggregate, aggregate_hotel_prices, sheet_prices, top_hotels
+from schema_registry import SchemaRegistry, detect_columns
+from search_index import HotelSearchIndex
+from shared_cache import CLIENT_TTL, SHEET_DATA_TTL, SPREADSHEET_TTL, WORKSHEETS_TTL, shared_cache
+from sheet_catalog import WorksheetCatalog
+from sheets_api import BATCH_CHUNK_SIZE, api_calls, authorize
+from snapshot_store import SnapshotStore
 
 # Configuración de la página
 st.set_page_config(
@@ -14,18 +32,69 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Métricas y llamadas a la API de esta ejecución (propias de la sesión)
+start_run()
+
 # Título de la aplicación
 st.title("🏨 Sistema de Análisis de Precios de Hoteles")
 
-# IDs de las hojas de cálculo
-SHEET_IDS = {
-    "Mérida": "13tPaaJCX4o4HkxrRdPiuc5NDP3XhrJuvKdq83Eh7-KU",
-#    "Celaya": "1Q-3PabplfrLc5V4vLwbZc_t2qW7cpoygnQXHNLSD9XY",
-    "Tuxtla": "1Stux8hR4IlZ879gL7TRbz3uKzputDVwR362VINUr5Ho",
-#    "Mazatlan": "1-3vPaXamO4m6pNXIsPAO0ttrvnJmx9a9yAVhtY8_2Lk"
-}
+# Copia local (Parquet) de las hojas ya descargadas
+snapshot_store = SnapshotStore()
+
+# Estado de esta ejecución: orígenes de datos abiertos (spreadsheet o exportación local),
+# catálogos de hojas y hojas ya sincronizadas (se vacía en cada ejecución de un fragmento)
+spreadsheet_handles = {}
+sheet_properties = {}
+sheet_catalogs = {}
+ensured_sheets = set()
+
+# Tablas consolidadas ya actualizadas en esta ejecución ((spreadsheet_id, ventana))
+synced_fact_tables = set()
+
+# Rankings calculados en esta ejecución ((spreadsheet_id, ventana) -> DataFrame)
+hotel_rankings = {}
+
+# Matrices hoteles × fechas calculadas en esta ejecución ((spreadsheet_id, ventana) -> PriceMatrix)
+price_matrices = {}
+
+# Reportes precalculados vigentes en esta ejecución ((spreadsheet_id, ventana) -> CityReport o None)
+fresh_reports = {}
+
+RUN_STATE = (
+    spreadsheet_handles, sheet_properties, sheet_catalogs, ensured_sheets,
+    synced_fact_tables, hotel_rankings, price_matrices, fresh_reports
+)
+
+# Ventana de análisis por defecto
+DEFAULT_WINDOW = {'days': ANALYSIS_DAYS}
+
+# Consultas predefinidas del panel de consulta avanzada
+ADVANCED_QUERIES = ["Promedio por día de la semana", "Bandas de precio", "Comparar hoteles", "SQL libre"]
+
+# Consulta de ejemplo del panel (:desde y :hasta son las fechas del periodo elegido)
+ADVANCED_SQL_EXAMPLE = """SELECT ciudad, hotel, ROUND(AVG(precio), 2) AS promedio, COUNT(*) AS precios
+FROM precios
+WHERE fecha BETWEEN :desde AND :hasta
+GROUP BY ciudad, hotel
+ORDER BY promedio
+LIMIT 20"""
+
+# Hojas que la búsqueda descarga antes de mostrar el primer resultado (luego, en bloques)
+SEARCH_FIRST_CHUNK = 1
+
+# Intervalo mínimo (segundos) entre redibujos de los resultados parciales de la búsqueda
+SEARCH_REDRAW_SECONDS = 0.5
+
+# Nombre de la ciudad de un spreadsheet
+@timed()
+def city_name(spreadsheet_id):
+    for ciudad, sheet_id in SHEET_IDS.items():
+        if sheet_id == spreadsheet_id:
+            return ciudad
+    return spreadsheet_id
 
 # Configuración para acceso a Google Sheets usando Secrets
+@timed()
 def setup_gspread():
     try:
         if 'gcp_service_account' not in st.secrets:
@@ -45,288 +114,497 @@ def setup_gspread():
             "universe_domain": st.secrets["gcp_service_account"]["universe_domain"]
         }
         
-        creds = service_account.Credentials.from_service_account_info(
-            creds_info,
-            scopes=[
-                "https://www.googleapis.com/auth/spreadsheets",
-                "https://www.googleapis.com/auth/drive"
-            ]
-        )
-        return gspread.authorize(creds)
+        # Un solo cliente por cuenta de servicio para todas las sesiones
+        return shared_cache.get(('client', creds_info["client_email"]), lambda: authorize(creds_info), ttl=CLIENT_TTL)
     except Exception as e:
+        count('errores')
         st.error(f"Error de autenticación: {e}")
         return None
 
+# Abre el origen de datos de la ciudad: su exportación local si la hay o el spreadsheet
+# (abrir el spreadsheet cuenta como llamada a la API)
+@timed()
+def open_spreadsheet(client, spreadsheet_id):
+    return open_source(client, city_name(spreadsheet_id), spreadsheet_id)
+
+# Abre el origen de datos y arma el catálogo de hojas por fecha (una vez por ejecución;
+# el origen abierto y su lista de hojas se comparten entre sesiones)
+@timed()
+def sync_spreadsheet(client, spreadsheet_id):
+    if spreadsheet_id not in sheet_catalogs:
+        source = shared_cache.get(
+            ('spreadsheet', spreadsheet_id), lambda: open_spreadsheet(client, spreadsheet_id), ttl=SPREADSHEET_TTL
+        )
+        sheets = shared_cache.get(
+            ('worksheets', spreadsheet_id), lambda: source.list_sheets(), ttl=WORKSHEETS_TTL
+        )
+        spreadsheet_handles[spreadsheet_id] = source
+        sheet_properties[spreadsheet_id] = sheets
+        sheet_catalogs[spreadsheet_id] = WorksheetCatalog(snapshot_store.entries(spreadsheet_id, sheets))
+    return sheet_catalogs[spreadsheet_id]
+
+# Descarga a la copia local (si hace falta) solo las hojas indicadas
+@timed()
+def ensure_sheets(spreadsheet_id, entries):
+    pending = [entry for entry in entries if (spreadsheet_id, entry['title']) not in ensured_sheets]
+    if not pending:
+        return
+    
+    registry = get_schema_registry()
+    override = registry.override_for(spreadsheet_id)
+    # La hoja más reciente puede seguir editándose: se refresca cada cierto tiempo
+    latest = sheet_catalogs[spreadsheet_id].latest()
+    titles = [entry['title'] for entry in pending]
+    # Con esquema conocido solo se descargan las columnas de hotel y precio;
+    # si otra sesión ya está sincronizando las mismas hojas se espera su resultado
+    updated, failures = shared_cache.get(
+        ('sync', spreadsheet_id, tuple(titles), override),
+        lambda: snapshot_store.sync(
+            spreadsheet_handles[spreadsheet_id],
+            detect=lambda df: registry.resolve(df, detect_columns, spreadsheet_id),
+            sheets=sheet_properties[spreadsheet_id],
+            titles=titles,
+            volatile_titles=[latest['title']] if latest else [],
+            known_layout=lambda header: registry.lookup_header(header, spreadsheet_id),
+            override=override
+        ),
+        store=False
+    )
+    
+    by_id = {entry['sheet_id']: entry for entry in updated}
+    for entry in pending:
+        entry.update(by_id.get(entry['sheet_id'], {}))
+        ensured_sheets.add((spreadsheet_id, entry['title']))
+    
+    # Avisar qué hojas no se pudieron actualizar (se usa la copia previa si existe)
+    if failures:
+        st.warning(
+            f"⚠️ No se pudieron descargar {len(failures)} hojas: "
+            + ", ".join(sorted(failures))
+        )
+
+# Clave hashable de una ventana de análisis ({'days': n} o {'start': fecha, 'end': fecha})
+@timed()
+def window_key(window):
+    return tuple(sorted((window or DEFAULT_WINDOW).items()))
+
+# Texto de una ventana de análisis para la interfaz
+@timed()
+def describe_window(window):
+    window = window or DEFAULT_WINDOW
+    start, end = window.get('start'), window.get('end')
+    if start is None and end is None:
+        return f"los últimos {window.get('days') or ANALYSIS_DAYS} días"
+    return f"del {start or 'inicio'} al {end or 'último día'}"
+
+# Hojas (más recientes primero) dentro de la ventana, descargando solo esas
+@timed()
+def window_sheets(client, spreadsheet_id, window=None):
+    catalog = sync_spreadsheet(client, spreadsheet_id)
+    sheets = catalog.window(**(window or DEFAULT_WINDOW))
+    ensure_sheets(spreadsheet_id, [entry for entry, _ in sheets])
+    return sheets
+
+# Avisa de las hojas que no se pudieron procesar en un análisis
+@timed()
+def report_failed_sheets(failed_sheets):
+    if failed_sheets:
+        count('hojas_fallidas', len(failed_sheets))
+        st.warning(
+            f"⚠️ {len(failed_sheets)} hojas no se pudieron procesar: "
+            + ", ".join(f"{hoja} ({error})" for hoja, error in failed_sheets)
+        )
+
 # Función para obtener todas las hojas de un spreadsheet
+@timed()
 def get_all_sheets(spreadsheet_id, client):
     try:
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        worksheets = spreadsheet.worksheets()
-        return {f"{ws.title}": ws for ws in worksheets}
+        catalog = sync_spreadsheet(client, spreadsheet_id)
+        return {f"{entry['title']}": entry for entry in catalog.entries}
     except Exception as e:
+        count('errores')
         st.error(f"Error al acceder al spreadsheet: {e}")
         return None
 
-# Función para obtener datos de una hoja específica
-def get_sheet_data(worksheet):
+# Lee una hoja de la copia local para mostrarla, en formato compacto
+# (compartida entre sesiones mientras la copia no cambie; no modificar)
+@timed()
+def load_sheet_frame(spreadsheet_id, sheet_entry):
+    key = ('sheet', spreadsheet_id, sheet_entry.get('sheet_id'), sheet_entry.get('file'), sheet_entry.get('synced_at'))
+    return shared_cache.get(
+        key, lambda: compact_frame(snapshot_store.load(spreadsheet_id, sheet_entry)), ttl=SHEET_DATA_TTL
+    )
+
+# Función para obtener datos de una hoja específica (desde la copia local)
+@timed()
+def get_sheet_data(spreadsheet_id, sheet_entry, full=False):
     try:
-        data = worksheet.get_all_records()
-        if not data:
-            return pd.DataFrame()
-        df = pd.DataFrame(data)
-        return df
+        ensure_sheets(spreadsheet_id, [sheet_entry])
+        # La copia guarda solo hotel y precio: descargar la hoja completa para mostrarla
+        if full and sheet_entry.get('projected') and spreadsheet_id in spreadsheet_handles:
+            registry = get_schema_registry()
+            df, new_entry = snapshot_store.fetch_full(
+                spreadsheet_handles[spreadsheet_id], sheet_entry,
+                detect=lambda df: registry.resolve(df, detect_columns, spreadsheet_id),
+                override=registry.override_for(spreadsheet_id)
+            )
+            sheet_entry.update(new_entry)
+            return df
+        return load_sheet_frame(spreadsheet_id, sheet_entry)
     except Exception as e:
+        count('errores')
         st.error(f"Error al obtener datos: {e}")
         return None
 
-# Función para detectar automáticamente columnas relevantes
-def detect_columns(df):
-    # Buscar columna de hotel
-    hotel_keywords = ['hotel', 'nombre', 'name', 'establecimiento', 'property']
-    price_keywords = ['precio', 'price', 'costo', 'cost', 'valor', 'value', 'monto', 'amount', 'importe']
-    
-    hotel_col = None
-    price_col = None
-    
-    for col in df.columns:
-        col_lower = str(col).lower()
+# Registro de esquemas (huella del encabezado -> columnas) compartido entre ejecuciones
+@st.cache_resource
+@timed()
+def get_schema_registry():
+    return SchemaRegistry()
+
+# Columnas de hotel y precio: selección manual, las guardadas en la copia local o las del registro
+@timed()
+def sheet_columns(spreadsheet_id, sheet_entry, df):
+    return get_schema_registry().sheet_columns(spreadsheet_id, sheet_entry, df, detect_columns)
+
+# Tabla consolidada de precios compartida entre ejecuciones
+@st.cache_resource
+@timed()
+def get_fact_table():
+    return PriceFactTable()
+
+# Actualiza la tabla consolidada con las hojas locales del spreadsheet (una vez por ejecución y ventana)
+@timed()
+def sync_fact_table(client, spreadsheet_id, window=None):
+    fact_table = get_fact_table()
+    key = (spreadsheet_id, window_key(window))
+    if key not in synced_fact_tables:
+        window_sheets(client, spreadsheet_id, window)
+        catalog = sheet_catalogs[spreadsheet_id]
+        dated_sheets = [
+            (entry, catalog.date_of(entry['title'])) for entry in catalog.entries if entry.get('file')
+        ]
         
-        # Detectar columna de hotel
-        if not hotel_col and any(keyword in col_lower for keyword in hotel_keywords):
-            hotel_col = col
+        # Se lee directo de la copia local: la tabla guarda solo hotel y precio en formato compacto
+        def load(entry):
+            df = snapshot_store.load(spreadsheet_id, entry)
+            if df is None or df.empty:
+                return df, None, None
+            hotel_col, price_col = sheet_columns(spreadsheet_id, entry, df)
+            return df, hotel_col, price_col
         
-        # Detectar columna de precio
-        if not price_col and any(keyword in col_lower for keyword in price_keywords):
-            # Verificar si contiene valores numéricos
-            try:
-                numeric_test = pd.to_numeric(df[col].astype(str).str.replace(',', '.').str.replace('$', '').str.replace(' ', ''), errors='coerce')
-                if numeric_test.notna().sum() > 0:
-                    price_col = col
-            except:
-                continue
-    
-    # Si no se detecta por nombre, buscar la primera columna de texto para hotel
-    if not hotel_col:
-        for col in df.columns:
-            if df[col].dtype == 'object' and len(df[col].astype(str).str.strip().unique()) > 1:
-                hotel_col = col
-                break
+        ciudad = city_name(spreadsheet_id)
+        schema = get_schema_registry().override_for(spreadsheet_id)
+        report_failed_sheets(fact_table.sync_city(ciudad, dated_sheets, load, schema))
+        memory_manager.track(('ciudad', ciudad), fact_table.city_bytes(ciudad), lambda: fact_table.drop_city(ciudad))
+        synced_fact_tables.add(key)
+    memory_manager.touch(('ciudad', city_name(spreadsheet_id)))
+    return fact_table
+
+# Motor SQL con los precios de las ciudades ya cargadas, compartido entre ejecuciones
+# (cada consulta usa su propia conexión de lectura y tiene un límite de tiempo)
+@st.cache_resource
+@timed()
+def get_sql_engine():
+    return PriceSQLEngine()
+
+# Copia al motor SQL las filas de las ciudades indicadas (antes actualiza su tabla consolidada)
+@timed()
+def sync_sql_engine(client, ciudades, window=None):
+    fact_table = None
+    for ciudad in ciudades:
+        fact_table = sync_fact_table(client, SHEET_IDS[ciudad], window)
+    engine = get_sql_engine()
+    if fact_table is not None:
+        engine.sync(fact_table, ciudades)
+        memory_manager.track(('sql',), engine.nbytes, engine.clear)
+    return engine
+
+# Precios válidos (hotel, precio, hoja) de una hoja, compartidos entre sesiones
+# mientras no cambien la copia local ni las columnas elegidas manualmente
+@timed()
+def load_sheet_prices(spreadsheet_id, sheet_entry):
+    override = get_schema_registry().override_for(spreadsheet_id)
     
-    # Si no se detecta por nombre, buscar la primera columna numérica para precio
-    if not price_col:
-        numeric_cols = df.select_dtypes(include=[np.number]).columns
-        if len(numeric_cols) > 0:
-            price_col = numeric_cols[0]
+    def load():
+        df = snapshot_store.load(spreadsheet_id, sheet_entry)
+        if df is None or df.empty:
+            return pd.DataFrame(columns=['hotel', 'precio', 'hoja'])
+        hotel_col, price_col = sheet_columns(spreadsheet_id, sheet_entry, df)
+        if not (hotel_col and price_col):
+            return pd.DataFrame(columns=['hotel', 'precio', 'hoja'])
+        return compact_frame(sheet_prices(df, hotel_col, price_col, sheet_entry['title']))
     
-    return hotel_col, price_col
+    key = ('prices', spreadsheet_id, sheet_entry.get('sheet_id'), sheet_entry.get('file'),
+           sheet_entry.get('synced_at'), override)
+    return shared_cache.get(key, load, ttl=SHEET_DATA_TTL)
 
-# Función para buscar hotel en múltiples hojas
-def search_hotel_in_sheets(client, spreadsheet_id, hotel_name, max_sheets=30):
-    try:
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        worksheets = spreadsheet.worksheets()
-        
-        # Ordenar hojas por fecha (asumiendo que los nombres contienen fechas)
-        dated_sheets = []
-        for ws in worksheets:
-            sheet_name = ws.title.lower()
-            # Buscar patrones de fecha en el nombre de la hoja
-            date_patterns = [
-                r'\d{2}[-/]\d{2}[-/]\d{4}',  # DD-MM-YYYY
-                r'\d{4}[-/]\d{2}[-/]\d{2}',  # YYYY-MM-DD
-                r'\d{2}[-/]\d{2}[-/]\d{2}',  # DD-MM-YY
-            ]
-            
-            for pattern in date_patterns:
-                match = re.search(pattern, sheet_name)
-                if match:
-                    dated_sheets.append((ws, match.group()))
-                    break
+# Función para buscar hotel en múltiples hojas (progresiva: entrega los resultados
+# hoja por hoja a medida que llegan)
+@timed()
+def search_hotel_in_sheets(client, spreadsheet_id, hotel_name, window=None, exact=False, max_prices=None):
+    """
+    Revisa las hojas de la ventana de la más reciente a la más antigua y entrega
+    (filas encontradas en la hoja, hojas revisadas, total de hojas) por cada una.
+    Las hojas ya cargadas en la tabla consolidada se responden con su índice
+    hotel -> filas; las demás se leen de la copia local, la primera sola para
+    mostrar algo cuanto antes y el resto en bloques.
+    Con max_prices la búsqueda termina al juntar esa cantidad de precios.
+    """
+    catalog = sync_spreadsheet(client, spreadsheet_id)
+    sheets = catalog.window(**(window or DEFAULT_WINDOW))
+    ciudad = city_name(spreadsheet_id)
+    fact_table = get_fact_table()
+    schema = get_schema_registry().override_for(spreadsheet_id)
+    
+    # Nombres ya revisados y los que coinciden con la búsqueda
+    vistos = set()
+    coincidencias = {hotel_name} if exact else set()
+    
+    chunks = [sheets[:SEARCH_FIRST_CHUNK]] + [
+        sheets[i:i + BATCH_CHUNK_SIZE] for i in range(SEARCH_FIRST_CHUNK, len(sheets), BATCH_CHUNK_SIZE)
+    ]
+    encontrados = 0
+    revisadas = 0
+    hojas_fallidas = []
+    
+    for chunk in chunks:
+        ensure_sheets(spreadsheet_id, [entry for entry, _ in chunk])
+        indexadas = fact_table.loaded_sheets(ciudad, [entry for entry, _ in chunk], schema)
+        filas_indexadas = {}
+        if indexadas:
+            filas_indexadas = {
+                hoja: filas.reset_index(drop=True) for hoja, filas in
+                fact_table.lookup(hotel_name, ciudad, indexadas, exact).groupby('hoja', observed=True, sort=False)
+            }
+        for entry, fecha in chunk:
+            filas = pd.DataFrame(columns=FACT_COLUMNS)
+            if entry['title'] in indexadas:
+                filas = filas_indexadas.get(entry['title'], filas)
             else:
-                # Si no encuentra fecha, usar el nombre como está
-                dated_sheets.append((ws, sheet_name))
-        
-        # Ordenar por fecha (las más recientes primero)
-        dated_sheets.sort(key=lambda x: x[1], reverse=True)
-        
-        # Tomar las últimas max_sheets hojas
-        recent_sheets = dated_sheets[:max_sheets]
-        
-        resultados = []
-        precios_encontrados = 0
-        
-        for ws, date_str in recent_sheets:
-            try:
-                df = get_sheet_data(ws)
-                if df is not None and not df.empty:
-                    hotel_col, price_col = detect_columns(df)
-                    
-                    if hotel_col and price_col:
-                        # Buscar el hotel (búsqueda insensible a mayúsculas)
-                        mask = df[hotel_col].astype(str).str.lower().str.contains(hotel_name.lower(), na=False)
-                        hotel_data = df[mask]
-                        
-                        if not hotel_data.empty:
-                            for _, row in hotel_data.iterrows():
-                                try:
-                                    precio = pd.to_numeric(
-                                        str(row[price_col]).replace(',', '.').replace('$', '').replace(' ', ''),
-                                        errors='coerce'
-                                    )
-                                    
-                                    if not pd.isna(precio) and precio > 0:
-                                        resultados.append({
-                                            'hoja': ws.title,
-                                            'hotel': row[hotel_col],
-                                            'precio': precio,
-                                            'fecha_hoja': date_str
-                                        })
-                                        precios_encontrados += 1
-                                except:
-                                    continue
-            except:
-                continue
-        
-        return resultados, precios_encontrados
-        
-    except Exception as e:
-        st.error(f"Error en la búsqueda: {e}")
-        return [], 0
+                try:
+                    prices = load_sheet_prices(spreadsheet_id, entry)
+                    if not exact:
+                        nuevos = [name for name in prices['hotel'].unique() if name not in vistos]
+                        if nuevos:
+                            vistos.update(nuevos)
+                            coincidencias.update(HotelSearchIndex(nuevos).matches(hotel_name))
+                    filas = prices[prices['hotel'].isin(coincidencias)].assign(
+                        ciudad=ciudad, fecha_hoja=pd.Timestamp(fecha) if fecha else pd.NaT
+                    )[FACT_COLUMNS].reset_index(drop=True)
+                except Exception as e:
+                    hojas_fallidas.append((entry['title'], e))
+            
+            revisadas += 1
+            encontrados += len(filas)
+            yield filas, revisadas, len(sheets)
+            
+            if max_prices and encontrados >= max_prices:
+                report_failed_sheets(hojas_fallidas)
+                return
+    
+    report_failed_sheets(hojas_fallidas)
 
 # Función para calcular métricas de los resultados
-def calculate_hotel_metrics(resultados):
-    if not resultados:
+@timed()
+def calculate_hotel_metrics(resultados, ranking=None):
+    """
+    Con el ranking de la ventana, las métricas se combinan de los resúmenes
+    de los hoteles encontrados en lugar de recorrer sus precios
+    """
+    if resultados is None or resultados.empty:
         return None
     
-    precios = [r['precio'] for r in resultados if r['precio'] > 0]
+    metrics = {
+        'total_hojas_revisadas': resultados['hoja'].nunique(),
+        'primer_hoja': resultados['hoja'].iloc[0],
+        'ultima_hoja': resultados['hoja'].iloc[-1]
+    }
     
-    if not precios:
+    if ranking is not None:
+        hoteles = ranking[ranking['hotel'].isin(resultados['hotel'].astype(str).unique())]
+        if not hoteles.empty:
+            muestras = hoteles['muestras'].sum()
+            suma = (hoteles['precio_promedio'] * hoteles['muestras']).sum()
+            return {
+                **metrics,
+                'total_precios_encontrados': int(muestras),
+                'precio_minimo': hoteles['precio_min'].min(),
+                'precio_maximo': hoteles['precio_max'].max(),
+                'suma_total': suma,
+                'promedio': suma / muestras
+            }
+    
+    precios = resultados.loc[resultados['precio'] > 0, 'precio'].astype('float64')
+    
+    if precios.empty:
         return None
     
     return {
-        'total_hojas_revisadas': len(set(r['hoja'] for r in resultados)),
+        **metrics,
         'total_precios_encontrados': len(precios),
-        'precio_minimo': min(precios),
-        'precio_maximo': max(precios),
-        'suma_total': sum(precios),
-        'promedio': sum(precios) / len(precios),
-        'primer_hoja': resultados[0]['hoja'] if resultados else '',
-        'ultima_hoja': resultados[-1]['hoja'] if resultados else ''
+        'precio_minimo': precios.min(),
+        'precio_maximo': precios.max(),
+        'suma_total': precios.sum(),
+        'promedio': precios.mean()
     }
 
-# Función para obtener el top 10 de hoteles por precio
-def get_top_hotels(client, spreadsheet_id, num_sheets=10, top_type="min"):
+# Agregados por ventana compartidos entre ejecuciones ((spreadsheet_id, ventana) -> agregado)
+@st.cache_resource
+@timed()
+def get_window_aggregates():
+    return {}
+
+# Resumen por hotel de una hoja: el guardado junto a la copia local o, si falta
+# o se armó con otras columnas, calculado una vez desde la hoja y guardado
+@timed()
+def load_sheet_summary(spreadsheet_id, sheet_entry):
+    override = get_schema_registry().override_for(spreadsheet_id)
+    return snapshot_store.summary_for(
+        spreadsheet_id, sheet_entry, lambda df: sheet_columns(spreadsheet_id, sheet_entry, df), override
+    )
+
+# Reporte precalculado por city_reports.py para la ventana (últimos N días), si sigue vigente:
+# cubre las mismas hojas (y versiones) que hoy tiene la ventana, sin errores y con la misma
+# selección manual de columnas
+@timed()
+def get_city_report(client, spreadsheet_id, window=None):
+    window = window or DEFAULT_WINDOW
+    key = (spreadsheet_id, window_key(window))
+    if key not in fresh_reports:
+        report = None
+        if set(window) == {'days'}:
+            try:
+                report = shared_cache.get(
+                    ('report', spreadsheet_id, window['days']),
+                    lambda: load_report(spreadsheet_id, window['days']),
+                    ttl=WORKSHEETS_TTL
+                )
+                if report is not None:
+                    entries = [entry for entry, _ in sync_spreadsheet(client, spreadsheet_id).window(**window)]
+                    override = get_schema_registry().override_for(spreadsheet_id)
+                    if not report.is_fresh(entries, override):
+                        report = None
+            except Exception:
+                count('excepciones_ignoradas')
+                report = None
+        fresh_reports[key] = report
+    return fresh_reports[key]
+
+# Ranking de todos los hoteles (una sola pasada por ejecución y ventana de análisis)
+@timed()
+def get_hotel_ranking(client, spreadsheet_id, window=None):
     """
-    Obtiene el top 10 de hoteles con menor o mayor precio
-    top_type: "min" para menor precio, "max" para mayor precio
+    Calcula en una sola agregación el precio promedio/mínimo/máximo,
+    muestras y hojas de cada hotel en la ventana de análisis
     """
+    key = (spreadsheet_id, window_key(window))
+    if key in hotel_rankings:
+        return hotel_rankings[key]
+    
+    # Con un reporte vigente no hace falta descargar ni agregar las hojas
+    report = get_city_report(client, spreadsheet_id, window)
+    if report is not None:
+        hotel_rankings[key] = report.ranking
+        return report.ranking
+    
     try:
-        spreadsheet = client.open_by_key(spreadsheet_id)
-        worksheets = spreadsheet.worksheets()
-        
-        # Ordenar hojas por fecha (más recientes primero)
-        dated_sheets = []
-        for ws in worksheets:
-            sheet_name = ws.title.lower()
-            date_patterns = [
-                r'\d{2}[-/]\d{2}[-/]\d{4}', r'\d{4}[-/]\d{2}[-/]\d{2}', r'\d{2}[-/]\d{2}[-/]\d{2}'
-            ]
-            
-            date_found = None
-            for pattern in date_patterns:
-                match = re.search(pattern, sheet_name)
-                if match:
-                    date_found = match.group()
-                    break
-            
-            dated_sheets.append((ws, date_found or sheet_name))
+        recent_sheets = window_sheets(client, spreadsheet_id, window)
+        entries = {ws['title']: ws for ws, _ in recent_sheets}
         
-        dated_sheets.sort(key=lambda x: x[1], reverse=True)
-        recent_sheets = dated_sheets[:num_sheets]
+        # Versión de cada hoja: copia local + columnas elegidas manualmente
+        override = get_schema_registry().override_for(spreadsheet_id)
+        versions = [(ws['title'], (ws.get('synced_at'), override)) for ws, _ in recent_sheets]
         
-        all_hotels = []
+        hojas_fallidas = []
         
-        for ws, date_str in recent_sheets:
+        def load_summary(title):
             try:
-                df = get_sheet_data(ws)
-                if df is not None and not df.empty:
-                    hotel_col, price_col = detect_columns(df)
-                    
-                    if hotel_col and price_col:
-                        # Procesar cada fila
-                        for _, row in df.iterrows():
-                            try:
-                                hotel_name = str(row[hotel_col]).strip()
-                                if not hotel_name or hotel_name.lower() in ['nan', 'none', '']:
-                                    continue
-                                
-                                # Limpiar y convertir precio
-                                price_str = str(row[price_col])
-                                price_clean = re.sub(r'[^\d.]', '', price_str)
-                                precio = float(price_clean) if price_clean else None
-                                
-                                if precio and precio > 0 and hotel_name:
-                                    all_hotels.append({
-                                        'hotel': hotel_name,
-                                        'precio': precio,
-                                        'hoja': ws.title,
-                                        'fecha': date_str
-                                    })
-                            except:
-                                continue
-            except:
-                continue
-        
-        # Agrupar por hotel y calcular precio promedio
-        hotel_stats = {}
-        for hotel_data in all_hotels:
-            hotel_name = hotel_data['hotel']
-            if hotel_name not in hotel_stats:
-                hotel_stats[hotel_name] = {
-                    'precios': [],
-                    'hojas': set(),
-                    'ultima_hoja': hotel_data['hoja']
-                }
-            hotel_stats[hotel_name]['precios'].append(hotel_data['precio'])
-            hotel_stats[hotel_name]['hojas'].add(hotel_data['hoja'])
+                return load_sheet_summary(spreadsheet_id, entries[title])
+            except Exception as e:
+                hojas_fallidas.append((title, e))
+                return None
         
-        # Calcular promedio por hotel
-        hotel_ranking = []
-        for hotel_name, stats in hotel_stats.items():
-            if stats['precios']:
-                avg_price = sum(stats['precios']) / len(stats['precios'])
-                hotel_ranking.append({
-                    'hotel': hotel_name,
-                    'precio_promedio': avg_price,
-                    'precio_min': min(stats['precios']),
-                    'precio_max': max(stats['precios']),
-                    'muestras': len(stats['precios']),
-                    'hojas': len(stats['hojas']),
-                    'ultima_hoja': stats['ultima_hoja']
-                })
+        # La ventana se desliza: solo se leen los resúmenes de las hojas que entran
+        aggregates = get_window_aggregates()
+        aggregate = aggregates.setdefault(key, SlidingWindowAggregate())
+        aggregate.update(versions, load_summary)
+        memory_manager.track(('ventana',) + key, aggregate.nbytes, lambda: aggregates.pop(key, None))
         
-        # Ordenar según el tipo de top
-        if top_type == "min":
-            hotel_ranking.sort(key=lambda x: x['precio_promedio'])
-        else:  # max
-            hotel_ranking.sort(key=lambda x: x['precio_promedio'], reverse=True)
+        report_failed_sheets(hojas_fallidas)
         
-        return hotel_ranking[:10]  # Top 10
+        ranking = aggregate.ranking()
         
     except Exception as e:
+        count('errores')
         st.error(f"Error obteniendo top hoteles: {e}")
-        return []
+        ranking = aggregate_hotel_prices([])
+    
+    hotel_rankings[key] = ranking
+    return ranking
+
+# Matriz hoteles × fechas de la ciudad en la ventana de análisis (una vez por ejecución y ventana)
+@timed()
+def get_price_matrix(client, spreadsheet_id, window=None):
+    key = (spreadsheet_id, window_key(window))
+    report = get_city_report(client, spreadsheet_id, window)
+    if key not in price_matrices and report is not None:
+        price_matrices[key] = report.matrix()
+    if key not in price_matrices:
+        try:
+            sheets = window_sheets(client, spreadsheet_id, window)
+            fact_table = sync_fact_table(client, spreadsheet_id, window)
+            rows = fact_table.city_rows(city_name(spreadsheet_id), [ws['title'] for ws, _ in sheets])
+            price_matrices[key] = PriceMatrix.from_rows(rows)
+        except Exception as e:
+            count('errores')
+            st.error(f"Error armando la serie de precios: {e}")
+            price_matrices[key] = PriceMatrix.from_rows(pd.DataFrame(columns=FACT_COLUMNS))
+    return price_matrices[key]
+
+# Comparación entre ciudades: todas las ciudades disponibles cargadas en paralelo
+# para la ventana de análisis (compartida entre sesiones)
+@timed()
+def get_city_comparison(client, window=None):
+    window = window or DEFAULT_WINDOW
+    ciudades = {
+        ciudad: sheet_id for ciudad, sheet_id in SHEET_IDS.items()
+        if client is not None or local_source_path(ciudad) is not None
+    }
+    return shared_cache.get(
+        ('comparacion', window_key(window), tuple(ciudades)),
+        lambda: CityComparison.load(client, ciudades, window, snapshot_store, get_schema_registry()),
+        ttl=SHEET_DATA_TTL
+    )
+
+# Función para obtener el top 10 de hoteles por precio (ambos tops salen del mismo
+# ranking, que se calcula una vez por ejecución y ventana)
+@timed()
+def get_top_hotels(client, spreadsheet_id, window=None, top_type="min"):
+    """
+    Obtiene el top 10 de hoteles con menor o mayor precio
+    top_type: "min" para menor precio, "max" para mayor precio
+    """
+    return top_hotels(get_hotel_ranking(client, spreadsheet_id, window), top_type, 10)
 
 # Función para mostrar los tops en la interfaz
-def display_top_hotels(client, spreadsheet_id, ubicacion):
+@timed()
+def display_top_hotels(client, spreadsheet_id, ubicacion, window=None):
     st.header("🏆 Top 10 Hoteles")
     
     col1, col2 = st.columns(2)
     
+    # Una sola pasada de datos para ambos tops
+    with st.spinner("Calculando ranking de hoteles..."):
+        top_min = get_top_hotels(client, spreadsheet_id, window, "min")
+        top_max = get_top_hotels(client, spreadsheet_id, window, "max")
+    
+    report = get_city_report(client, spreadsheet_id, window)
+    if report is not None:
+        st.caption(f"📦 Precalculado el {datetime.fromtimestamp(report.generated_at).strftime('%Y-%m-%d %H:%M')}")
+    
     with col1:
         st.subheader("💰 Top 10 Menor Precio")
-        with st.spinner("Buscando hoteles más económicos..."):
-            top_min = get_top_hotels(client, spreadsheet_id, 10, "min")
         
         if top_min:
             min_df = pd.DataFrame(top_min)
@@ -350,14 +628,12 @@ def display_top_hotels(client, spreadsheet_id, ubicacion):
                 chart_data['Precio Numérico'] = [x['precio_promedio'] for x in top_min]
                 st.bar_chart(chart_data.set_index('Hotel')['Precio Numérico'])
             except:
-                pass
+                count('excepciones_ignoradas')
         else:
             st.info("No se encontraron datos para el top de menores precios")
     
     with col2:
         st.subheader("💎 Top 10 Mayor Precio")
-        with st.spinner("Buscando hoteles más caros..."):
-            top_max = get_top_hotels(client, spreadsheet_id, 10, "max")
         
         if top_max:
             max_df = pd.DataFrame(top_max)
@@ -381,23 +657,21 @@ def display_top_hotels(client, spreadsheet_id, ubicacion):
                 chart_data['Precio Numérico'] = [x['precio_promedio'] for x in top_max]
                 st.bar_chart(chart_data.set_index('Hotel')['Precio Numérico'])
             except:
-                pass
+                count('excepciones_ignoradas')
         else:
             st.info("No se encontraron datos para el top de mayores precios")
 
 # Función para mostrar estadísticas generales
-def display_hotel_statistics(client, spreadsheet_id):
+@timed()
+def display_hotel_statistics(client, spreadsheet_id, window=None):
     st.header("📈 Estadísticas Generales de Hoteles")
     
     with st.spinner("Calculando estadísticas..."):
-        top_min = get_top_hotels(client, spreadsheet_id, 20, "min")
-        top_max = get_top_hotels(client, spreadsheet_id, 20, "max")
-    
-    if top_min and top_max:
-        # Calcular estadísticas generales
-        all_prices = []
-        for hotel in top_min + top_max:
-            all_prices.append(hotel['precio_promedio'])
+        ranking = get_hotel_ranking(client, spreadsheet_id, window)
+    
+    if not ranking.empty:
+        # Estadísticas generales sobre el precio promedio de cada hotel
+        all_prices = ranking['precio_promedio'].tolist()
         
         if all_prices:
             col1, col2, col3, col4 = st.columns(4)
@@ -418,6 +692,325 @@ def display_hotel_statistics(client, spreadsheet_id):
             st.subheader("📊 Distribución de Precios")
             price_df = pd.DataFrame({'Precio': all_prices})
             st.bar_chart(price_df, x='Precio')
+    
+    # Series de tiempo de todos los hoteles de la ciudad a la vez
+    matrix = get_price_matrix(client, spreadsheet_id, window)
+    if not matrix.empty:
+        st.subheader("📉 Precios de la Ciudad por Fecha")
+        st.line_chart(matrix.percentiles().rename(columns=lambda p: f"Percentil {p[1:]}"))
+        
+        col_saltos, col_volatiles = st.columns(2)
+        
+        with col_saltos:
+            st.subheader("🚨 Saltos de Precio Recientes")
+            saltos = matrix.anomalies()
+            if saltos.empty:
+                st.info("Sin saltos de precio inusuales en el periodo")
+            else:
+                st.dataframe(format_price_jumps(saltos.head(20)), use_container_width=True, hide_index=True)
+        
+        with col_volatiles:
+            st.subheader("🌪️ Hoteles Más Volátiles")
+            # Volatilidad de la última fecha con dato de cada hotel
+            volatilidad = matrix.to_frame(matrix.volatility()).ffill().iloc[-1].dropna()
+            volatiles = (volatilidad * 100).sort_values(ascending=False).head(10)
+            st.dataframe(
+                pd.DataFrame({'Hotel': volatiles.index, 'Volatilidad': volatiles.map(lambda x: f"{x:.1f}%").to_numpy()}),
+                use_container_width=True,
+                hide_index=True
+            )
+
+# Función para mostrar la evolución de los hoteles encontrados frente al resto de la ciudad
+@timed()
+def display_price_trends(matrix, hoteles):
+    hoteles = [hotel for hotel in hoteles if hotel in set(matrix.hotels)]
+    if matrix.empty or not hoteles:
+        st.info("No hay hojas con fecha suficientes para el análisis de series de tiempo")
+        return
+    
+    tab_media, tab_cambio, tab_volatilidad, tab_saltos = st.tabs([
+        f"📉 Media Móvil ({ROLLING_DATES} fechas)", "🔁 Cambio Diario", "🌪️ Volatilidad", "🚨 Saltos de Precio"
+    ])
+    
+    with tab_media:
+        # Media móvil de cada hotel contra la banda de precios de la ciudad
+        chart_data = matrix.to_frame(matrix.rolling_mean(), hoteles)
+        bandas = matrix.percentiles((25, 50, 75)).rename(columns=lambda p: f"Ciudad {p}")
+        st.line_chart(pd.concat([chart_data, bandas], axis=1))
+    
+    with tab_cambio:
+        st.bar_chart(matrix.to_frame(matrix.day_over_day() * 100, hoteles))
+        st.caption("Cambio porcentual respecto a la fecha anterior")
+    
+    with tab_volatilidad:
+        st.line_chart(matrix.to_frame(matrix.volatility() * 100, hoteles))
+        st.caption(f"Desviación estándar del cambio diario (%) en las últimas {ROLLING_DATES} fechas")
+    
+    with tab_saltos:
+        saltos = matrix.anomalies(hotels=hoteles)
+        if saltos.empty:
+            st.info("Sin saltos de precio inusuales en el periodo")
+        else:
+            st.dataframe(format_price_jumps(saltos), use_container_width=True, hide_index=True)
+
+# Formatea la tabla de saltos de precio para mostrarla
+@timed()
+def format_price_jumps(saltos):
+    return pd.DataFrame({
+        'Hotel': saltos['hotel'],
+        'Fecha': saltos['fecha'].dt.date,
+        'Precio': saltos['precio'].map(lambda x: f"${x:,.2f}"),
+        'Promedio Previo': saltos['media_previa'].map(lambda x: f"${x:,.2f}"),
+        'Cambio': saltos['cambio'].map(lambda x: f"{x:+.1%}"),
+        'Desviaciones': saltos['z'].round(1)
+    })
+
+# Función para mostrar los resultados de la búsqueda (se vuelve a dibujar al llegar cada hoja)
+@timed()
+def display_search_results(hotel_busqueda, resultados, metrics, matrix=None):
+    if not metrics:
+        st.warning("Se encontraron resultados pero no precios válidos.")
+        return
+    
+    st.success(f"✅ Encontrados {metrics['total_precios_encontrados']} precios en {metrics['total_hojas_revisadas']} hojas")
+    
+    # Mostrar métricas
+    col1, col2, col3, col4 = st.columns(4)
+    
+    with col1:
+        st.metric("Precio Mínimo", f"${metrics['precio_minimo']:,.2f}")
+    
+    with col2:
+        st.metric("Precio Máximo", f"${metrics['precio_maximo']:,.2f}")
+    
+    with col3:
+        st.metric("Suma Total", f"${metrics['suma_total']:,.2f}")
+    
+    with col4:
+        st.metric("Promedio", f"${metrics['promedio']:,.2f}")
+    
+    # Detalles del cálculo
+    with st.expander("📊 Detalles del análisis"):
+        st.write(f"**Hotel buscado:** {hotel_busqueda}")
+        st.write(f"**Total de hojas revisadas:** {metrics['total_hojas_revisadas']}")
+        st.write(f"**Total de precios encontrados:** {metrics['total_precios_encontrados']}")
+        st.write(f"**Rango de fechas:** {metrics['primer_hoja']} - {metrics['ultima_hoja']}")
+        st.write(f"**Fórmula del promedio:** Suma total / Cantidad de precios")
+        st.write(f"**Cálculo:** ${metrics['suma_total']:,.2f} / {metrics['total_precios_encontrados']} = ${metrics['promedio']:,.2f}")
+    
+    # Mostrar resultados detallados
+    st.subheader("📋 Precios Encontrados")
+    st.dataframe(
+        resultados[['hoja', 'hotel', 'precio', 'fecha_hoja']],
+        use_container_width=True,
+        height=300
+    )
+    
+    # Gráfico de precios por hoja
+    st.subheader("📈 Evolución de Precios")
+    try:
+        chart_data = resultados[['hoja', 'precio']].copy()
+        chart_data['hoja'] = chart_data['hoja'].astype(str)
+        st.line_chart(chart_data.set_index('hoja')['precio'])
+    except:
+        count('excepciones_ignoradas')
+        st.info("No se pudo generar el gráfico de evolución")
+    
+    # Series de tiempo de los hoteles encontrados (cuando ya se revisó todo el periodo)
+    if matrix is not None:
+        display_price_trends(matrix, resultados['hotel'].astype(str).unique())
+
+# Vista de comparación entre ciudades: tops lado a lado, distribución de precios y cadenas
+@timed()
+def display_city_comparison(comparacion, window=None):
+    st.header("🌎 Comparación entre Ciudades")
+    
+    if comparacion.seconds:
+        mas_lenta = max(comparacion.seconds, key=comparacion.seconds.get)
+        st.caption(
+            f"{len(comparacion.cities)} ciudades cargadas en paralelo en {comparacion.elapsed:,.1f} s "
+            f"(la más lenta, {mas_lenta}: {comparacion.seconds[mas_lenta]:,.1f} s; "
+            f"una tras otra: {sum(comparacion.seconds.values()):,.1f} s) — {describe_window(window)}"
+        )
+    if comparacion.failures:
+        count('errores', len(comparacion.failures))
+        st.warning(
+            "⚠️ No se pudieron cargar: "
+            + ", ".join(f"{ciudad} ({error})" for ciudad, error in comparacion.failures.items())
+        )
+    if not comparacion.cities:
+        st.info("No hay ciudades con datos disponibles.")
+        return
+    
+    # Resumen de cada ciudad
+    resumen = comparacion.city_summary()
+    if not resumen.empty:
+        tabla = resumen.copy()
+        for col in ['promedio', 'minimo', 'p10', 'mediana', 'p90', 'maximo']:
+            tabla[col] = tabla[col].map(lambda x: f"${x:,.2f}")
+        tabla = tabla[['hoteles', 'precios', 'promedio', 'mediana', 'p10', 'p90', 'minimo', 'maximo']]
+        tabla.columns = ['Hoteles', 'Precios', 'Promedio', 'Mediana', 'Percentil 10', 'Percentil 90', 'Mínimo', 'Máximo']
+        st.dataframe(tabla, use_container_width=True)
+    
+    # Tops de cada ciudad lado a lado
+    st.subheader("🏆 Top 10 por Ciudad")
+    tipo = st.radio("Top de:", ["Menor precio", "Mayor precio"], horizontal=True)
+    tops = comparacion.tops("min" if tipo == "Menor precio" else "max")
+    for columna, (ciudad, top) in zip(st.columns(len(tops)), tops.items()):
+        with columna:
+            st.markdown(f"**{ciudad}**")
+            if top.empty:
+                st.info("Sin datos")
+                continue
+            top_df = pd.DataFrame({
+                '#': range(1, len(top) + 1),
+                'Hotel': top['hotel'],
+                'Precio Promedio': top['precio_promedio'].map(lambda x: f"${x:,.2f}"),
+            })
+            st.dataframe(top_df, use_container_width=True, height=400, hide_index=True)
+    
+    # Distribución de precios (misma escala de bandas para todas las ciudades)
+    distribucion = comparacion.distributions()
+    if not distribucion.empty:
+        st.subheader("📊 Distribución de Precios por Ciudad")
+        st.caption("Porcentaje de los precios de cada ciudad en cada banda de precio")
+        st.line_chart(distribucion * 100)
+    
+    # La misma cadena en distintas ciudades
+    precios_cadena, hoteles_cadena = comparacion.chains()
+    st.subheader("🏨 Cadenas en Varias Ciudades")
+    if precios_cadena.empty:
+        st.info("No hay cadenas conocidas presentes en más de una ciudad.")
+    else:
+        st.caption("Precio promedio de la cadena en cada ciudad (hoteles de la cadena entre paréntesis)")
+        tabla = pd.DataFrame({
+            ciudad: [
+                f"${precio:,.2f} ({hoteles})" if pd.notna(precio) else "—"
+                for precio, hoteles in zip(precios_cadena[ciudad], hoteles_cadena[ciudad])
+            ]
+            for ciudad in precios_cadena.columns
+        }, index=precios_cadena.index)
+        st.dataframe(tabla, use_container_width=True)
+
+# Primera y última fecha de las hojas del periodo de análisis en las ciudades indicadas
+@timed()
+def window_dates(client, ciudades, window=None):
+    fechas = [
+        fecha for ciudad in ciudades
+        for _, fecha in window_sheets(client, SHEET_IDS[ciudad], window) if fecha is not None
+    ]
+    return (min(fechas), max(fechas)) if fechas else (None, None)
+
+# Panel de consulta avanzada: agregaciones sobre el motor SQL de las ciudades elegidas
+@timed()
+def display_advanced_query(client, ubicacion, window=None):
+    st.header("🧮 Consulta Avanzada")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        ciudades = st.multiselect("Ciudades:", list(SHEET_IDS), default=[ubicacion])
+    with col2:
+        consulta = st.selectbox("Consulta:", ADVANCED_QUERIES)
+    solo_periodo = st.checkbox("Solo el periodo de análisis", value=True)
+    
+    # Solo las ciudades que se pueden leer (con credenciales o con exportación local)
+    ciudades = [c for c in ciudades if client is not None or local_source_path(c) is not None]
+    if not ciudades:
+        st.info("Elige al menos una ciudad con datos disponibles.")
+        return
+    
+    try:
+        with st.spinner("Cargando precios en el motor de consultas..."):
+            engine = sync_sql_engine(client, ciudades, window)
+        desde, hasta = window_dates(client, ciudades, window) if solo_periodo else (None, None)
+    except Exception as e:
+        count('errores')
+        st.error(f"Error cargando los precios: {e}")
+        return
+    
+    serie = None
+    try:
+        if consulta == "Promedio por día de la semana":
+            inicio = time.perf_counter()
+            resultado = engine.weekday_averages(ciudades, desde, hasta)
+        elif consulta == "Bandas de precio":
+            ancho = st.number_input("Ancho de cada banda ($):", min_value=100, value=500, step=100)
+            inicio = time.perf_counter()
+            resultado = engine.price_bands(ancho, ciudades, desde, hasta)
+        elif consulta == "Comparar hoteles":
+            hoteles = st.multiselect("Hoteles:", engine.hotels(ciudades), max_selections=10)
+            if not hoteles:
+                st.info("Elige los hoteles a comparar.")
+                return
+            inicio = time.perf_counter()
+            resultado = engine.compare_hotels(hoteles, ciudades, desde, hasta)
+            serie = engine.daily_prices(hoteles, ciudades, desde, hasta)
+        else:
+            sql = st.text_area(
+                "SQL de solo lectura sobre la tabla precios (ciudad, fecha, hoja, hotel, precio):",
+                value=ADVANCED_SQL_EXAMPLE, height=160,
+                help="Incluye las ciudades ya cargadas en el motor; :desde y :hasta son las fechas del periodo"
+            )
+            inicio = time.perf_counter()
+            resultado = engine.query(sql, {
+                'desde': desde.strftime('%Y-%m-%d') if desde is not None else '0000-01-01',
+                'hasta': hasta.strftime('%Y-%m-%d') if hasta is not None else '9999-12-31',
+            })
+    except (sqlite3.Error, ValueError) as e:
+        st.error(f"Error en la consulta: {e}")
+        return
+    milisegundos = (time.perf_counter() - inicio) * 1000
+    
+    st.caption(
+        f"{len(resultado):,} filas en {milisegundos:,.1f} ms"
+        + (f" (se muestran las primeras {MAX_QUERY_ROWS:,})" if len(resultado) >= MAX_QUERY_ROWS else "")
+        + f" — motor con {', '.join(engine.cities()) or 'ninguna ciudad'}"
+        + (f", del {desde:%d/%m/%Y} al {hasta:%d/%m/%Y}" if desde is not None else "")
+    )
+    st.dataframe(resultado.round(2), use_container_width=True, hide_index=True)
+    if serie is not None and not serie.empty:
+        st.line_chart(serie.pivot(index='fecha', columns='hotel', values='precio'))
+
+# True si Streamlit está ejecutando solo fragmentos (los widgets de una sección), no la página completa
+def fragment_run():
+    ctx = get_script_run_ctx()
+    return bool(ctx and ctx.fragment_ids_this_run)
+
+# Sección de la página como fragmento de Streamlit (st.fragment, desde Streamlit 1.37): un
+# cambio en sus widgets vuelve a ejecutar solo la sección, con los mismos argumentos de la
+# última ejecución completa. Esa ejecución empieza con el estado vacío, como una completa:
+# vuelve a listar las hojas y a revisar la copia local, los reportes y las tablas.
+# Cada ejecución registra su tiempo y sus llamadas a la API.
+def page_section(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            parcial = fragment_run()
+            if parcial:
+                start_run()
+                for state in RUN_STATE:
+                    state.clear()
+            llamadas = sum(api_calls().values())
+            inicio = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                segundos = time.perf_counter() - inicio
+                record_stage(f'seccion.{name}', segundos)
+                costo = {'ms': segundos * 1000, 'api': sum(api_calls().values()) - llamadas, 'parcial': parcial}
+                st.session_state.setdefault('costos_secciones', {})[name] = costo
+                if st.session_state.get('depuracion'):
+                    st.caption(
+                        f"⏱️ {costo['ms']:,.0f} ms, {costo['api']} llamadas a la API"
+                        + (" (solo esta sección)" if parcial else "")
+                    )
+                if parcial:
+                    try:
+                        export_metrics({'seccion': name})
+                    except OSError:
+                        count('excepciones_ignoradas')
+        return st.fragment(wrapper)
+    return decorator
 
 # Selector de ubicación en el sidebar
 st.sidebar.header("📍 Selecciona Ubicación")
@@ -425,146 +1018,236 @@ ubicacion = st.sidebar.radio("Ubicación:", ["Mérida", "Celaya", "Tuxtla", "Maz
 
 spreadsheet_id = SHEET_IDS[ubicacion]
 
-# Obtener cliente de Google Sheets
+# Modo de comparación: todas las ciudades a la vez en lugar de la ubicación elegida
+comparar_ciudades = st.sidebar.checkbox("🌎 Comparar todas las ciudades", value=False)
+
+# Periodo de análisis para la búsqueda, el ranking y las estadísticas
+st.sidebar.header("📅 Periodo de Análisis")
+if st.sidebar.checkbox("Elegir rango de fechas", value=False):
+    hoy = datetime.now().date()
+    rango = st.sidebar.date_input(
+        "Rango de fechas:",
+        value=(hoy - timedelta(days=ANALYSIS_DAYS - 1), hoy)
+    )
+    rango = list(rango) if isinstance(rango, (list, tuple)) else [rango]
+    # Con el rango vacío (el usuario lo borró) se usa la ventana por defecto
+    if rango:
+        ventana = {'start': rango[0], 'end': rango[1] if len(rango) > 1 else None}
+    else:
+        ventana = {'days': ANALYSIS_DAYS}
+else:
+    ventana = {'days': st.sidebar.slider("Últimos días:", 7, 90, ANALYSIS_DAYS)}
+
+# Obtener cliente de Google Sheets (no hace falta si la ciudad se lee de una exportación local)
 client = setup_gspread()
+disponible = client is not None or local_source_path(ubicacion) is not None
 
-# Barra de búsqueda de hoteles
-st.header("🔍 Búsqueda de Hotel")
-hotel_busqueda = st.text_input(
-    "Ingresa el nombre del hotel a buscar:",
-    placeholder="Ej: Hilton, Marriott, Holiday Inn...",
-    help="Buscará el hotel en las últimas 30 Dias disponibles"
-)
+# Búsqueda de hoteles (escribir una búsqueda o elegir una sugerencia solo vuelve a ejecutar esta sección)
+@page_section('busqueda')
+def search_section(client, spreadsheet_id, ventana, disponible):
+    st.header("🔍 Búsqueda de Hotel")
+    hotel_busqueda = st.text_input(
+        "Ingresa el nombre del hotel a buscar:",
+        placeholder="Ej: Hilton, Marriott, Holiday Inn...",
+        help="Buscará el hotel en las hojas del periodo de análisis elegido",
+        key="busqueda_hotel"
+    )
+    max_precios = st.number_input(
+        "Detener al encontrar (precios, 0 = revisar todo el periodo):",
+        min_value=0, value=0, step=10,
+        help="Con un límite la búsqueda termina en cuanto junta esa cantidad de precios de las hojas más recientes"
+    )
 
-if hotel_busqueda and client:
-    with st.spinner(f"Buscando '{hotel_busqueda}' en los últimos 30 Dias..."):
-        resultados, precios_encontrados = search_hotel_in_sheets(client, spreadsheet_id, hotel_busqueda, 30)
-    
-    if resultados:
-        metrics = calculate_hotel_metrics(resultados)
+    # Sugerencias de autocompletado (sin acentos, tolerantes a errores de tipeo)
+    # con los hoteles ya cargados en la tabla consolidada, sin esperar descargas
+    hotel_exacto = False
+    if hotel_busqueda and disponible:
+        memory_manager.touch(('ciudad', city_name(spreadsheet_id)))
+        sugerencias = get_fact_table().search_index(city_name(spreadsheet_id)).suggest(hotel_busqueda)
+        if sugerencias:
+            todas_coincidencias = f"Todas las coincidencias de '{hotel_busqueda}'"
+            seleccion = st.selectbox("Sugerencias:", [todas_coincidencias] + sugerencias)
+            if seleccion != todas_coincidencias:
+                hotel_busqueda, hotel_exacto = seleccion, True
+
+    if hotel_busqueda and disponible:
+        # Los resultados se dibujan a medida que llega cada hoja
+        progreso = st.progress(0.0, text=f"Buscando '{hotel_busqueda}' en {describe_window(ventana)}...")
+        espacio_resultados = st.empty()
         
-        if metrics:
-            st.success(f"✅ Encontrados {metrics['total_precios_encontrados']} precios en {metrics['total_hojas_revisadas']} hojas")
-            
-            # Mostrar métricas
-            col1, col2, col3, col4 = st.columns(4)
-            
-            with col1:
-                st.metric("Precio Mínimo", f"${metrics['precio_minimo']:,.2f}")
-            
-            with col2:
-                st.metric("Precio Máximo", f"${metrics['precio_maximo']:,.2f}")
-            
-            with col3:
-                st.metric("Suma Total", f"${metrics['suma_total']:,.2f}")
-            
-            with col4:
-                st.metric("Promedio", f"${metrics['promedio']:,.2f}")
-            
-            # Detalles del cálculo
-            with st.expander("📊 Detalles del análisis"):
-                st.write(f"**Hotel buscado:** {hotel_busqueda}")
-                st.write(f"**Total de hojas revisadas:** {metrics['total_hojas_revisadas']}")
-                st.write(f"**Total de precios encontrados:** {metrics['total_precios_encontrados']}")
-                st.write(f"**Rango de fechas:** {metrics['primer_hoja']} - {metrics['ultima_hoja']}")
-                st.write(f"**Fórmula del promedio:** Suma total / Cantidad de precios")
-                st.write(f"**Cálculo:** ${metrics['suma_total']:,.2f} / {metrics['total_precios_encontrados']} = ${metrics['promedio']:,.2f}")
-            
-            # Mostrar resultados detallados
-            st.subheader("📋 Precios Encontrados")
-            resultados_df = pd.DataFrame(resultados)
-            st.dataframe(
-                resultados_df[['hoja', 'hotel', 'precio', 'fecha_hoja']],
-                use_container_width=True,
-                height=300
-            )
-            
-            # Gráfico de precios por hoja
-            st.subheader("📈 Evolución de Precios")
-            try:
-                chart_data = resultados_df[['hoja', 'precio']].copy()
-                chart_data['hoja'] = chart_data['hoja'].astype(str)
-                st.line_chart(chart_data.set_index('hoja')['precio'])
-            except:
-                st.info("No se pudo generar el gráfico de evolución")
+        partes = []
+        revisadas = total = 0
+        busqueda_ok = True
+        ultimo_dibujo = None
+        try:
+            for filas, revisadas, total in search_hotel_in_sheets(
+                client, spreadsheet_id, hotel_busqueda, ventana, exact=hotel_exacto, max_prices=max_precios or None
+            ):
+                progreso.progress(revisadas / total, text=f"Buscando '{hotel_busqueda}': {revisadas} de {total} hojas revisadas...")
+                if filas.empty:
+                    continue
+                partes.append(filas)
+                # El primer resultado se muestra de inmediato; después, como mucho cada SEARCH_REDRAW_SECONDS
+                if ultimo_dibujo is None or time.perf_counter() - ultimo_dibujo >= SEARCH_REDRAW_SECONDS:
+                    resultados = pd.concat(partes, ignore_index=True)
+                    with espacio_resultados.container():
+                        display_search_results(hotel_busqueda, resultados, calculate_hotel_metrics(resultados))
+                    ultimo_dibujo = time.perf_counter()
+        except Exception as e:
+            count('errores')
+            busqueda_ok = False
+            st.error(f"Error en la búsqueda: {e}")
+        progreso.empty()
         
-        else:
-            st.warning("Se encontraron resultados pero no precios válidos.")
-    else:
-        st.warning(f"No se encontró el hotel '{hotel_busqueda}' en las últimas 30 hojas.")
+        completa = busqueda_ok and revisadas == total
+        if partes:
+            resultados = pd.concat(partes, ignore_index=True)
+            with espacio_resultados.container():
+                if completa:
+                    # Periodo completo: métricas combinadas de los resúmenes de la ventana
+                    display_search_results(
+                        hotel_busqueda, resultados,
+                        calculate_hotel_metrics(resultados, get_hotel_ranking(client, spreadsheet_id, ventana)),
+                        get_price_matrix(client, spreadsheet_id, ventana)
+                    )
+                else:
+                    display_search_results(hotel_busqueda, resultados, calculate_hotel_metrics(resultados))
+            if busqueda_ok and not completa:
+                st.caption(f"Búsqueda detenida al juntar {max_precios} precios ({revisadas} de {total} hojas revisadas).")
+        elif busqueda_ok:
+            st.warning(f"No se encontró el hotel '{hotel_busqueda}' en {describe_window(ventana)}.")
+        
+        # Con el periodo ya descargado, actualizar la tabla consolidada para las sugerencias
+        if completa:
+            sync_fact_table(client, spreadsheet_id, ventana)
 
-# Sección de análisis de hojas individuales (código anterior)
-st.header("📊 Análisis de Hoja Individual")
+# Análisis de hojas individuales (cambiar de hoja solo vuelve a ejecutar esta sección)
+@page_section('hoja_individual')
+def sheet_section(client, spreadsheet_id, disponible):
+    st.header("📊 Análisis de Hoja Individual")
 
-if client:
-    with st.spinner("Cargando hojas disponibles..."):
-        sheets_dict = get_all_sheets(spreadsheet_id, client)
-    
-    if sheets_dict:
-        sheet_names = list(sheets_dict.keys())
+    if disponible:
+        with st.spinner("Cargando hojas disponibles..."):
+            sheets_dict = get_all_sheets(spreadsheet_id, client)
         
-        st.sidebar.header("📋 Selecciona Dia")
-        selected_sheet_name = st.sidebar.selectbox(
-            "Hoja:",
-            sheet_names,
-            index=len(sheet_names)-1 if sheet_names else 0
-        )
-        
-        with st.spinner(f"Cargando {selected_sheet_name}..."):
-            selected_sheet = sheets_dict[selected_sheet_name]
-            df = get_sheet_data(selected_sheet)
-        
-        if df is not None and not df.empty:
-            st.subheader(f"{selected_sheet_name}")
+        if sheets_dict:
+            sheet_names = list(sheets_dict.keys())
+            
+            # Por defecto, la hoja con la fecha más reciente
+            latest_sheet = sheet_catalogs[spreadsheet_id].latest()
             
-            hotel_col, price_col = detect_columns(df)
+            # El selector vive en la sección (no en el sidebar) para que cambiar de hoja no recalcule la página
+            selected_sheet_name = st.selectbox(
+                "📋 Selecciona día (hoja):",
+                sheet_names,
+                index=sheet_names.index(latest_sheet['title']) if latest_sheet else 0
+            )
+            
+            with st.spinner(f"Cargando {selected_sheet_name}..."):
+                selected_sheet = sheets_dict[selected_sheet_name]
+                df = get_sheet_data(spreadsheet_id, selected_sheet, full=True)
             
-            if hotel_col and price_col:
-                st.success(f"✅ Columnas detectadas: Hotel → {hotel_col}, Precio → {price_col}")
+            if df is not None and not df.empty:
+                st.subheader(f"{selected_sheet_name}")
                 
-                # Análisis de precios de la hoja actual
-                try:
-                    df['precio_limpio'] = pd.to_numeric(
-                        df[price_col].astype(str).str.replace(',', '.').str.replace('$', '').str.replace(' ', ''),
-                        errors='coerce'
+                hotel_col, price_col = sheet_columns(spreadsheet_id, selected_sheet, df)
+                
+                # Selección manual de columnas (se guarda para todas las hojas de esta ubicación)
+                with st.expander("⚙️ Ajustar columnas de hotel y precio"):
+                    columnas = list(df.columns)
+                    col_hotel = st.selectbox(
+                        "Columna de hotel:", columnas,
+                        index=columnas.index(hotel_col) if hotel_col in columnas else 0
                     )
+                    col_precio = st.selectbox(
+                        "Columna de precio:", columnas,
+                        index=columnas.index(price_col) if price_col in columnas else 0
+                    )
+                    col_guardar, col_restablecer = st.columns(2)
+                    with col_guardar:
+                        if st.button("Guardar para esta ubicación"):
+                            get_schema_registry().set_override(spreadsheet_id, col_hotel, col_precio)
+                            st.rerun()
+                    with col_restablecer:
+                        if st.button("Usar detección automática"):
+                            get_schema_registry().clear_override(spreadsheet_id)
+                            st.rerun()
+                
+                if hotel_col and price_col:
+                    st.success(f"✅ Columnas detectadas: Hotel → {hotel_col}, Precio → {price_col}")
                     
-                    precios_validos = df['precio_limpio'].dropna()
-                    
-                    if len(precios_validos) > 0:
-                        col1, col2, col3, col4 = st.columns(4)
+                    # Análisis de precios de la hoja actual
+                    try:
+                        df = df.assign(precio_limpio=normalize_prices(df[price_col]))
                         
-                        with col1:
-                            st.metric("Precio Mínimo", f"${precios_validos.min():,.2f}")
+                        precios_validos = df['precio_limpio'].dropna()
                         
-                        with col2:
-                            st.metric("Precio Máximo", f"${precios_validos.max():,.2f}")
-                        
-                        with col3:
-                            st.metric("Suma Total", f"${precios_validos.sum():,.2f}")
-                        
-                        with col4:
-                            st.metric("Promedio", f"${precios_validos.mean():,.2f}")
+                        if len(precios_validos) > 0:
+                            col1, col2, col3, col4 = st.columns(4)
+                            
+                            with col1:
+                                st.metric("Precio Mínimo", f"${precios_validos.min():,.2f}")
+                            
+                            with col2:
+                                st.metric("Precio Máximo", f"${precios_validos.max():,.2f}")
+                            
+                            with col3:
+                                st.metric("Suma Total", f"${precios_validos.sum():,.2f}")
+                            
+                            with col4:
+                                st.metric("Promedio", f"${precios_validos.mean():,.2f}")
+                    
+                    except Exception as e:
+                        count('errores')
+                        st.error(f"Error en análisis de precios: {e}")
                 
-                except Exception as e:
-                    st.error(f"Error en análisis de precios: {e}")
-            
-            # Mostrar datos
-            st.dataframe(df, use_container_width=True, height=300)
-            
+                # Mostrar datos
+                st.dataframe(df, use_container_width=True, height=300)
+                
+            else:
+                st.warning("La hoja seleccionada está vacía.")
         else:
-            st.warning("La hoja seleccionada está vacía.")
-    else:
-        st.error("No se pudieron cargar las hojas.")
+            st.error("No se pudieron cargar las hojas.")
 
-# Sección de Top 10 Hoteles
-st.markdown("---")
-if client:
-    display_top_hotels(client, spreadsheet_id, ubicacion)
-    
-    # Opcional: Estadísticas generales
-    with st.expander("📈 Ver Estadísticas Generales Detalladas"):
-        display_hotel_statistics(client, spreadsheet_id)
+# Top 10 y estadísticas generales (dependen solo de la ciudad y el periodo)
+@page_section('top_y_estadisticas')
+def top_section(client, spreadsheet_id, ubicacion, ventana, disponible):
+    st.markdown("---")
+    if disponible:
+        display_top_hotels(client, spreadsheet_id, ubicacion, ventana)
+        
+        # Opcional: Estadísticas generales
+        with st.expander("📈 Ver Estadísticas Generales Detalladas"):
+            display_hotel_statistics(client, spreadsheet_id, ventana)
+
+# Consulta avanzada (carga el historial de las ciudades elegidas en el motor SQL, solo si se abre;
+# cambiar la consulta o sus filtros solo vuelve a ejecutar esta sección)
+@page_section('consulta_avanzada')
+def advanced_query_section(client, ubicacion, ventana, disponible):
+    st.markdown("---")
+    if disponible and st.checkbox("🧮 Abrir consulta avanzada", value=False):
+        display_advanced_query(client, ubicacion, ventana)
+
+# Comparación entre ciudades (reemplaza a las secciones de una sola ciudad)
+@page_section('comparacion')
+def comparison_section(client, ventana):
+    st.markdown("---")
+    try:
+        with st.spinner("Cargando todas las ciudades en paralelo..."):
+            comparacion = get_city_comparison(client, ventana)
+    except Exception as e:
+        count('errores')
+        st.error(f"Error comparando ciudades: {e}")
+        return
+    display_city_comparison(comparacion, ventana)
+
+if comparar_ciudades:
+    comparison_section(client, ventana)
+else:
+    search_section(client, spreadsheet_id, ventana, disponible)
+    sheet_section(client, spreadsheet_id, disponible)
+    top_section(client, spreadsheet_id, ubicacion, ventana, disponible)
+    advanced_query_section(client, ubicacion, ventana, disponible)
 
 # Información adicional
 st.sidebar.header("ℹ️ Información")
@@ -580,6 +1263,72 @@ st.sidebar.info("""
 - Basado en los últimos 30 Dias
 """)
 
+# Origen de los datos de la ciudad elegida
+if spreadsheet_id in spreadsheet_handles:
+    st.sidebar.caption(f"📂 Datos de {ubicacion}: {spreadsheet_handles[spreadsheet_id].describe()}")
+
+# Llamadas a la API de Google Sheets en esta ejecución
+llamadas_api = api_calls()
+st.sidebar.caption(
+    f"Llamadas a la API en esta ejecución: {sum(llamadas_api.values())} "
+    f"({', '.join(f'{k}: {v}' for k, v in sorted(llamadas_api.items())) or 'ninguna'})"
+)
+
+# Memoria ocupada por los datos compartidos entre sesiones
+uso_memoria = memory_manager.usage()
+st.sidebar.caption(
+    f"💾 Memoria: {uso_memoria['bytes'] / 2**20:,.1f} MB de {uso_memoria['budget'] / 2**20:,.0f} MB"
+    + (" (" + ", ".join(
+        f"{kind} {size / 2**20:,.1f} MB" for kind, size in sorted(uso_memoria['kinds'].items())
+    ) + ")" if uso_memoria['kinds'] else "")
+    + (f" — {uso_memoria['evictions']} liberados" if uso_memoria['evictions'] else "")
+)
+
+# Aciertos y fallos de la caché compartida entre sesiones (desde que arrancó el proceso)
+cache_stats = shared_cache.stats()
+st.sidebar.caption(
+    f"Caché compartida ({cache_stats['entries']} entradas): "
+    + (", ".join(
+        f"{kind} {c['hits']}/{c['misses']}" + (f" (+{c['coalesced']} en espera)" if c['coalesced'] else "")
+        for kind, c in sorted(cache_stats['kinds'].items())
+    ) or "sin uso")
+    + " — aciertos/fallos"
+)
+
+# Panel de depuración: tiempos por etapa y contadores de esta ejecución
+if st.sidebar.checkbox("🐞 Mostrar métricas de depuración", value=False, key="depuracion"):
+    metricas = current_run().snapshot()
+    with st.sidebar.expander("⏱️ Tiempos por etapa", expanded=True):
+        st.caption(f"Ejecución completa: {metricas['elapsed'] * 1000:,.0f} ms (las etapas incluyen a las que llaman)")
+        etapas = pd.DataFrame([
+            {'Etapa': nombre, 'Llamadas': datos['calls'], 'Total (ms)': datos['seconds'] * 1000, 'Máx (ms)': datos['max'] * 1000}
+            for nombre, datos in metricas['stages'].items()
+        ])
+        if not etapas.empty:
+            st.dataframe(
+                etapas.sort_values('Total (ms)', ascending=False).round(1),
+                use_container_width=True,
+                hide_index=True
+            )
+    with st.sidebar.expander("🔢 Contadores", expanded=True):
+        contadores = pd.DataFrame(sorted(metricas['counters'].items()), columns=['Evento', 'Cantidad'])
+        st.dataframe(contadores, use_container_width=True, hide_index=True)
+    with st.sidebar.expander("🧩 Última ejecución de cada sección", expanded=True):
+        st.caption("Una interacción dentro de una sección solo vuelve a ejecutar esa sección")
+        secciones = pd.DataFrame([
+            {'Sección': nombre, 'ms': costo['ms'], 'Llamadas API': costo['api'],
+             'Ejecución': 'solo la sección' if costo['parcial'] else 'página completa'}
+            for nombre, costo in st.session_state.get('costos_secciones', {}).items()
+        ])
+        if not secciones.empty:
+            st.dataframe(secciones.round(1), use_container_width=True, hide_index=True)
+
+# Exportar las métricas de esta ejecución para seguir la latencia en el tiempo
+try:
+    export_metrics({'ciudad': ubicacion, 'busqueda': bool(st.session_state.get('busqueda_hotel'))})
+except OSError:
+    count('excepciones_ignoradas')
+
 # Pie de página
 st.divider()
 st.markdown(
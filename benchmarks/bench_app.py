@@ -0,0 +1,173 @@
+"""
+Rendimiento de la app completa contra el backend falso de Google Sheets
+(benchmarks/fake_gspread.py), sin credenciales ni red.
+
+Por cada escala se arranca un proceso limpio (caché local vacía) que dibuja
+la página con streamlit.testing y mide:
+  - carga inicial: primera ejecución con la ventana por defecto (30 días)
+  - todas las hojas: rango de fechas que cubre todas las hojas de la ciudad
+  - recarga: la misma página otra vez (todo en caché)
+  - búsqueda: la página con una búsqueda de hotel sobre todas las hojas
+  - cambio de hoja: elegir otro día en el análisis de hoja individual
+Los tiempos de las funciones y de cada sección de la página salen de las etapas
+de instrumentation. streamlit.testing siempre vuelve a ejecutar la página completa;
+en el navegador una interacción dentro de una sección (búsqueda, hoja) solo vuelve
+a ejecutar esa sección, así que su costo real es el de la columna de la sección.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_app --scales 10 100 1000
+    python -m benchmarks.bench_app --scales 100 --rows 80 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+APP = ROOT / "app.py"
+
+# Etapas (funciones de app.py) que se reportan por escenario: la búsqueda, los tops
+# (incluye el cálculo del ranking de la ventana) y la detección de columnas
+FUNCTION_STAGES = ['search_hotel_in_sheets', 'get_top_hotels', 'detect_columns']
+
+# Secciones de la página (fragmentos de app.py)
+SECTION_STAGES = ['seccion.busqueda', 'seccion.hoja_individual', 'seccion.top_y_estadisticas']
+
+SECRETS = {key: 'benchmark' for key in [
+    'type', 'project_id', 'private_key_id', 'private_key', 'client_email', 'client_id', 'auth_uri',
+    'token_uri', 'auth_provider_x509_cert_url', 'client_x509_cert_url', 'universe_domain',
+]}
+
+
+# Lo que sumó una ejecución a los acumulados del proceso (la app corre en el hilo de AppTest,
+# con sus propias métricas de ejecución)
+def metrics_delta(before, after):
+    stages = {}
+    for stage, stats in after['stages'].items():
+        previous = before['stages'].get(stage, {'calls': 0, 'seconds': 0.0})
+        if stats['calls'] > previous['calls']:
+            stages[stage] = {'calls': stats['calls'] - previous['calls'], 'seconds': stats['seconds'] - previous['seconds']}
+    counters = {event: n - before['counters'].get(event, 0) for event, n in after['counters'].items()}
+    return {'stages': stages, 'counters': counters}
+
+
+def measure(at, name, fake):
+    from instrumentation import process_metrics
+
+    errors_before = fake.errors
+    before = process_metrics.snapshot()
+    start = time.perf_counter()
+    at.run()
+    seconds = time.perf_counter() - start
+    if at.exception:
+        raise RuntimeError(f"{name}: {at.exception[0].value}")
+
+    snapshot = metrics_delta(before, process_metrics.snapshot())
+    return {
+        'escenario': name,
+        'pagina': seconds,
+        'etapas': {stage: snapshot['stages'].get(stage, {'calls': 0, 'seconds': 0.0}) for stage in FUNCTION_STAGES},
+        'secciones': {stage: snapshot['stages'].get(stage, {'seconds': 0.0})['seconds'] for stage in SECTION_STAGES},
+        'api': sum(n for event, n in snapshot['counters'].items() if event.startswith('api.')),
+        'errores_429': fake.errors - errors_before,
+        'errores': [e.value for e in at.error],
+    }
+
+
+def run_scale(args):
+    """Escenarios de una escala (en el proceso hijo); devuelve la lista de resultados."""
+    from streamlit.testing.v1 import AppTest
+
+    from benchmarks.fake_gspread import FakeClient, install
+
+    fake = FakeClient(sheets=args.sheets, rows=args.rows, latency=args.latency, error_rate=args.error_rate,
+                      quota_per_minute=args.quota, seed=args.seed)
+    with install(fake):
+        at = AppTest.from_file(str(APP), default_timeout=args.timeout)
+        at.secrets['gcp_service_account'] = SECRETS
+
+        results = [measure(at, 'carga inicial', fake)]
+
+        next(c for c in at.sidebar.checkbox if c.label == "Elegir rango de fechas").check()
+        at.run()
+        today = date.today()
+        at.sidebar.date_input[0].set_value((today - timedelta(days=args.sheets - 1), today))
+        results.append(measure(at, 'todas las hojas', fake))
+        results.append(measure(at, 'recarga', fake))
+
+        at.text_input[0].input(args.hotel)
+        results.append(measure(at, 'búsqueda', fake))
+
+        hojas = next(s for s in at.selectbox if s.label.startswith("📋"))
+        hojas.set_value(next(o for o in hojas.options if o != hojas.value))
+        results.append(measure(at, 'cambio de hoja', fake))
+    return results
+
+
+def run_child(args, sheets):
+    command = [
+        sys.executable, '-m', 'benchmarks.bench_app', '--child', '--sheets', str(sheets),
+        '--rows', str(args.rows), '--latency', str(args.latency), '--error-rate', str(args.error_rate),
+        '--seed', str(args.seed), '--hotel', args.hotel, '--timeout', str(args.timeout),
+    ]
+    if args.quota:
+        command += ['--quota', str(args.quota)]
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        env = {
+            **os.environ,
+            'HOTEL_PRICES_CACHE_DIR': cache_dir,
+            # Sin --quota el límite lo pone solo el backend falso (ninguno por defecto)
+            'HOTEL_PRICES_READ_QUOTA': str(args.quota or 1_000_000),
+        }
+        process = subprocess.run(command, cwd=ROOT, env=env, capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"{sheets} hojas:\n{process.stderr[-3000:]}")
+    return json.loads(process.stdout.strip().splitlines()[-1])
+
+
+def print_results(sheets, results):
+    print(f"\n{sheets} hojas")
+    print(f"{'escenario':<18}{'página ms':>11}{'búsqueda ms':>13}{'top 10 ms':>12}"
+          f"{'detect_columns':>17}{'API':>6}{'429':>6}   ms por sección (búsqueda / hoja / top)")
+    for r in results:
+        search, top, detect = (r['etapas'][stage] for stage in FUNCTION_STAGES)
+        print(
+            f"{r['escenario']:<18}{r['pagina'] * 1000:>11,.0f}{search['seconds'] * 1000:>13,.0f}"
+            f"{top['seconds'] * 1000:>12,.0f}{detect['seconds'] * 1000:>10,.1f} ({detect['calls']:>3})"
+            f"{r['api']:>6}{r['errores_429']:>6}   "
+            + " / ".join(f"{r['secciones'][stage] * 1000:,.0f}" for stage in SECTION_STAGES)
+        )
+        for error in r['errores']:
+            print(f"    error en la página: {error}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[10, 100, 1000], help="hojas por ciudad")
+    parser.add_argument('--rows', type=int, default=50, help="hoteles por hoja")
+    parser.add_argument('--latency', type=float, default=0.0, help="segundos promedio por llamada a la API")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="probabilidad de responder 429")
+    parser.add_argument('--quota', type=int, default=None, help="llamadas por minuto antes de responder 429")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--hotel', default="hilton", help="texto de la búsqueda")
+    parser.add_argument('--timeout', type=float, default=900, help="segundos máximos por ejecución de la página")
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--sheets', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(run_scale(args), ensure_ascii=False))
+        return
+
+    for sheets in args.scales:
+        print_results(sheets, run_child(args, sheets))
+
+
+if __name__ == '__main__':
+    main()
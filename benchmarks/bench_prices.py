@@ -0,0 +1,79 @@
+"""
+Rendimiento de normalize_prices sobre columnas de millones de celdas.
+
+Uso (desde la raíz del repositorio):
+    python -m benchmarks.bench_prices --cells 2000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from price_normalizer import normalize_prices
+
+# Formatos de precio que aparecen en las hojas (coma de miles, coma decimal, moneda, rangos)
+FORMATS = [
+    lambda v: f"{v:,.2f}",
+    lambda v: f"${v:,.0f}",
+    lambda v: f"{v:,.0f} MXN",
+    lambda v: f"{v:.2f}",
+    lambda v: f"{int(v)} - {int(v) + 200}",
+    lambda v: int(v),
+]
+
+FORMATS_COMMA_DECIMAL = [
+    lambda v: f"{v:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.'),
+    lambda v: f"$ {v:,.0f}".replace(',', '.'),
+]
+
+
+def make_column(cells, unique_values, formats, seed=0):
+    rng = np.random.default_rng(seed)
+    values = np.round(rng.uniform(500, 9000, unique_values), 2)
+    pool = [formats[i % len(formats)](v) for i, v in enumerate(values)]
+    pool += ["", "N/A", None]
+    picks = rng.integers(0, len(pool), cells)
+    return pd.Series(np.array(pool, dtype=object)[picks])
+
+
+def timed(fn, column, repeat):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(column)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def legacy_parse(column):
+    cleaned = column.astype(str).str.replace(r'[^\d.]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cells', type=int, default=2_000_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    cases = [
+        ("mixto, 5k valores distintos", make_column(args.cells, 5_000, FORMATS)),
+        ("coma decimal, 5k valores distintos", make_column(args.cells, 5_000, FORMATS_COMMA_DECIMAL)),
+        ("mixto, todos distintos", make_column(args.cells, args.cells, FORMATS)),
+        ("numérico", pd.Series(np.random.default_rng(1).uniform(500, 9000, args.cells))),
+    ]
+
+    print(f"{'caso':<38}{'normalize_prices':>20}{'limpieza anterior':>20}")
+    for name, column in cases:
+        seconds, parsed = timed(normalize_prices, column, args.repeat)
+        legacy_seconds, _ = timed(legacy_parse, column, args.repeat)
+        print(
+            f"{name:<38}{args.cells / seconds / 1e6:>14.2f} M/s"
+            f"{args.cells / legacy_seconds / 1e6:>14.2f} M/s"
+            f"   ({parsed.notna().mean():.1%} con precio)"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,283 @@
+"""
+Backend falso de gspread para medir la app sin credenciales ni red.
+
+Imita lo que usa la app del cliente, el spreadsheet y las hojas (open_by_key,
+worksheets, get_all_records, title, fetch_sheet_metadata, values_batch_get)
+sobre ciudades sintéticas: una hoja por día con encabezados que cambian con
+el tiempo, precios en formatos mezclados, latencia y errores 429 inyectados.
+
+Uso:
+    client = FakeClient(sheets=100, rows=60, latency=0.05, error_rate=0.02)
+    with install(client):
+        ...   # gspread.authorize(...) devuelve client
+"""
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import date, timedelta
+from unittest import mock
+
+from gspread.exceptions import APIError
+
+# Encabezados que usan las hojas; una ciudad pasa por ellos en bloques de fechas
+# (columnas en otro orden, otros nombres y columnas numéricas que no son el precio)
+HEADER_VARIANTS = [
+    ('Fecha', 'Nombre Hotel', 'Zona', 'Precio'),
+    ('Hotel', 'Ubicación', 'Estrellas', 'Precio por noche'),
+    ('Establecimiento', 'Zona', 'Costo (MXN)'),
+    ('Property name', 'Stars', 'Price', 'Currency'),
+]
+
+CHAINS = [
+    'Fiesta Inn', 'Holiday Inn', 'Hilton Garden Inn', 'Hilton', 'Marriott', 'City Express',
+    'One', 'Hyatt Regency', 'Best Western', 'Hampton Inn', 'Camino Real', 'Courtyard',
+]
+NAMES = ['Casa Azul', 'Posada del Sol', 'Gran Hotel', 'Hacienda', 'Boutique 1910', 'Mesón', 'Real Colonial']
+ZONES = ['Centro', 'Norte', 'Aeropuerto', 'Plaza', 'Poniente', 'Oriente']
+
+# Formatos de precio (punto decimal y coma decimal) y celdas sin precio
+PRICE_FORMATS = [
+    lambda v: f"${v:,.0f}",
+    lambda v: f"{v:,.2f}",
+    lambda v: f"MXN {v:,.0f}",
+    lambda v: f"{v:.0f}",
+    lambda v: f"{v:.2f} MXN",
+    lambda v: f"${v - v % 100:,.0f} - ${v - v % 100 + 200:,.0f}",
+]
+PRICE_FORMATS_COMMA_DECIMAL = [
+    lambda v: f"${v:,.0f}".replace(',', '.'),
+    lambda v: f"{v:,.2f}".replace(',', ' ').replace('.', ',').replace(' ', '.'),
+    lambda v: f"{v:,.2f} MXN".replace(',', ' ').replace('.', ',').replace(' ', '.'),
+]
+MISSING_PRICES = ['', 'N/A', 'Agotado', '-']
+
+
+def _response(status, message):
+    """Respuesta HTTP mínima para construir un APIError como lo hace gspread."""
+    response = mock.Mock()
+    response.status_code = status
+    response.text = message
+    response.json.return_value = {'error': {'code': status, 'message': message, 'status': 'RESOURCE_EXHAUSTED'}}
+    return response
+
+
+def _numericise(value):
+    # Misma conversión que hace get_all_records con los textos
+    if value == "" or not isinstance(value, str) or "_" in value:
+        return value
+    for cast in (int, float):
+        try:
+            return cast(value)
+        except ValueError:
+            pass
+    return value
+
+
+def _column_index(letters):
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - ord('A') + 1
+    return index - 1
+
+
+# "'Hoja''s'!B2:C" -> (título, primera fila, última fila, primera columna, última columna)
+_A1 = re.compile(r"^'((?:[^']|'')*)'(?:!([A-Z]*)(\d*)(?::([A-Z]*)(\d*))?)?$")
+
+
+def parse_range(a1):
+    match = _A1.match(a1)
+    if not match:
+        raise ValueError(f"Rango no soportado: {a1}")
+    title, col1, row1, col2, row2 = match.groups()
+    title = title.replace("''", "'")
+    if col2 is None and row2 is None:
+        col2, row2 = col1, row1
+    first_row = int(row1) - 1 if row1 else 0
+    last_row = int(row2) if row2 else None
+    first_col = _column_index(col1) if col1 else 0
+    last_col = _column_index(col2) + 1 if col2 else None
+    return title, first_row, last_row, first_col, last_col
+
+
+def synthetic_city(name, sheets=30, rows=50, seed=0, end=None, header_variants=True,
+                   messy_prices=True, comma_decimal_ratio=0.2, missing_ratio=0.03):
+    """
+    Hojas de una ciudad sintética: {título: filas (la primera son los encabezados)}.
+    Una hoja por día terminando en `end` (hoy); cada hoja lista `rows` hoteles de
+    un catálogo de la ciudad con precios que varían día a día alrededor de su base.
+    """
+    rng = random.Random(f"{name}-{seed}")
+    end = end or date.today()
+
+    pool_size = max(rows + rows // 2, 10)
+    catalog = []
+    for i in range(pool_size):
+        brand = CHAINS[i % len(CHAINS)] if i % 3 else NAMES[i % len(NAMES)]
+        catalog.append((f"{brand} {name} {ZONES[i % len(ZONES)]}", ZONES[i % len(ZONES)],
+                        rng.randint(2, 5), rng.uniform(600, 6000)))
+
+    grids = {}
+    for i in range(sheets):
+        day = end - timedelta(days=sheets - 1 - i)
+        variant = HEADER_VARIANTS[(i * len(HEADER_VARIANTS)) // sheets] if header_variants else HEADER_VARIANTS[0]
+        formats = PRICE_FORMATS
+        if messy_prices and rng.random() < comma_decimal_ratio:
+            formats = PRICE_FORMATS_COMMA_DECIMAL
+        weekend = 1.1 if day.weekday() >= 4 else 1.0
+
+        grid = [list(variant)]
+        for hotel, zone, stars, base in rng.sample(catalog, min(rows, len(catalog))):
+            price = base * weekend * rng.uniform(0.92, 1.08)
+            if not messy_prices:
+                cell = f"{price:.0f}"
+            elif rng.random() < missing_ratio:
+                cell = rng.choice(MISSING_PRICES)
+            else:
+                cell = rng.choice(formats)(price)
+            values = {
+                'Fecha': day.strftime('%d/%m/%Y'), 'Nombre Hotel': hotel, 'Hotel': hotel,
+                'Establecimiento': hotel, 'Property name': hotel, 'Zona': zone, 'Ubicación': zone,
+                'Estrellas': str(stars), 'Stars': str(stars), 'Currency': 'MXN',
+            }
+            grid.append([cell if column not in values else values[column] for column in variant])
+        grids[day.strftime('%d-%m-%Y')] = grid
+    return grids
+
+
+class FakeWorksheet:
+    def __init__(self, spreadsheet, sheet_id, title, grid):
+        self.spreadsheet = spreadsheet
+        self.id = sheet_id
+        self.title = title
+        self._grid = grid
+
+    @property
+    def row_count(self):
+        return max(1000, len(self._grid))
+
+    @property
+    def col_count(self):
+        return max(26, max((len(row) for row in self._grid), default=0))
+
+    def get_all_values(self):
+        self.spreadsheet.client.api_call('get_all_values')
+        return [list(row) for row in self._grid]
+
+    def get_all_records(self):
+        self.spreadsheet.client.api_call('get_all_records')
+        if not self._grid:
+            return []
+        header = self._grid[0]
+        return [
+            dict(zip(header, [_numericise(v) for v in row] + [""] * (len(header) - len(row))))
+            for row in self._grid[1:]
+        ]
+
+
+class FakeSpreadsheet:
+    def __init__(self, client, key, grids):
+        self.client = client
+        self.id = key
+        self.title = f"Precios {key[:8]}"
+        self._worksheets = [FakeWorksheet(self, i, title, grid) for i, (title, grid) in enumerate(grids.items())]
+        self._by_title = {ws.title: ws for ws in self._worksheets}
+
+    @property
+    def sheet1(self):
+        return self._worksheets[0]
+
+    def worksheets(self):
+        self.client.api_call('worksheets')
+        return list(self._worksheets)
+
+    def worksheet(self, title):
+        self.client.api_call('worksheet')
+        return self._by_title[title]
+
+    def fetch_sheet_metadata(self, params=None):
+        self.client.api_call('fetch_sheet_metadata')
+        return {'sheets': [
+            {'properties': {'sheetId': ws.id, 'title': ws.title,
+                            'gridProperties': {'rowCount': ws.row_count, 'columnCount': ws.col_count}}}
+            for ws in self._worksheets
+        ]}
+
+    def values_batch_get(self, ranges, params=None):
+        self.client.api_call('values_batch_get')
+        value_ranges = []
+        for a1 in ranges:
+            title, first_row, last_row, first_col, last_col = parse_range(a1)
+            values = [
+                list(row[first_col:last_col]) for row in self._by_title[title]._grid[first_row:last_row]
+            ]
+            # Como la API: sin celdas vacías al final de cada fila ni filas vacías al final
+            for row in values:
+                while row and row[-1] == "":
+                    row.pop()
+            while values and not values[-1]:
+                values.pop()
+            value_ranges.append({'range': a1, 'majorDimension': 'ROWS', 'values': values})
+        return {'valueRanges': value_ranges}
+
+
+class FakeClient:
+    """
+    Cliente falso: open_by_key genera (una vez) una ciudad sintética para cualquier id.
+    latency son los segundos promedio de cada llamada; error_rate la probabilidad
+    de responder 429 y quota_per_minute, si se indica, el límite de llamadas por
+    minuto antes de responder 429 como la cuota real de Google Sheets.
+    """
+
+    def __init__(self, sheets=30, rows=50, latency=0.0, error_rate=0.0, quota_per_minute=None,
+                 seed=0, **city_options):
+        self.sheets = sheets
+        self.rows = rows
+        self.latency = latency
+        self.error_rate = error_rate
+        self.quota_per_minute = quota_per_minute
+        self.seed = seed
+        self.city_options = city_options
+        self.calls = Counter()
+        self.errors = 0
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self._recent = deque()
+        self._spreadsheets = {}
+
+    def api_call(self, kind):
+        """Cuenta la llamada, espera la latencia y responde 429 si toca."""
+        with self._lock:
+            self.calls[kind] += 1
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] > 60:
+                self._recent.popleft()
+            self._recent.append(now)
+            over_quota = self.quota_per_minute is not None and len(self._recent) > self.quota_per_minute
+            throttled = over_quota or self._rng.random() < self.error_rate
+            delay = self.latency * self._rng.uniform(0.5, 1.5)
+            if throttled:
+                self.errors += 1
+        if delay:
+            time.sleep(delay)
+        if throttled:
+            raise APIError(_response(429, "Quota exceeded for quota metric 'Read requests'"))
+
+    def open_by_key(self, key):
+        self.api_call('open_by_key')
+        with self._lock:
+            if key not in self._spreadsheets:
+                grids = synthetic_city(key[:6], self.sheets, self.rows, self.seed, **self.city_options)
+                self._spreadsheets[key] = FakeSpreadsheet(self, key, grids)
+            return self._spreadsheets[key]
+
+
+@contextmanager
+def install(client):
+    """Hace que la app obtenga `client` al autenticarse (sin leer credenciales reales)."""
+    with mock.patch('gspread.authorize', lambda *args, **kwargs: client), \
+            mock.patch('google.oauth2.service_account.Credentials.from_service_account_info',
+                       lambda *args, **kwargs: object()):
+        yield client
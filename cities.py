@@ -0,0 +1,28 @@
+import json
+import os
+
+# IDs de las hojas de cálculo de cada ciudad
+SHEET_IDS = {
+    "Mérida": "13tPaaJCX4o4HkxrRdPiuc5NDP3XhrJuvKdq83Eh7-KU",
+#    "Celaya": "1Q-3PabplfrLc5V4vLwbZc_t2qW7cpoygnQXHNLSD9XY",
+    "Tuxtla": "1Stux8hR4IlZ879gL7TRbz3uKzputDVwR362VINUr5Ho",
+#    "Mazatlan": "1-3vPaXamO4m6pNXIsPAO0ttrvnJmx9a9yAVhtY8_2Lk"
+}
+
+# Ventana de análisis por defecto: últimos 30 días
+ANALYSIS_DAYS = 30
+
+# Ciudades que se leen de una exportación local en lugar de su spreadsheet: ruta a una
+# carpeta con un archivo CSV/Parquet por día o a un SQLite con una tabla por día
+# ("sheets" fuerza Google Sheets). También como JSON en HOTEL_PRICES_DATA_SOURCES.
+DATA_SOURCES = json.loads(os.environ.get("HOTEL_PRICES_DATA_SOURCES", "{}"))
+
+# Carpeta donde se buscan exportaciones de las ciudades sin origen configurado
+# (<Ciudad>.sqlite / .db o una carpeta <Ciudad>/); vacío = solo Google Sheets
+LOCAL_DATA_DIR = os.environ.get("HOTEL_PRICES_LOCAL_DATA_DIR", "")
+
+# Carpeta donde scraper.py guarda los precios capturados (<Ciudad>/<AAAA-MM-DD> capturado.parquet);
+# se leen como hojas extra de cada ciudad, junto a las de su origen de datos
+SCRAPED_DATA_DIR = os.environ.get(
+    "HOTEL_PRICES_SCRAPER_DIR", os.path.join(os.environ.get("HOTEL_PRICES_CACHE_DIR", ".cache"), "capturados")
+)
@@ -0,0 +1,169 @@
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cities import ANALYSIS_DAYS, SHEET_IDS
+from city_reports import TOP_N, build_city_report
+from instrumentation import in_current_run, timed
+from memory_manager import object_bytes
+from ranking import top_hotels
+from search_index import normalize_name
+
+# Cadenas hoteleras que se comparan entre ciudades. Se busca la más específica
+# primero ("Hilton Garden Inn" antes que "Hilton"); el nombre se compara sin acentos ni mayúsculas
+CHAINS = [
+    'Hilton Garden Inn', 'Hampton Inn', 'Hilton', 'DoubleTree', 'Fiesta Inn', 'Fiesta Americana',
+    'Gamma', 'One', 'Holiday Inn Express', 'Holiday Inn', 'Crowne Plaza', 'InterContinental',
+    'Courtyard', 'Fairfield Inn', 'Marriott', 'City Express', 'Hyatt Regency', 'Hyatt Place', 'Hyatt',
+    'Best Western', 'Camino Real', 'Wyndham', 'Ramada', 'Comfort Inn', 'Sheraton', 'Ibis',
+    'NH', 'Real Inn', 'Misión', 'Casa Inn',
+]
+
+# Cadenas cuyo nombre también es una palabra común ("One", "NH", "Gamma", "Misión"...):
+# solo cuentan al inicio del nombre, después de "Hotel" si lo tiene ("One Mérida Centro"
+# sí, "Hotel Number One" no)
+CHAINS_AT_START = {'Gamma', 'One', 'NH', 'Real Inn', 'Misión', 'Casa Inn', 'Camino Real'}
+
+# Bandas del histograma de precios que comparten todas las ciudades
+DISTRIBUTION_BINS = 20
+
+
+# Patrones de las cadenas (nombre completo como palabras, la más larga primero)
+_CHAIN_PATTERNS = [
+    (chain, re.compile(
+        (r"^(?:hotel(?:es)? )?" if chain in CHAINS_AT_START else r"\b") + rf"{re.escape(normalize_name(chain))}\b"
+    ))
+    for chain in sorted(CHAINS, key=lambda chain: -len(chain))
+]
+
+
+def hotel_chain(name):
+    """Cadena de un hotel por su nombre (None si no es de ninguna cadena conocida)."""
+    normalized = normalize_name(name)
+    for chain, pattern in _CHAIN_PATTERNS:
+        if pattern.search(normalized):
+            return chain
+    return None
+
+
+@timed()
+def load_cities(client, cities=None, window=None, store=None, registry=None, workers=None):
+    """
+    Reportes de varias ciudades a la vez (un hilo por ciudad; las descargas comparten
+    el scheduler y el límite de la cuota), así la espera total es la de la ciudad más lenta.
+    cities: {ciudad: spreadsheet_id}. Devuelve ({ciudad: CityReport}, {ciudad: excepción},
+    {ciudad: segundos}).
+    """
+    cities = cities or SHEET_IDS
+    window = window or {'days': ANALYSIS_DAYS}
+
+    def load(ciudad, spreadsheet_id):
+        start = time.perf_counter()
+        report = build_city_report(client, ciudad, spreadsheet_id, window.get('days', ANALYSIS_DAYS),
+                                   store, registry, window)
+        return report, time.perf_counter() - start
+
+    reports = {}
+    failures = {}
+    seconds = {}
+    with ThreadPoolExecutor(max_workers=workers or max(1, len(cities))) as pool:
+        futures = {
+            ciudad: pool.submit(in_current_run(load), ciudad, spreadsheet_id) for ciudad, spreadsheet_id in cities.items()
+        }
+        for ciudad, future in futures.items():
+            try:
+                reports[ciudad], seconds[ciudad] = future.result()
+            except Exception as e:
+                failures[ciudad] = e
+    return reports, failures, seconds
+
+
+class CityComparison:
+    """
+    Comparación entre ciudades a partir de sus reportes (ranking por hotel y serie
+    de precios de la ventana): tops lado a lado, distribución de precios y precio
+    de cada cadena en cada ciudad. Las tablas se arman con una sola agregación
+    sobre las filas de todas las ciudades juntas.
+    """
+
+    def __init__(self, reports, failures=None, seconds=None, elapsed=None):
+        self.reports = reports
+        self.failures = failures or {}
+        self.seconds = seconds or {}
+        self.elapsed = elapsed
+        self.cities = list(reports)
+        self.rankings = pd.concat(
+            [report.ranking.assign(ciudad=ciudad) for ciudad, report in reports.items()], ignore_index=True
+        ) if reports else pd.DataFrame(columns=['ciudad', 'hotel', 'precio_promedio', 'muestras'])
+        self.prices = pd.concat(
+            [report.series.assign(ciudad=ciudad) for ciudad, report in reports.items()], ignore_index=True
+        ) if reports else pd.DataFrame(columns=['ciudad', 'hotel', 'fecha_hoja', 'precio'])
+
+    @classmethod
+    def load(cls, client, cities=None, window=None, store=None, registry=None, workers=None):
+        start = time.perf_counter()
+        reports, failures, seconds = load_cities(client, cities, window, store, registry, workers)
+        return cls(reports, failures, seconds, time.perf_counter() - start)
+
+    @property
+    def nbytes(self):
+        return object_bytes(self.rankings) + object_bytes(self.prices)
+
+    def tops(self, top_type="min", n=TOP_N):
+        """{ciudad: DataFrame del top n} para mostrarlos lado a lado."""
+        return {
+            ciudad: pd.DataFrame(top_hotels(report.ranking, top_type, n), columns=report.ranking.columns)
+            for ciudad, report in self.reports.items()
+        }
+
+    def city_summary(self):
+        """Por ciudad: hoteles, precios, promedio, percentiles 10/50/90, mínimo y máximo de la ventana."""
+        if self.prices.empty:
+            return pd.DataFrame()
+        grouped = self.prices.groupby('ciudad', sort=False)['precio']
+        summary = grouped.agg(precios='size', promedio='mean', minimo='min', maximo='max')
+        quantiles = grouped.quantile([0.1, 0.5, 0.9]).unstack()
+        summary['p10'], summary['mediana'], summary['p90'] = quantiles[0.1], quantiles[0.5], quantiles[0.9]
+        summary.insert(0, 'hoteles', self.prices.groupby('ciudad', sort=False)['hotel'].nunique())
+        return summary.reindex(self.cities)
+
+    def distributions(self, bins=DISTRIBUTION_BINS):
+        """
+        Fracción de los precios de cada ciudad en cada banda (mismas bandas para todas):
+        DataFrame con una fila por banda (desde) y una columna por ciudad.
+        """
+        if self.prices.empty:
+            return pd.DataFrame()
+        precios = self.prices['precio'].to_numpy(dtype='float64')
+        edges = np.histogram_bin_edges(precios, bins=bins)
+        band = np.clip(np.searchsorted(edges, precios, side='right') - 1, 0, len(edges) - 2)
+        counts = pd.crosstab(pd.Series(edges[band], name='desde'), self.prices['ciudad'].to_numpy())
+        counts = counts.reindex(index=edges[:-1], columns=self.cities, fill_value=0)
+        counts.index = counts.index.round(0)
+        return counts / counts.sum().replace(0, np.nan)
+
+    def chains(self, min_cities=2):
+        """
+        Precio promedio de cada cadena en cada ciudad (promedio de todos sus precios)
+        y hoteles de la cadena, solo para las cadenas presentes en al menos min_cities ciudades.
+        Devuelve (precios: cadena × ciudad, hoteles: cadena × ciudad).
+        """
+        ranking = self.rankings
+        if ranking.empty:
+            return pd.DataFrame(), pd.DataFrame()
+        names = ranking['hotel'].astype(str).unique()
+        chains = ranking['hotel'].astype(str).map(dict(zip(names, map(hotel_chain, names))))
+        ranking = ranking.assign(cadena=chains, suma=ranking['precio_promedio'] * ranking['muestras']).dropna(
+            subset=['cadena']
+        )
+        grouped = ranking.groupby(['cadena', 'ciudad'])
+        prices = (grouped['suma'].sum() / grouped['muestras'].sum()).unstack()
+        hotels = grouped['hotel'].nunique().unstack()
+        keep = prices.notna().sum(axis=1) >= min_cities
+        prices = prices[keep].reindex(columns=self.cities)
+        hotels = hotels[keep].reindex(columns=self.cities).fillna(0).astype('int64')
+        order = prices.mean(axis=1).sort_values().index
+        return prices.loc[order], hotels.loc[order]
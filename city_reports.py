@@ -0,0 +1,298 @@
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+import pandas as pd
+
+from cities import ANALYSIS_DAYS, SHEET_IDS
+from data_sources import local_source_path, open_source
+from fact_table import PriceFactTable
+from instrumentation import count, export_metrics, in_current_run, timed
+from memory_manager import object_bytes
+from price_matrix import PriceMatrix
+from ranking import SlidingWindowAggregate, top_hotels
+from schema_registry import SchemaRegistry, detect_columns
+from sheet_catalog import WorksheetCatalog
+from sheets_api import authorize
+from snapshot_store import DEFAULT_CACHE_DIR, VOLATILE_MAX_AGE, SnapshotStore, atomic_write
+
+# Carpeta de los reportes precalculados (una subcarpeta por spreadsheet y ventana)
+REPORTS_DIR = os.environ.get("HOTEL_PRICES_REPORTS_DIR", str(Path(DEFAULT_CACHE_DIR) / "reports"))
+
+# Segundos que un reporte se considera vigente (además de cubrir las mismas hojas)
+REPORT_MAX_AGE = int(os.environ.get("HOTEL_PRICES_REPORT_MAX_AGE", str(12 * 60 * 60)))
+
+REPORT_FORMATS = ('parquet', 'csv')
+TOP_N = 10
+
+MANIFEST = "manifest.json"
+
+
+# Versión de cada hoja de la ventana: si cambia alguna (tamaño o versión) el reporte ya no vale
+def sheet_versions(entries):
+    return [[entry.get('sheet_id'), entry.get('row_count'), entry.get('col_count'), entry.get('version')]
+            for entry in entries]
+
+
+def report_dir(spreadsheet_id, days, root=None):
+    return Path(root or REPORTS_DIR) / spreadsheet_id / f"dias_{days}"
+
+
+def _write_table(df, path, fmt):
+    if fmt == 'parquet':
+        atomic_write(path, lambda tmp: df.to_parquet(tmp, index=False))
+    else:
+        atomic_write(path, lambda tmp: df.to_csv(tmp, index=False))
+
+
+def _read_table(directory, name, parse_dates=None):
+    parquet = directory / f"{name}.parquet"
+    if parquet.exists():
+        return pd.read_parquet(parquet)
+    return pd.read_csv(directory / f"{name}.csv", parse_dates=parse_dates)
+
+
+class CityReport:
+    """
+    Resultados precalculados de una ciudad para los últimos `days` días: ranking
+    por hotel (estadísticas), top de menor y mayor precio y la serie de precios
+    (hotel, fecha_hoja, precio) de la que se arma la PriceMatrix.
+    manifest: ciudad, spreadsheet_id, días, hojas incluidas (y su versión), selección
+    manual de columnas, hojas con error, si incluye la hoja más reciente y momento de generación.
+    """
+
+    TABLES = ('ranking', 'top_menor', 'top_mayor', 'series')
+
+    def __init__(self, manifest, ranking, series):
+        self.manifest = manifest
+        self.ranking = ranking
+        self.series = series
+
+    @property
+    def top_menor(self):
+        return pd.DataFrame(top_hotels(self.ranking, "min", TOP_N))
+
+    @property
+    def top_mayor(self):
+        return pd.DataFrame(top_hotels(self.ranking, "max", TOP_N))
+
+    @property
+    def nbytes(self):
+        return object_bytes(self.ranking) + object_bytes(self.series)
+
+    @property
+    def generated_at(self):
+        return self.manifest['generated_at']
+
+    def matrix(self):
+        return PriceMatrix.from_rows(self.series)
+
+    def is_fresh(self, entries, override=None, max_age=REPORT_MAX_AGE, now=None):
+        """
+        Vigente si no tuvo hojas con error, cubre exactamente esas hojas (entradas de
+        la ventana) en la misma versión, con la misma selección manual, y no venció.
+        Si incluye la hoja más reciente, que puede seguir editándose, vence a los
+        VOLATILE_MAX_AGE segundos como su copia local.
+        """
+        now = time.time() if now is None else now
+        if self.manifest.get('volatile'):
+            max_age = min(max_age, VOLATILE_MAX_AGE)
+        return (
+            now - self.generated_at <= max_age
+            and not self.manifest.get('failed')
+            and self.manifest['titles'] == [entry['title'] for entry in entries]
+            and self.manifest.get('sheets') == sheet_versions(entries)
+            and self.manifest['override'] == (list(override) if override else None)
+        )
+
+    def write(self, directory, formats=REPORT_FORMATS):
+        """Escribe las tablas y al final el manifest (quien lee el manifest encuentra las tablas)."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in self.TABLES:
+            for fmt in formats:
+                _write_table(getattr(self, name), directory / f"{name}.{fmt}", fmt)
+        text = json.dumps(self.manifest, ensure_ascii=False, indent=1, default=str)
+        atomic_write(directory / MANIFEST, lambda tmp: Path(tmp).write_text(text, encoding="utf-8"))
+
+    @classmethod
+    def read(cls, directory):
+        directory = Path(directory)
+        manifest = json.loads((directory / MANIFEST).read_text(encoding="utf-8"))
+        ranking = _read_table(directory, 'ranking')
+        series = _read_table(directory, 'series', parse_dates=['fecha_hoja'])
+        return cls(manifest, ranking, series)
+
+
+def load_report(spreadsheet_id, days, root=None):
+    """Reporte guardado de un spreadsheet y ventana; None si no existe o no se puede leer."""
+    try:
+        return CityReport.read(report_dir(spreadsheet_id, days, root))
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+@timed()
+def build_city_report(client, ciudad, spreadsheet_id, days=ANALYSIS_DAYS, store=None, registry=None, window=None):
+    """
+    Sincroniza la copia local de las hojas de la ventana y calcula el reporte
+    con las mismas piezas que usa la app (resúmenes por hoja, agregado de la
+    ventana, tabla consolidada y matriz de precios), sin Streamlit.
+    window: ventana de análisis como en la app ({'days': n} o {'start', 'end'});
+    por defecto, los últimos `days` días.
+    """
+    store = store or SnapshotStore()
+    registry = registry or SchemaRegistry()
+
+    source = open_source(client, ciudad, spreadsheet_id)
+    sheets = source.list_sheets()
+    catalog = WorksheetCatalog(store.entries(spreadsheet_id, sheets))
+    latest = catalog.latest()
+    window = catalog.window(**(window or {'days': days}))
+
+    entries, failures = store.sync(
+        source,
+        detect=lambda df: registry.resolve(df, detect_columns, spreadsheet_id),
+        sheets=sheets,
+        titles=[entry['title'] for entry, _ in window],
+        volatile_titles=[latest['title']] if latest else [],
+        known_layout=lambda header: registry.lookup_header(header, spreadsheet_id),
+        override=registry.override_for(spreadsheet_id)
+    )
+    by_id = {entry['sheet_id']: entry for entry in entries}
+    window = [(by_id.get(entry['sheet_id'], entry), fecha) for entry, fecha in window]
+    entries = {entry['title']: entry for entry, _ in window}
+    override = registry.override_for(spreadsheet_id)
+    failed = [(title, error) for title, error in failures.items()]
+
+    def columns(entry):
+        return lambda df: registry.sheet_columns(spreadsheet_id, entry, df)
+
+    def load_summary(title):
+        try:
+            return store.summary_for(spreadsheet_id, entries[title], columns(entries[title]), override)
+        except Exception as e:
+            failed.append((title, e))
+            return None
+
+    aggregate = SlidingWindowAggregate()
+    aggregate.update([(entry['title'], None) for entry, _ in window], load_summary)
+    ranking = aggregate.ranking()
+
+    def load(entry):
+        df = store.load(spreadsheet_id, entry)
+        if df is None or df.empty:
+            return df, None, None
+        hotel_col, price_col = columns(entry)(df)
+        return df, hotel_col, price_col
+
+    fact_table = PriceFactTable()
+    failed += fact_table.sync_city(ciudad, [(entry, fecha) for entry, fecha in window if entry.get('file')], load)
+    rows = fact_table.city_rows(ciudad, list(entries))
+    series = PriceMatrix.from_rows(rows).to_rows()
+
+    manifest = {
+        'ciudad': ciudad,
+        'spreadsheet_id': spreadsheet_id,
+        'days': days,
+        'titles': list(entries),
+        'sheets': sheet_versions(entries.values()),
+        'override': list(override) if override else None,
+        'failed': {title: str(error) for title, error in failed},
+        'volatile': bool(latest) and latest['title'] in entries,
+        'hotels': len(ranking),
+        'generated_at': time.time(),
+    }
+    return CityReport(manifest, ranking, series)
+
+
+# Reportes de varias ciudades en paralelo (un hilo por ciudad; las descargas
+# comparten el scheduler y el límite de la cuota)
+def run_batch(client, cities, days=(ANALYSIS_DAYS,), root=None, formats=REPORT_FORMATS, workers=None):
+    """
+    cities: {ciudad: spreadsheet_id}
+    Devuelve ({(ciudad, días): carpeta del reporte}, {ciudad: excepción}).
+    """
+    registry = SchemaRegistry()
+
+    def process(ciudad, spreadsheet_id):
+        written = {}
+        store = SnapshotStore()
+        for n in days:
+            report = build_city_report(client, ciudad, spreadsheet_id, n, store, registry)
+            directory = report_dir(spreadsheet_id, n, root)
+            report.write(directory, formats)
+            written[(ciudad, n)] = directory
+        return written
+
+    written = {}
+    failures = {}
+    with ThreadPoolExecutor(max_workers=workers or max(1, len(cities))) as pool:
+        futures = {ciudad: pool.submit(in_current_run(process), ciudad, sheet_id) for ciudad, sheet_id in cities.items()}
+        for ciudad, future in futures.items():
+            try:
+                written.update(future.result())
+            except Exception as e:
+                failures[ciudad] = e
+    return written, failures
+
+
+# Datos de la cuenta de servicio: archivo JSON o, si no se indica, los mismos secrets de la app
+def load_credentials(path=None, secrets_path=".streamlit/secrets.toml"):
+    path = path or os.environ.get("GOOGLE_APPLICATION_CREDENTIALS")
+    if path:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+
+    import tomllib
+    with open(secrets_path, "rb") as f:
+        creds_info = dict(tomllib.load(f)["gcp_service_account"])
+    creds_info["private_key"] = creds_info["private_key"].replace('\\n', '\n')
+    return creds_info
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Precalcula el top 10, las estadísticas por hotel y las series de precios de cada ciudad."
+    )
+    parser.add_argument('--cities', nargs='+', choices=list(SHEET_IDS), default=list(SHEET_IDS))
+    parser.add_argument('--days', type=int, nargs='+', default=[ANALYSIS_DAYS], help="ventanas (últimos N días)")
+    parser.add_argument('--output', default=REPORTS_DIR, help="carpeta de los reportes")
+    parser.add_argument('--formats', nargs='+', choices=REPORT_FORMATS, default=list(REPORT_FORMATS))
+    parser.add_argument('--credentials', help="JSON de la cuenta de servicio (por defecto, "
+                                              "GOOGLE_APPLICATION_CREDENTIALS o .streamlit/secrets.toml)")
+    parser.add_argument('--workers', type=int, default=None, help="ciudades en paralelo (por defecto, todas)")
+    args = parser.parse_args(argv)
+
+    cities = {ciudad: SHEET_IDS[ciudad] for ciudad in args.cities}
+    # Las credenciales solo hacen falta si alguna ciudad se lee de Google Sheets
+    client = None
+    if any(local_source_path(ciudad) is None for ciudad in cities):
+        client = authorize(load_credentials(args.credentials))
+    written, failures = run_batch(client, cities, args.days, args.output, args.formats, args.workers)
+
+    for (ciudad, n), directory in sorted(written.items()):
+        report = CityReport.read(directory)
+        print(
+            f"{ciudad} (últimos {n} días): {report.manifest['hotels']} hoteles en "
+            f"{len(report.manifest['titles'])} hojas -> {directory}"
+        )
+        for title, error in report.manifest['failed'].items():
+            print(f"  hoja con error: {title} ({error})")
+    for ciudad, error in failures.items():
+        print(f"{ciudad}: error ({error})", file=sys.stderr)
+
+    try:
+        export_metrics({'origen': 'batch', 'generado': datetime.now().isoformat(timespec='seconds')})
+    except OSError as e:
+        count('excepciones_ignoradas')
+        print(f"no se pudieron guardar las métricas ({e})", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
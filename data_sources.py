@@ -0,0 +1,352 @@
+import csv
+import sqlite3
+import zlib
+from abc import ABC, abstractmethod
+from contextlib import closing
+from pathlib import Path
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from cities import DATA_SOURCES, LOCAL_DATA_DIR, SCRAPED_DATA_DIR
+from fetch_scheduler import default_scheduler
+from instrumentation import timed
+from sheets_api import (count_api_call, fetch_columns_batch, fetch_headers_batch, fetch_sheet_properties,
+                        fetch_titles_batch, values_to_dataframe)
+
+# Archivos de una carpeta local que se leen como hojas (una por día) y extensiones de SQLite
+LOCAL_SUFFIXES = ('.parquet', '.csv')
+SQLITE_SUFFIXES = ('.sqlite', '.sqlite3', '.db')
+
+
+# Id estable de una hoja local a partir de su nombre (como el sheetId de Google Sheets)
+def _stable_id(name):
+    return zlib.crc32(str(name).encode("utf-8"))
+
+
+def _read_each(titles, read):
+    frames = {}
+    failures = {}
+    for title in titles:
+        try:
+            frames[title] = read(title)
+        except Exception as e:
+            failures[title] = e
+    return frames, failures
+
+
+class DataSource(ABC):
+    """
+    Origen de las hojas (una por día) de una ciudad. id es la clave de la ciudad
+    en la copia local y en las cachés (el id de su spreadsheet en SHEET_IDS).
+    list_sheets() devuelve las propiedades de cada hoja como fetch_sheet_properties
+    (sheet_id, title, row_count, col_count y, si el origen la conoce, version);
+    las lecturas devuelven ({título: resultado}, {título: excepción}).
+    Las columnas pedidas que una hoja no tiene se omiten.
+    """
+
+    kind = None
+
+    def __init__(self, source_id):
+        self.id = source_id
+
+    @abstractmethod
+    def describe(self):
+        """Nombre del origen para la interfaz."""
+
+    @abstractmethod
+    def list_sheets(self):
+        """Propiedades de cada hoja."""
+
+    @abstractmethod
+    def read_sheets(self, titles):
+        """Hojas completas como DataFrame (primera fila = encabezados)."""
+
+    def read_headers(self, titles):
+        """Solo los encabezados de cada hoja."""
+        frames, failures = self.read_sheets(titles)
+        return {title: [str(col) for col in df.columns] for title, df in frames.items()}, failures
+
+    def read_columns(self, projections):
+        """projections: {título: [(nombre_columna, índice_columna)]}; DataFrame con esas columnas."""
+        frames, failures = self.read_sheets(list(projections))
+        return {
+            title: df[[name for name, _ in projections[title] if name in df.columns]]
+            for title, df in frames.items()
+        }, failures
+
+
+class GoogleSheetsSource(DataSource):
+    """Spreadsheet de Google Sheets (lecturas en bloque con values_batch_get)."""
+
+    kind = 'sheets'
+
+    def __init__(self, spreadsheet):
+        super().__init__(spreadsheet.id)
+        self.spreadsheet = spreadsheet
+
+    def describe(self):
+        return "Google Sheets"
+
+    def list_sheets(self):
+        return fetch_sheet_properties(self.spreadsheet)
+
+    def read_sheets(self, titles):
+        return fetch_titles_batch(self.spreadsheet, titles)
+
+    def read_headers(self, titles):
+        return fetch_headers_batch(self.spreadsheet, titles)
+
+    def read_columns(self, projections):
+        return fetch_columns_batch(self.spreadsheet, projections)
+
+
+class LocalDirectorySource(DataSource):
+    """
+    Carpeta con un archivo CSV o Parquet por día; el título de la hoja es el nombre
+    del archivo sin extensión (p. ej. 05-03-2024.csv). La versión de cada hoja es
+    la fecha de modificación y el tamaño del archivo, así solo se relee lo que cambió.
+    Los CSV se leen como las hojas de Google Sheets (texto convertido a número si se puede).
+    """
+
+    kind = 'local'
+
+    def __init__(self, directory, source_id):
+        super().__init__(source_id)
+        self.directory = Path(directory)
+        self._paths = {}
+
+    def describe(self):
+        return f"carpeta local {self.directory}"
+
+    def list_sheets(self):
+        sheets = []
+        paths = {}
+        for path in sorted(self.directory.iterdir()):
+            if not path.is_file() or path.suffix.lower() not in LOCAL_SUFFIXES:
+                continue
+            stat = path.stat()
+            paths[path.stem] = path
+            sheets.append({
+                'sheet_id': _stable_id(path.name),
+                'title': path.stem,
+                'row_count': 0,
+                'col_count': 0,
+                'version': f"{stat.st_mtime_ns}-{stat.st_size}",
+            })
+        self._paths = paths
+        return sheets
+
+    def _path(self, title):
+        if title not in self._paths:
+            self.list_sheets()
+        return self._paths[title]
+
+    def _read(self, title, columns=None):
+        path = self._path(title)
+        if path.suffix.lower() == '.parquet':
+            if columns is not None:
+                names = set(pq.read_schema(path).names)
+                columns = [col for col in columns if col in names]
+            return pd.read_parquet(path, columns=columns)
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            df = values_to_dataframe(list(csv.reader(f)))
+        return df if columns is None else df[[col for col in columns if col in df.columns]]
+
+    def read_sheets(self, titles):
+        return _read_each(titles, self._read)
+
+    def read_headers(self, titles):
+        def header(title):
+            path = self._path(title)
+            if path.suffix.lower() == '.parquet':
+                return [str(name) for name in pq.read_schema(path).names]
+            with open(path, newline='', encoding='utf-8-sig') as f:
+                return [str(h) for h in next(csv.reader(f), [])]
+        return _read_each(titles, header)
+
+    def read_columns(self, projections):
+        return _read_each(
+            list(projections), lambda title: self._read(title, list(dict.fromkeys(n for n, _ in projections[title])))
+        )
+
+
+def _quote_identifier(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+class SQLiteSource(DataSource):
+    """
+    Archivo SQLite con una tabla por día (el nombre de la tabla es el título de la hoja).
+    Como en Google Sheets, una hoja se vuelve a leer cuando cambia su tamaño
+    (filas o columnas) o, si es la más reciente, cada cierto tiempo.
+    """
+
+    kind = 'sqlite'
+
+    def __init__(self, path, source_id):
+        super().__init__(source_id)
+        self.path = Path(path)
+
+    def describe(self):
+        return f"SQLite {self.path}"
+
+    def _connect(self):
+        # Solo lectura; una conexión por llamada (las lecturas pueden venir de varios hilos)
+        return closing(sqlite3.connect(f"{self.path.resolve().as_uri()}?mode=ro", uri=True))
+
+    def list_sheets(self):
+        with self._connect() as conn:
+            tables = [row[0] for row in conn.execute(
+                "SELECT name FROM sqlite_master WHERE type = 'table' AND name NOT LIKE 'sqlite_%' ORDER BY name"
+            )]
+            sheets = []
+            for table in tables:
+                rows = conn.execute(f"SELECT COUNT(*) FROM {_quote_identifier(table)}").fetchone()[0]
+                columns = len(conn.execute(f"PRAGMA table_info({_quote_identifier(table)})").fetchall())
+                sheets.append({
+                    'sheet_id': _stable_id(table),
+                    'title': table,
+                    'row_count': rows + 1,
+                    'col_count': columns,
+                })
+        return sheets
+
+    def _query(self, title, columns=None):
+        table = _quote_identifier(title)
+        with self._connect() as conn:
+            if columns is None:
+                return pd.read_sql_query(f"SELECT * FROM {table}", conn)
+            existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+            columns = [col for col in columns if col in existing]
+            if not columns:
+                rows = conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                return pd.DataFrame(index=range(rows))
+            select = ", ".join(_quote_identifier(col) for col in columns)
+            return pd.read_sql_query(f"SELECT {select} FROM {table}", conn)
+
+    def read_sheets(self, titles):
+        return _read_each(titles, self._query)
+
+    def read_headers(self, titles):
+        def header(title):
+            with self._connect() as conn:
+                return [row[1] for row in conn.execute(f"PRAGMA table_info({_quote_identifier(title)})")]
+        return _read_each(titles, header)
+
+    def read_columns(self, projections):
+        return _read_each(
+            list(projections), lambda title: self._query(title, list(dict.fromkeys(n for n, _ in projections[title])))
+        )
+
+
+class CombinedSource(DataSource):
+    """
+    Origen de una ciudad más orígenes locales con hojas extra (los precios capturados
+    por scraper.py): una sola lista de hojas y cada lectura va al origen de su hoja.
+    Si un título se repite gana el del origen principal.
+    """
+
+    def __init__(self, primary, extras):
+        super().__init__(primary.id)
+        self.primary = primary
+        self.extras = list(extras)
+        self.kind = primary.kind
+        self._extra_owners = {}   # título -> origen extra
+
+    def describe(self):
+        return " + ".join(source.describe() for source in [self.primary] + self.extras)
+
+    def _list_extras(self):
+        owners = {}
+        sheets = []
+        for source in self.extras:
+            for props in source.list_sheets():
+                if props['title'] not in owners:
+                    owners[props['title']] = source
+                    sheets.append(props)
+        self._extra_owners = owners
+        return sheets
+
+    def list_sheets(self):
+        sheets = self.primary.list_sheets()
+        titles = {props['title'] for props in sheets}
+        return sheets + [props for props in self._list_extras() if props['title'] not in titles]
+
+    # Títulos agrupados por origen (las hojas extra se listan de nuevo si aparece un título desconocido)
+    def _groups(self, titles):
+        if any(title not in self._extra_owners for title in titles):
+            self._list_extras()
+        groups = {}
+        for title in titles:
+            source = self._extra_owners.get(title, self.primary)
+            groups.setdefault(id(source), (source, []))[1].append(title)
+        return groups.values()
+
+    def _dispatch(self, titles, read):
+        frames = {}
+        failures = {}
+        for source, group in self._groups(titles):
+            group_frames, group_failures = read(source, group)
+            frames.update(group_frames)
+            failures.update(group_failures)
+        return frames, failures
+
+    def read_sheets(self, titles):
+        return self._dispatch(titles, lambda source, group: source.read_sheets(group))
+
+    def read_headers(self, titles):
+        return self._dispatch(titles, lambda source, group: source.read_headers(group))
+
+    def read_columns(self, projections):
+        return self._dispatch(
+            list(projections),
+            lambda source, group: source.read_columns({title: projections[title] for title in group})
+        )
+
+
+# Carpeta con los precios capturados de una ciudad (scraper.py); None si no hay
+def scraped_source_path(ciudad):
+    if not SCRAPED_DATA_DIR:
+        return None
+    path = Path(SCRAPED_DATA_DIR) / ciudad
+    return path if path.is_dir() else None
+
+
+# Origen configurado para una ciudad: DATA_SOURCES o, si no, un SQLite o una carpeta con
+# el nombre de la ciudad dentro de LOCAL_DATA_DIR; None si se lee de Google Sheets
+def local_source_path(ciudad):
+    configured = DATA_SOURCES.get(ciudad)
+    if configured:
+        return None if configured == 'sheets' else Path(configured)
+    if not LOCAL_DATA_DIR:
+        return None
+    base = Path(LOCAL_DATA_DIR)
+    for suffix in SQLITE_SUFFIXES:
+        if (base / f"{ciudad}{suffix}").is_file():
+            return base / f"{ciudad}{suffix}"
+    if (base / ciudad).is_dir():
+        return base / ciudad
+    return None
+
+
+@timed()
+def open_source(client, ciudad, spreadsheet_id):
+    """
+    Origen de datos de una ciudad: su exportación local (SQLite o carpeta) si la
+    hay, si no el spreadsheet de Google Sheets (cuenta como llamada a la API).
+    Si hay precios capturados por scraper.py se agregan como hojas extra.
+    """
+    path = local_source_path(ciudad)
+    if path is None:
+        count_api_call('open_by_key')
+        source = GoogleSheetsSource(default_scheduler.call(lambda: client.open_by_key(spreadsheet_id)))
+    elif path.suffix.lower() in SQLITE_SUFFIXES:
+        source = SQLiteSource(path, spreadsheet_id)
+    else:
+        source = LocalDirectorySource(path, spreadsheet_id)
+
+    scraped = scraped_source_path(ciudad)
+    if scraped is not None:
+        return CombinedSource(source, [LocalDirectorySource(scraped, spreadsheet_id)])
+    return source
@@ -0,0 +1,195 @@
+import threading
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from memory_manager import compact_frame
+from ranking import sheet_prices
+from search_index import HotelSearchIndex
+
+FACT_COLUMNS = ['ciudad', 'fecha_hoja', 'hoja', 'hotel', 'precio']
+
+
+def _empty_facts():
+    return pd.DataFrame({
+        'ciudad': pd.Categorical([]),
+        'fecha_hoja': pd.Series([], dtype='datetime64[ns]'),
+        'hoja': pd.Categorical([]),
+        'hotel': pd.Categorical([]),
+        'precio': np.array([], dtype='float32'),
+    })
+
+
+class PriceFactTable:
+    """
+    Tabla consolidada (ciudad, fecha_hoja, hoja, hotel, precio) de todas las hojas
+    (fecha_hoja es la fecha real del título de la hoja; NaT si no tiene).
+    Las filas están ordenadas por hotel, así cada hotel ocupa un rango contiguo
+    y el índice hotel -> (inicio, fin) permite buscar sin recorrer las hojas.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._parts = {}      # (ciudad, hoja) -> filas de esa hoja
+        self._versions = {}   # (ciudad, hoja) -> versión de la copia local usada
+        self.table = _empty_facts()
+        self.index = {}
+        self._search_indexes = {}  # ciudad (o None = todas) -> HotelSearchIndex
+        self._city_versions = Counter()  # ciudad -> cambios de sus filas (para quien copia la tabla)
+
+    def sync_city(self, ciudad, sheets, load, schema=None):
+        """
+        Actualiza las hojas de una ciudad. Solo se procesan las hojas nuevas o
+        cuya versión (copia local + esquema manual) cambió; las que ya no existen se eliminan.
+        sheets: [(entrada_hoja, fecha_hoja)]; load(entrada) -> (df, hotel_col, price_col)
+        Devuelve [(hoja, error)] de las hojas que no se pudieron procesar.
+        """
+        failed = []
+        with self._lock:
+            changed = False
+            current = set()
+            for entry, fecha_hoja in sheets:
+                key = (ciudad, entry['title'])
+                version = self._version(entry, schema)
+                current.add(key)
+                if self._versions.get(key) == version:
+                    continue
+                try:
+                    df, hotel_col, price_col = load(entry)
+                    part = None
+                    if df is not None and not df.empty and hotel_col and price_col:
+                        part = sheet_prices(df, hotel_col, price_col, entry['title'])
+                        part = compact_frame(part.assign(ciudad=ciudad, fecha_hoja=fecha_hoja)[FACT_COLUMNS])
+                except Exception as e:
+                    failed.append((entry['title'], e))
+                    continue
+                self._parts[key] = part
+                self._versions[key] = version
+                changed = True
+
+            for key in [key for key in self._parts if key[0] == ciudad and key not in current]:
+                del self._parts[key]
+                del self._versions[key]
+                changed = True
+
+            if changed:
+                self._city_versions[ciudad] += 1
+                self._rebuild()
+        return failed
+
+    @staticmethod
+    def _version(entry, schema):
+        return entry.get('sheet_id'), entry.get('synced_at'), schema
+
+    def loaded_sheets(self, ciudad, entries, schema=None):
+        """Títulos de las hojas (entradas de la copia local) cuyas filas ya están en la tabla con esa versión."""
+        with self._lock:
+            return {
+                entry['title'] for entry in entries
+                if self._versions.get((ciudad, entry['title'])) == self._version(entry, schema)
+            }
+
+    def drop_city(self, ciudad):
+        """Libera las filas de una ciudad (se vuelven a cargar en la siguiente sincronización)."""
+        with self._lock:
+            keys = [key for key in self._parts if key[0] == ciudad]
+            for key in keys:
+                del self._parts[key]
+                del self._versions[key]
+            if keys:
+                self._city_versions[ciudad] += 1
+                self._rebuild()
+
+    def city_versions(self):
+        """{ciudad: versión}; la versión de una ciudad cambia cada vez que cambian sus filas."""
+        with self._lock:
+            return dict(self._city_versions)
+
+    def city_bytes(self, ciudad):
+        """Memoria aproximada de una ciudad: sus hojas más su parte de la tabla consolidada."""
+        with self._lock:
+            parts = sum(
+                int(part.memory_usage(deep=True).sum())
+                for key, part in self._parts.items() if key[0] == ciudad and part is not None
+            )
+            if self.table.empty:
+                return parts
+            share = float((self.table['ciudad'] == ciudad).mean())
+            return parts + int(self.table.memory_usage(deep=True).sum() * share)
+
+    def _rebuild(self):
+        self._search_indexes = {}
+        parts = [part for part in self._parts.values() if part is not None and not part.empty]
+        if not parts:
+            self.table = _empty_facts()
+            self.index = {}
+            return
+
+        table = pd.concat(parts, ignore_index=True)
+        table['hotel'] = pd.Categorical(table['hotel'].astype(str))
+        for col in ('ciudad', 'hoja'):
+            table[col] = table[col].astype(str).astype('category')
+        table['fecha_hoja'] = pd.to_datetime(table['fecha_hoja'])
+        table['precio'] = table['precio'].astype('float32')
+
+        # Ordenar por hotel (estable: se conserva el orden de las hojas)
+        codes = table['hotel'].cat.codes.to_numpy()
+        order = np.argsort(codes, kind='stable')
+        table = table.iloc[order].reset_index(drop=True)
+        codes = codes[order]
+
+        # Rango de filas de cada hotel
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        stops = np.r_[starts[1:], len(codes)]
+        categories = table['hotel'].cat.categories
+        self.index = {categories[codes[start]]: (int(start), int(stop)) for start, stop in zip(starts, stops)}
+
+        self.table = table
+
+    def _search_index(self, ciudad=None):
+        if ciudad not in self._search_indexes:
+            if ciudad is None:
+                names = list(self.index)
+            else:
+                names = self.table.loc[self.table['ciudad'] == ciudad, 'hotel'].unique()
+            self._search_indexes[ciudad] = HotelSearchIndex(names)
+        return self._search_indexes[ciudad]
+
+    def search_index(self, ciudad=None):
+        """Índice de trigramas de los hoteles de una ciudad (se construye una vez por versión)."""
+        with self._lock:
+            return self._search_index(ciudad)
+
+    def rows_for_hotels(self, hotels, ciudad=None, hojas=None):
+        table = self.table
+        ranges = [self.index[hotel] for hotel in hotels if hotel in self.index]
+        if not ranges:
+            return table.iloc[0:0][FACT_COLUMNS].copy()
+
+        positions = np.concatenate([np.arange(start, stop) for start, stop in ranges])
+        rows = table.iloc[positions]
+        if ciudad is not None:
+            rows = rows[rows['ciudad'] == ciudad]
+        if hojas is not None:
+            rows = rows[rows['hoja'].isin(list(hojas))]
+        return rows[FACT_COLUMNS].reset_index(drop=True)
+
+    def city_rows(self, ciudad, hojas=None):
+        """Todas las filas de una ciudad (opcionalmente solo de las hojas dadas)."""
+        with self._lock:
+            table = self.table
+            rows = table[table['ciudad'] == ciudad]
+            if hojas is not None:
+                rows = rows[rows['hoja'].isin(list(hojas))]
+            return rows[FACT_COLUMNS].reset_index(drop=True)
+
+    def lookup(self, query, ciudad=None, hojas=None, exact=False):
+        """
+        Filas de los hoteles que coinciden con query: el nombre exacto si exact,
+        si no las coincidencias del índice de trigramas (sin acentos ni mayúsculas,
+        tolerante a errores de tipeo).
+        """
+        with self._lock:
+            hotels = [query] if exact else self._search_index(ciudad).matches(query)
+            return self.rows_for_hotels(hotels, ciudad, hojas)
@@ -0,0 +1,124 @@
+import os
+import random
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from instrumentation import count, in_current_run
+
+# Hilos simultáneos para descargar hojas
+FETCH_WORKERS = int(os.environ.get("HOTEL_PRICES_FETCH_WORKERS", "4"))
+
+# Cuota de lectura de la API de Google Sheets (peticiones por minuto por usuario)
+READ_QUOTA_PER_MINUTE = int(os.environ.get("HOTEL_PRICES_READ_QUOTA", "60"))
+
+# Códigos HTTP que vale la pena reintentar
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+# Errores de red que vale la pena reintentar (conexión caída o rechazada, DNS, sin respuesta
+# a tiempo). Otros OSError, como FileNotFoundError o PermissionError de los orígenes
+# locales, fallan de inmediato
+NETWORK_ERRORS = (
+    ConnectionError, TimeoutError, socket.gaierror,
+    requests.exceptions.ConnectionError, requests.exceptions.Timeout,
+)
+
+
+class TokenBucket:
+    """Limitador de tasa: rate fichas por segundo, ráfagas de hasta capacity."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Limitador compartido por todo el proceso (la cuota es de la cuenta de servicio)
+sheets_limiter = TokenBucket(rate=READ_QUOTA_PER_MINUTE / 60.0, capacity=5)
+
+
+def error_status(exc):
+    response = getattr(exc, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+# Errores de cuota (429), del servidor (5xx) o de red se reintentan
+def is_retryable(exc):
+    status = error_status(exc)
+    if status is not None:
+        return status in RETRY_STATUS
+    return isinstance(exc, NETWORK_ERRORS)
+
+
+class FetchScheduler:
+    """
+    Ejecuta tareas de descarga en un pool de hilos, respetando el limitador
+    de tasa y reintentando con espera exponencial (con jitter) los errores
+    transitorios. Las tareas que fallan se reportan, no se descartan.
+    """
+
+    def __init__(self, max_workers=FETCH_WORKERS, limiter=None, max_retries=5,
+                 base_delay=1.0, max_delay=32.0):
+        self.max_workers = max(1, max_workers)
+        self.limiter = limiter or sheets_limiter
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    def backoff_delay(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def call(self, fn):
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                count('reintentos')
+                time.sleep(self.backoff_delay(attempt))
+                attempt += 1
+
+    def run(self, tasks):
+        """
+        tasks: {clave: función sin argumentos}
+        Devuelve (resultados, fallos) como {clave: valor} y {clave: excepción}.
+        """
+        results = {}
+        failures = {}
+        if not tasks:
+            return results, failures
+
+        workers = min(self.max_workers, len(tasks))
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            futures = {key: pool.submit(in_current_run(self.call), fn) for key, fn in tasks.items()}
+            for key, future in futures.items():
+                try:
+                    results[key] = future.result()
+                except Exception as e:
+                    failures[key] = e
+                    count('descargas_fallidas')
+
+        return results, failures
+
+
+default_scheduler = FetchScheduler()
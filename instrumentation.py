@@ -0,0 +1,171 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+# Carpeta de la exportación de métricas (JSON lines + archivo de texto de Prometheus)
+METRICS_DIR = os.environ.get(
+    "HOTEL_PRICES_METRICS_DIR", str(Path(os.environ.get("HOTEL_PRICES_CACHE_DIR", ".cache")) / "metrics")
+)
+METRICS_JSONL = "metrics.jsonl"
+METRICS_PROM = "hotel_prices.prom"
+
+
+class RunMetrics:
+    """
+    Tiempos por etapa (llamadas, segundos totales y máximo) y contadores de eventos.
+    Los tiempos de una etapa incluyen los de las etapas que se ejecutan dentro
+    de ella; las etapas que corren en hilos suman el tiempo de todos los hilos.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.stages = {}          # etapa -> [llamadas, segundos, máximo]
+            self.counters = Counter()
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self.stages.setdefault(name, [0, 0.0, 0.0])
+            stats[0] += 1
+            stats[1] += seconds
+            stats[2] = max(stats[2], seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'started': self.started,
+                'elapsed': time.time() - self.started,
+                'stages': {name: {'calls': c, 'seconds': s, 'max': m} for name, (c, s, m) in self.stages.items()},
+                'counters': dict(self.counters),
+            }
+
+
+# Métricas de la ejecución actual, por contexto: cada ejecución de la app (y de cada
+# sección que se vuelve a ejecutar sola) tiene las suyas, así las sesiones no se mezclan
+_current_run = contextvars.ContextVar('run_metrics', default=None)
+
+# Métricas fuera de una ejecución iniciada con start_run (CLI, scripts)
+_default_run = RunMetrics()
+
+# Acumulado desde que arrancó el proceso (lo que se exporta para Prometheus)
+process_metrics = RunMetrics()
+
+
+def start_run():
+    """Empieza las métricas de una ejecución en el contexto actual y las devuelve."""
+    run = RunMetrics()
+    _current_run.set(run)
+    return run
+
+
+def current_run():
+    return _current_run.get() or _default_run
+
+
+def in_current_run(fn):
+    """fn para ejecutar en otro hilo contando en las métricas de la ejecución actual (una copia del contexto por tarea)."""
+    return functools.partial(contextvars.copy_context().run, fn)
+
+
+def count(name, n=1):
+    current_run().count(name, n)
+    process_metrics.count(name, n)
+
+
+def record_stage(name, seconds):
+    current_run().record(name, seconds)
+    process_metrics.record(name, seconds)
+
+
+@contextmanager
+def stage(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - start)
+
+
+# Decorador: mide cada llamada como la etapa `name` (por defecto, el nombre de la función).
+# En generadores se mide el tiempo de producir cada resultado, no el de quien los consume.
+def timed(name=None):
+    def decorator(fn):
+        stage_name = name or fn.__name__
+
+        if inspect.isgeneratorfunction(fn):
+            @functools.wraps(fn)
+            def generator_wrapper(*args, **kwargs):
+                generator = fn(*args, **kwargs)
+                while True:
+                    with stage(stage_name):
+                        try:
+                            item = next(generator)
+                        except StopIteration as stop:
+                            return stop.value
+                    yield item
+            return generator_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _prometheus_text(snapshot):
+    lines = [
+        "# HELP hotel_prices_stage_seconds_total Tiempo acumulado por etapa.",
+        "# TYPE hotel_prices_stage_seconds_total counter",
+    ]
+    for name, stats in sorted(snapshot['stages'].items()):
+        lines.append(f'hotel_prices_stage_seconds_total{{stage="{name}"}} {stats["seconds"]:.6f}')
+    lines += [
+        "# HELP hotel_prices_stage_calls_total Llamadas por etapa.",
+        "# TYPE hotel_prices_stage_calls_total counter",
+    ]
+    for name, stats in sorted(snapshot['stages'].items()):
+        lines.append(f'hotel_prices_stage_calls_total{{stage="{name}"}} {stats["calls"]}')
+    lines += [
+        "# HELP hotel_prices_events_total Contadores de eventos (llamadas a la API, bytes, filas, caché, errores).",
+        "# TYPE hotel_prices_events_total counter",
+    ]
+    for name, value in sorted(snapshot['counters'].items()):
+        lines.append(f'hotel_prices_events_total{{event="{name}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+_export_lock = threading.Lock()
+
+
+def export_metrics(labels=None, directory=None):
+    """
+    Agrega las métricas de la ejecución actual como una línea JSON y reescribe
+    el archivo de texto de Prometheus con los acumulados del proceso.
+    """
+    directory = Path(directory or METRICS_DIR)
+    record = {**current_run().snapshot(), **(labels or {})}
+    with _export_lock:
+        directory.mkdir(parents=True, exist_ok=True)
+        with open(directory / METRICS_JSONL, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+
+        prom = directory / METRICS_PROM
+        tmp = prom.with_name(prom.name + ".tmp")
+        tmp.write_text(_prometheus_text(process_metrics.snapshot()), encoding="utf-8")
+        os.replace(tmp, prom)
@@ -0,0 +1,107 @@
+import os
+import sys
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Memoria máxima (MB) para datos de hojas y ciudades compartidos entre sesiones
+MEMORY_BUDGET_MB = float(os.environ.get("HOTEL_PRICES_MEMORY_MB", "512"))
+
+# Columnas de texto que se guardan como categoría si sus valores distintos no pasan de esta fracción
+CATEGORY_MAX_RATIO = 0.5
+
+
+# Bytes que ocupa un objeto en memoria (DataFrames con su contenido; tuplas/listas, la suma)
+def object_bytes(value):
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        usage = value.memory_usage(deep=True, index=True)
+        return int(usage.sum() if isinstance(value, pd.DataFrame) else usage)
+    if isinstance(value, (list, tuple)):
+        return sys.getsizeof(value) + sum(object_bytes(item) for item in value)
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    return sys.getsizeof(value)
+
+
+# Copia compacta de una hoja: solo las columnas pedidas, números en 32 bits y texto repetido como categoría
+def compact_frame(df, columns=None, category_ratio=CATEGORY_MAX_RATIO):
+    if df is None:
+        return None
+    if columns is not None:
+        df = df[[col for col in dict.fromkeys(columns) if col in df.columns]]
+    df = df.copy()
+    for i in range(df.shape[1]):
+        series = df.iloc[:, i]
+        if pd.api.types.is_bool_dtype(series.dtype):
+            continue
+        if pd.api.types.is_float_dtype(series.dtype):
+            df.isetitem(i, series.astype('float32'))
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            df.isetitem(i, pd.to_numeric(series, downcast='integer'))
+        elif (pd.api.types.is_object_dtype(series.dtype) or pd.api.types.is_string_dtype(series.dtype)) \
+                and pd.api.types.infer_dtype(series, skipna=True) == 'string' \
+                and series.nunique() <= category_ratio * len(series):
+            df.isetitem(i, series.astype('category'))
+    return df
+
+
+class MemoryManager:
+    """
+    Contabilidad de la memoria que ocupan los datos compartidos (hojas en caché,
+    tablas de cada ciudad, agregados por ventana). Cada dato se registra con sus
+    bytes y una función que lo libera; al pasar el presupuesto se liberan los
+    usados hace más tiempo. Las claves son tuplas cuyo primer elemento es el tipo.
+    """
+
+    def __init__(self, budget_mb=MEMORY_BUDGET_MB):
+        self.budget = int(budget_mb * 1024 * 1024)
+        self._lock = threading.Lock()
+        self._items = OrderedDict()   # clave -> (bytes, liberar)
+        self.total = 0
+        self.evictions = 0
+
+    def track(self, key, nbytes, evict):
+        """Registra (o actualiza) un dato como el más reciente y libera los más antiguos si hace falta."""
+        victims = []
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.total -= previous[0]
+            self._items[key] = (nbytes, evict)
+            self.total += nbytes
+
+            # Nunca se libera el dato recién registrado, aunque por sí solo pase el presupuesto
+            while self.total > self.budget and len(self._items) > 1:
+                victim, (size, release) = next(iter(self._items.items()))
+                del self._items[victim]
+                self.total -= size
+                self.evictions += 1
+                victims.append(release)
+
+        # Liberar fuera del candado (las funciones pueden tomar sus propios candados)
+        for release in victims:
+            release()
+
+    def touch(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+
+    def forget(self, key):
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self.total -= previous[0]
+
+    def usage(self):
+        """Bytes en uso, presupuesto, liberaciones y bytes por tipo de dato."""
+        with self._lock:
+            kinds = {}
+            for key, (size, _) in self._items.items():
+                kinds[key[0]] = kinds.get(key[0], 0) + size
+            return {'bytes': self.total, 'budget': self.budget, 'evictions': self.evictions, 'kinds': kinds}
+
+
+# Contabilidad compartida por todo el proceso
+memory_manager = MemoryManager()
@@ -0,0 +1,165 @@
+import numpy as np
+import pandas as pd
+
+# Fechas (hojas con fecha) que abarcan la media móvil y la volatilidad
+ROLLING_DATES = 7
+
+# Un precio es un salto si se aleja más de Z_THRESHOLD desviaciones y al menos
+# JUMP_MIN_CHANGE (relativo) del promedio de sus ANOMALY_DATES fechas anteriores
+ANOMALY_DATES = 14
+Z_THRESHOLD = 3.0
+Z_MIN_PERIODS = 4
+JUMP_MIN_CHANGE = 0.15
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+
+def _window_totals(values, window):
+    """
+    Conteo, suma y suma de cuadrados de los valores no NaN de las últimas
+    `window` columnas (incluida la actual) para cada posición, con sumas acumuladas.
+    """
+    present = ~np.isnan(values)
+    filled = np.where(present, values, 0.0).astype(np.float64)
+    pad = np.zeros((values.shape[0], 1))
+
+    def trailing(array):
+        cumulative = np.concatenate([pad, np.cumsum(array, axis=1)], axis=1)
+        shifted = np.concatenate([np.zeros((values.shape[0], window)), cumulative], axis=1)[:, :cumulative.shape[1]]
+        return (cumulative - shifted)[:, 1:]
+
+    return trailing(present.astype(np.float64)), trailing(filled), trailing(filled ** 2)
+
+
+def _mean_std(count, total, squares):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = np.where(count > 0, total / count, np.nan)
+        variance = np.where(count > 1, (squares - total ** 2 / count) / (count - 1), np.nan)
+    return mean, np.sqrt(np.clip(variance, 0, None))
+
+
+class PriceMatrix:
+    """
+    Precios de una ciudad como matriz hoteles × fechas (float32, NaN sin precio).
+    Si hay varias hojas o precios de un hotel en la misma fecha se usa su promedio.
+    Las analíticas se calculan para todos los hoteles a la vez sobre el eje de fechas.
+    """
+
+    def __init__(self, hotels, dates, values):
+        self.hotels = pd.Index(hotels, name='hotel')
+        self.dates = pd.DatetimeIndex(dates, name='fecha')
+        self.values = np.asarray(values, dtype=np.float32)
+        self._positions = {hotel: i for i, hotel in enumerate(self.hotels)}
+
+    @classmethod
+    def from_rows(cls, rows):
+        """rows: filas (hotel, fecha_hoja, precio) de la tabla consolidada; se omiten las hojas sin fecha."""
+        rows = rows[rows['fecha_hoja'].notna() & rows['precio'].notna()]
+        if rows.empty:
+            return cls([], [], np.empty((0, 0), dtype=np.float32))
+
+        hotel_codes, hotels = pd.factorize(rows['hotel'].astype(str), sort=True)
+        date_codes, dates = pd.factorize(pd.to_datetime(rows['fecha_hoja']), sort=True)
+        cells = hotel_codes * len(dates) + date_codes
+        size = len(hotels) * len(dates)
+
+        sums = np.bincount(cells, weights=rows['precio'].to_numpy(dtype=np.float64), minlength=size)
+        counts = np.bincount(cells, minlength=size)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            values = np.where(counts > 0, sums / counts, np.nan)
+        return cls(hotels, dates, values.reshape(len(hotels), len(dates)))
+
+    @property
+    def empty(self):
+        return self.values.size == 0
+
+    def to_rows(self):
+        """Filas (hotel, fecha_hoja, precio) de las celdas con precio; from_rows vuelve a armar la matriz."""
+        hotel_idx, date_idx = np.nonzero(~np.isnan(self.values))
+        return pd.DataFrame({
+            'hotel': self.hotels[hotel_idx],
+            'fecha_hoja': self.dates[date_idx],
+            'precio': self.values[hotel_idx, date_idx],
+        })
+
+    def rows(self, hotels):
+        """Posiciones de los hoteles dados que están en la matriz."""
+        return [self._positions[hotel] for hotel in hotels if hotel in self._positions]
+
+    def to_frame(self, values=None, hotels=None):
+        """DataFrame fechas × hoteles (listo para st.line_chart) de la matriz o de una analítica."""
+        values = self.values if values is None else values
+        positions = range(len(self.hotels)) if hotels is None else self.rows(hotels)
+        positions = list(positions)
+        return pd.DataFrame(values[positions].T, index=self.dates, columns=self.hotels[positions])
+
+    def rolling_mean(self, window=ROLLING_DATES):
+        count, total, _ = _window_totals(self.values, window)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, total / count, np.nan)
+
+    def percentiles(self, q=PERCENTILES):
+        """Percentiles del precio de la ciudad en cada fecha (fechas × p10, p25, ...)."""
+        columns = [f"p{p}" for p in q]
+        if self.empty:
+            return pd.DataFrame(columns=columns, index=self.dates)
+        result = np.full((len(q), len(self.dates)), np.nan)
+        observed = ~np.all(np.isnan(self.values), axis=0)
+        result[:, observed] = np.nanpercentile(self.values[:, observed], q, axis=0)
+        return pd.DataFrame(result.T, index=self.dates, columns=columns)
+
+    def day_over_day(self):
+        """Cambio relativo respecto a la fecha anterior (NaN si falta alguno de los dos precios)."""
+        change = np.full(self.values.shape, np.nan)
+        if self.values.shape[1] > 1:
+            previous, current = self.values[:, :-1], self.values[:, 1:]
+            with np.errstate(invalid='ignore', divide='ignore'):
+                change[:, 1:] = (current - previous) / previous
+        return change
+
+    def volatility(self, window=ROLLING_DATES):
+        """Desviación estándar del cambio diario en las últimas `window` fechas."""
+        _, std = _mean_std(*_window_totals(self.day_over_day(), window))
+        return std
+
+    def zscores(self, window=ROLLING_DATES, min_periods=Z_MIN_PERIODS):
+        """Distancia de cada precio a la media de sus `window` fechas anteriores, en desviaciones."""
+        count, total, squares = _window_totals(self.values, window)
+        mean, std = _mean_std(count, total, squares)
+        # Estadísticas de las fechas anteriores (sin incluir la actual)
+        previous_mean = np.full(self.values.shape, np.nan)
+        previous_std = np.full(self.values.shape, np.nan)
+        enough = count[:, :-1] >= min_periods
+        previous_mean[:, 1:] = np.where(enough, mean[:, :-1], np.nan)
+        previous_std[:, 1:] = np.where(enough, std[:, :-1], np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            z = np.where(previous_std > 0, (self.values - previous_mean) / previous_std, np.nan)
+        return z, previous_mean
+
+    def anomalies(self, window=ANOMALY_DATES, threshold=Z_THRESHOLD, min_periods=Z_MIN_PERIODS,
+                  min_change=JUMP_MIN_CHANGE, hotels=None):
+        """Saltos de precio (|z| >= threshold y cambio >= min_change), del más reciente al más antiguo."""
+        columns = ['hotel', 'fecha', 'precio', 'media_previa', 'cambio', 'z']
+        if self.empty:
+            return pd.DataFrame(columns=columns)
+        z, previous_mean = self.zscores(window, min_periods)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            change = (self.values - previous_mean) / previous_mean
+        flags = (np.abs(np.nan_to_num(z)) >= threshold) & (np.abs(np.nan_to_num(change)) >= min_change)
+        if hotels is not None:
+            selected = np.zeros(len(self.hotels), dtype=bool)
+            selected[self.rows(hotels)] = True
+            flags &= selected[:, None]
+
+        hotel_idx, date_idx = np.nonzero(flags)
+        precio = self.values[hotel_idx, date_idx].astype(np.float64)
+        media = previous_mean[hotel_idx, date_idx]
+        result = pd.DataFrame({
+            'hotel': self.hotels[hotel_idx],
+            'fecha': self.dates[date_idx],
+            'precio': precio,
+            'media_previa': media,
+            'cambio': change[hotel_idx, date_idx],
+            'z': z[hotel_idx, date_idx],
+        }, columns=columns)
+        return result.sort_values(['fecha', 'z'], ascending=[False, False], kind='stable').reset_index(drop=True)
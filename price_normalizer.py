@@ -0,0 +1,139 @@
+import numbers
+import re
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import timed
+
+# Valores distintos que se revisan para decidir la convención de separadores de una columna
+DETECTION_SAMPLE = 10_000
+
+# Símbolos y códigos de moneda que se ignoran al leer un precio
+_CURRENCY = re.compile(r'mx\$|us\$|mxn|usd|pesos?|m\.n\.|\$|€|\s', re.IGNORECASE)
+
+# Primer número de la celda y, si es un rango ("1,200 - 1,500", "1200 a 1500"), el segundo
+_NUMBER = r'(\d[\d.,]*)'
+_RANGE = re.compile(_NUMBER + r'(?:(?:-|–|—|~|al|a|to)' + _NUMBER + r')?', re.IGNORECASE)
+
+# Un rango solo vale si el segundo número es mayor o igual al primero y no más de
+# RANGE_MAX_RATIO veces; si no ("2024-04", "5-1200") la celda no tiene un precio claro
+RANGE_MAX_RATIO = 5
+
+# Celdas con forma de fecha (2024-04-05, 05/04/2024) y precios negativos: no son precios
+_DATE = re.compile(r'\d{1,4}([-/])\d{1,2}\1\d{1,4}')
+_NEGATIVE = re.compile(r'[-−–—]\d')
+
+
+def _tokens_evidence(tokens):
+    """
+    Votos de cada número de texto por punto o coma como separador decimal:
+    con ambos separadores, el último es el decimal; un separador repetido es de
+    miles; uno solo seguido de 1-2 (o 4+) dígitos es decimal. Un separador único
+    seguido de exactamente 3 dígitos ("1,200", "1.200") no vota.
+    """
+    commas = tokens.str.count(',')
+    dots = tokens.str.count(r'\.')
+    last_comma = tokens.str.rfind(',')
+    last_dot = tokens.str.rfind('.')
+    length = tokens.str.len()
+
+    both = (commas > 0) & (dots > 0)
+    dot_decimal = (
+        (both & (last_dot > last_comma))
+        | ((dots == 0) & (commas > 1))
+        | ((commas == 0) & (dots == 1) & (length - last_dot - 1 != 3))
+    )
+    comma_decimal = (
+        (both & (last_comma > last_dot))
+        | ((commas == 0) & (dots > 1))
+        | ((dots == 0) & (commas == 1) & (length - last_comma - 1 != 3))
+    )
+    return int(dot_decimal.sum()), int(comma_decimal.sum())
+
+
+def detect_decimal_separator(tokens):
+    """
+    Separador decimal de una columna ('.' o ',') según la mayoría de sus valores
+    (hasta DETECTION_SAMPLE); None si ningún valor lo decide (todos los separadores son de miles).
+    """
+    sample = pd.Series(tokens, dtype=object).dropna().head(DETECTION_SAMPLE).astype(str)
+    dot_votes, comma_votes = _tokens_evidence(sample)
+    if not dot_votes and not comma_votes:
+        return None
+    return ',' if comma_votes > dot_votes else '.'
+
+
+def _to_float(tokens, decimal):
+    if decimal is None:
+        return pd.to_numeric(tokens.str.replace(r'[.,]', '', regex=True), errors='coerce')
+    thousands = ',' if decimal == '.' else '.'
+    cleaned = tokens.str.replace(thousands, '', regex=False)
+    # Un separador "decimal" repetido solo puede ser de miles ("1.234.567" con decimal '.')
+    repeated = cleaned.str.count(re.escape(decimal)) > 1
+    cleaned = cleaned.where(~repeated, cleaned.str.replace(decimal, '', regex=False))
+    return pd.to_numeric(cleaned.str.replace(decimal, '.', regex=False), errors='coerce')
+
+
+def _parse_numbers(tokens, decimal):
+    """
+    Números de texto con la convención de la columna, salvo las celdas que se deciden
+    solas: con ambos separadores el último es el decimal ("1.234,50" en una columna con
+    punto decimal sigue siendo 1234.5).
+    """
+    values = _to_float(tokens, decimal)
+    both = (tokens.str.contains(',', regex=False) & tokens.str.contains('.', regex=False)).fillna(False).astype(bool)
+    if both.any():
+        comma_last = tokens.str.rfind(',') > tokens.str.rfind('.')
+        for own, cells in ((',', both & comma_last), ('.', both & ~comma_last)):
+            if cells.any():
+                values[cells] = _to_float(tokens[cells], own)
+    return values
+
+
+@timed()
+def normalize_prices(values, decimal='auto'):
+    """
+    Convierte una columna de precios a float64 (NaN si no hay número).
+    Acepta números ya convertidos y textos con símbolos o códigos de moneda ($, MXN),
+    separadores de miles y rangos (se toma el punto medio; ver RANGE_MAX_RATIO). La
+    convención de separadores se detecta una vez para toda la columna (decimal='auto') o
+    se indica ('.' o ','); una celda con ambos separadores usa la suya. Fechas y valores
+    negativos quedan en NaN.
+    Solo se procesan los valores distintos, así una columna larga cuesta lo que sus valores únicos.
+    """
+    series = values if isinstance(values, pd.Series) else pd.Series(values)
+    if pd.api.types.is_bool_dtype(series.dtype):
+        return pd.Series(np.nan, index=series.index, dtype='float64')
+    if pd.api.types.is_numeric_dtype(series.dtype):
+        prices = series.astype('float64')
+        return prices.where(~(prices < 0))
+
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    uniques = pd.Series(np.asarray(uniques, dtype=object))
+    parsed = np.full(len(uniques), np.nan)
+
+    # Celdas que ya son números (como las deja la lectura de Sheets) no votan
+    if pd.api.types.infer_dtype(uniques, skipna=True) in ('string', 'empty'):
+        is_number = np.zeros(len(uniques), dtype=bool)
+    else:
+        is_number = uniques.map(lambda v: isinstance(v, numbers.Number) and not isinstance(v, bool)).to_numpy(dtype=bool)
+    parsed[is_number] = uniques[is_number].astype('float64').to_numpy()
+
+    texts = uniques[~is_number].astype(str).str.replace(_CURRENCY, '', regex=True)
+    parts = texts.str.extract(_RANGE)
+    rejected = (texts.str.fullmatch(_DATE) | texts.str.match(_NEGATIVE)).fillna(False).astype(bool)
+    low = parts[0].str.rstrip('.,').mask(rejected)
+    high = parts[1].str.rstrip('.,').mask(rejected)
+
+    if decimal == 'auto':
+        decimal = detect_decimal_separator(pd.concat([low, high], ignore_index=True))
+    low_value = _parse_numbers(low, decimal)
+    high_value = _parse_numbers(high, decimal)
+    plausible = high_value.isna() | ((high_value >= low_value) & (high_value <= low_value * RANGE_MAX_RATIO))
+    middle = ((low_value + high_value) / 2).fillna(low_value).where(plausible)
+    parsed[~is_number] = middle.to_numpy(dtype='float64')
+    parsed[parsed < 0] = np.nan
+
+    result = np.where(codes >= 0, parsed[np.maximum(codes, 0)], np.nan)
+    return pd.Series(result, index=series.index, dtype='float64')
@@ -0,0 +1,290 @@
+import queue
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from pathlib import Path
+
+import pandas as pd
+
+from cities import SHEET_IDS
+from fact_table import PriceFactTable
+from instrumentation import count, timed
+from schema_registry import SchemaRegistry
+from sheet_catalog import WorksheetCatalog
+from snapshot_store import SnapshotStore
+
+# Tabla de precios del motor SQL (una fila por precio: ciudad, fecha, hoja, hotel, precio)
+# con índices por ciudad y fecha, por fecha y por hotel
+SCHEMA = """
+CREATE TABLE precios (
+    ciudad TEXT NOT NULL,
+    fecha TEXT,
+    hoja TEXT NOT NULL,
+    hotel TEXT NOT NULL,
+    precio REAL NOT NULL
+);
+CREATE INDEX idx_precios_ciudad_fecha ON precios (ciudad, fecha);
+CREATE INDEX idx_precios_fecha ON precios (fecha);
+CREATE INDEX idx_precios_hotel ON precios (hotel, ciudad, fecha);
+"""
+
+# Operaciones permitidas en las consultas de los usuarios (solo lectura)
+_READ_ONLY_ACTIONS = {sqlite3.SQLITE_SELECT, sqlite3.SQLITE_READ, sqlite3.SQLITE_FUNCTION, sqlite3.SQLITE_RECURSIVE}
+
+WEEKDAYS = ['Domingo', 'Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado']
+
+# Filas máximas que devuelve una consulta libre
+MAX_QUERY_ROWS = 10_000
+
+# Segundos máximos de una consulta; al pasarlos se interrumpe con sqlite3.OperationalError
+QUERY_TIMEOUT = 5.0
+
+# Cada cuántas instrucciones de SQLite se revisa si la consulta pasó su límite
+_PROGRESS_STEPS = 10_000
+
+
+def _read_only(action, *args):
+    return sqlite3.SQLITE_OK if action in _READ_ONLY_ACTIONS else sqlite3.SQLITE_DENY
+
+
+def _filters(ciudades=None, desde=None, hasta=None, hoteles=None):
+    """Condición WHERE (y sus parámetros) para los filtros indicados."""
+    conditions = []
+    params = []
+    for column, values in (('ciudad', ciudades), ('hotel', hoteles)):
+        if values is not None:
+            values = list(values)
+            conditions.append(f"{column} IN ({', '.join('?' * len(values))})" if values else "0")
+            params += values
+    if desde is not None:
+        conditions.append("fecha >= ?")
+        params.append(pd.Timestamp(desde).strftime('%Y-%m-%d'))
+    if hasta is not None:
+        conditions.append("fecha <= ?")
+        params.append(pd.Timestamp(hasta).strftime('%Y-%m-%d'))
+    return ("WHERE " + " AND ".join(conditions)) if conditions else "", params
+
+
+def _close_all(connections, directory):
+    for conn in connections:
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+class PriceSQLEngine:
+    """
+    Copia en SQLite de la tabla consolidada de precios de todas las ciudades, para
+    agregaciones ad hoc como consultas con índices en vez de recorrer filas en
+    Python. Cada ciudad se recarga solo cuando cambian sus filas en la PriceFactTable.
+    query() ejecuta SQL de solo lectura sobre la tabla `precios` (ciudad,
+    fecha 'AAAA-MM-DD', hoja, hotel, precio) con un límite de tiempo.
+    La base es un archivo temporal en modo WAL: las consultas usan sus propias
+    conexiones de lectura, así una consulta lenta no bloquea las sincronizaciones
+    ni las consultas de otras sesiones.
+    """
+
+    def __init__(self, timeout=QUERY_TIMEOUT):
+        self.timeout = timeout
+        self._lock = threading.Lock()   # conexión de escritura
+        self._dir = tempfile.mkdtemp(prefix="precios_sql_")
+        self._path = str(Path(self._dir) / "precios.sqlite")
+        self._connections = []
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._readers = queue.SimpleQueue()   # conexiones de lectura libres
+        self._versions = {}   # ciudad -> versión de la tabla consolidada cargada
+        weakref.finalize(self, _close_all, self._connections, self._dir)
+
+    def _connect(self):
+        conn = sqlite3.connect(self._path, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA synchronous=OFF")
+        self._connections.append(conn)
+        return conn
+
+    @contextmanager
+    def _reader(self):
+        """Conexión de lectura (solo lectura, con límite de tiempo) para una consulta."""
+        try:
+            conn = self._readers.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+            conn.set_authorizer(_read_only)
+        deadline = time.monotonic() + self.timeout
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, _PROGRESS_STEPS)
+        try:
+            yield conn
+        except sqlite3.OperationalError as e:
+            if time.monotonic() > deadline:
+                count('sql.consultas_interrumpidas')
+                raise sqlite3.OperationalError(f"la consulta superó el límite de {self.timeout:g} s") from e
+            raise
+        finally:
+            conn.set_progress_handler(None, 0)
+            self._readers.put(conn)
+
+    @timed('sql.sync')
+    def sync(self, fact_table, ciudades=None):
+        """Recarga las ciudades cuyas filas cambiaron en la tabla consolidada; devuelve las recargadas."""
+        versions = fact_table.city_versions()
+        reloaded = []
+        for ciudad in (versions if ciudades is None else ciudades):
+            version = versions.get(ciudad)
+            if version is None or self._versions.get(ciudad) == version:
+                continue
+            self.load_city(ciudad, fact_table.city_rows(ciudad), version)
+            reloaded.append(ciudad)
+        return reloaded
+
+    def load_city(self, ciudad, rows, version=None):
+        """Reemplaza las filas de una ciudad (rows con las columnas de la tabla consolidada)."""
+        fechas = pd.to_datetime(rows['fecha_hoja']).dt.strftime('%Y-%m-%d')
+        records = list(zip(
+            [ciudad] * len(rows),
+            fechas.where(fechas.notna(), None).tolist(),
+            rows['hoja'].astype(str).tolist(),
+            rows['hotel'].astype(str).tolist(),
+            rows['precio'].astype(float).tolist(),
+        ))
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM precios WHERE ciudad = ?", (ciudad,))
+            self._conn.executemany("INSERT INTO precios VALUES (?, ?, ?, ?, ?)", records)
+            self._versions[ciudad] = version
+        count('sql.filas_cargadas', len(records))
+
+    def drop_city(self, ciudad):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM precios WHERE ciudad = ?", (ciudad,))
+            self._versions.pop(ciudad, None)
+
+    def clear(self):
+        """Libera todas las filas (se vuelven a cargar en la siguiente sincronización)."""
+        with self._lock:
+            with self._conn:
+                self._conn.execute("DELETE FROM precios")
+            self._conn.execute("VACUUM")
+            self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            self._versions = {}
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            pages = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            return pages * self._conn.execute("PRAGMA page_size").fetchone()[0]
+
+    def cities(self):
+        with self._reader() as conn:
+            return [row[0] for row in conn.execute("SELECT DISTINCT ciudad FROM precios ORDER BY ciudad")]
+
+    def hotels(self, ciudades=None):
+        where, params = _filters(ciudades)
+        with self._reader() as conn:
+            return [row[0] for row in conn.execute(
+                f"SELECT DISTINCT hotel FROM precios {where} ORDER BY hotel", params
+            )]
+
+    @timed('sql.query')
+    def query(self, sql, params=(), max_rows=MAX_QUERY_ROWS):
+        """
+        Ejecuta una consulta de solo lectura (SELECT o WITH) y devuelve un DataFrame
+        con como mucho max_rows filas. Cualquier escritura se rechaza con sqlite3.DatabaseError
+        y una consulta que tarda más de `timeout` segundos se interrumpe con sqlite3.OperationalError.
+        """
+        with self._reader() as conn:
+            cursor = conn.execute(sql, params)
+            try:
+                rows = cursor.fetchmany(max_rows) if max_rows else cursor.fetchall()
+                columns = [column[0] for column in cursor.description or []]
+            finally:
+                cursor.close()
+        count('sql.consultas')
+        return pd.DataFrame(rows, columns=columns)
+
+    def weekday_averages(self, ciudades=None, desde=None, hasta=None):
+        """Precio promedio, mínimo y máximo por ciudad y día de la semana."""
+        where, params = _filters(ciudades, desde, hasta)
+        where = (where + " AND " if where else "WHERE ") + "fecha IS NOT NULL"
+        result = self.query(f"""
+            SELECT ciudad, CAST(strftime('%w', fecha) AS INTEGER) AS dia,
+                   AVG(precio) AS promedio, MIN(precio) AS minimo, MAX(precio) AS maximo,
+                   COUNT(*) AS precios, COUNT(DISTINCT hotel) AS hoteles
+            FROM precios {where}
+            GROUP BY ciudad, dia
+            ORDER BY ciudad, (dia + 6) % 7
+        """, params, max_rows=None)
+        result.insert(1, 'dia_semana', result['dia'].map(dict(enumerate(WEEKDAYS))))
+        return result.drop(columns='dia')
+
+    def price_bands(self, width=500, ciudades=None, desde=None, hasta=None):
+        """Precios y hoteles por banda de precio de ancho `width` (desde, hasta) por ciudad."""
+        where, params = _filters(ciudades, desde, hasta)
+        return self.query(f"""
+            SELECT ciudad, CAST(precio / ? AS INTEGER) * ? AS desde,
+                   (CAST(precio / ? AS INTEGER) + 1) * ? AS hasta,
+                   COUNT(*) AS precios, COUNT(DISTINCT hotel) AS hoteles
+            FROM precios {where}
+            GROUP BY ciudad, desde
+            ORDER BY ciudad, desde
+        """, [width] * 4 + params, max_rows=None)
+
+    def compare_hotels(self, hoteles, ciudades=None, desde=None, hasta=None):
+        """Estadísticas de los hoteles indicados (una fila por ciudad y hotel)."""
+        where, params = _filters(ciudades, desde, hasta, hoteles)
+        return self.query(f"""
+            SELECT ciudad, hotel, AVG(precio) AS promedio, MIN(precio) AS minimo, MAX(precio) AS maximo,
+                   COUNT(*) AS precios, COUNT(DISTINCT hoja) AS hojas, MIN(fecha) AS primera_fecha,
+                   MAX(fecha) AS ultima_fecha
+            FROM precios {where}
+            GROUP BY ciudad, hotel
+            ORDER BY promedio
+        """, params, max_rows=None)
+
+    def daily_prices(self, hoteles, ciudades=None, desde=None, hasta=None):
+        """Precio promedio por fecha de cada hotel (para graficar la comparación)."""
+        where, params = _filters(ciudades, desde, hasta, hoteles)
+        where = (where + " AND " if where else "WHERE ") + "fecha IS NOT NULL"
+        return self.query(f"""
+            SELECT fecha, hotel, AVG(precio) AS precio
+            FROM precios {where}
+            GROUP BY fecha, hotel
+            ORDER BY fecha
+        """, params, max_rows=None)
+
+
+def engine_from_snapshots(cities=None, store=None, registry=None):
+    """
+    Motor con las hojas ya descargadas en la copia local (sin red ni Streamlit),
+    para consultas desde Python:
+        engine = engine_from_snapshots()
+        engine.weekday_averages(['Mérida'])
+        engine.query("SELECT hotel, AVG(precio) FROM precios GROUP BY hotel")
+    cities: {ciudad: spreadsheet_id} (por defecto, todas las de SHEET_IDS).
+    """
+    store = store or SnapshotStore()
+    registry = registry or SchemaRegistry()
+    fact_table = PriceFactTable()
+    for ciudad, spreadsheet_id in (cities or SHEET_IDS).items():
+        entries = [entry for entry in store.load_manifest(spreadsheet_id).values() if entry.get('file')]
+        catalog = WorksheetCatalog(entries)
+
+        def load(entry, spreadsheet_id=spreadsheet_id):
+            df = store.load(spreadsheet_id, entry)
+            if df is None or df.empty:
+                return df, None, None
+            hotel_col, price_col = registry.sheet_columns(spreadsheet_id, entry, df)
+            return df, hotel_col, price_col
+
+        fact_table.sync_city(
+            ciudad, [(entry, catalog.date_of(entry['title'])) for entry in entries], load,
+            registry.override_for(spreadsheet_id)
+        )
+    engine = PriceSQLEngine()
+    engine.sync(fact_table)
+    return engine
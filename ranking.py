@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from price_normalizer import normalize_prices
+
+RANKING_COLUMNS = ['hotel', 'precio_promedio', 'precio_min', 'precio_max', 'muestras', 'hojas', 'ultima_hoja']
+SUMMARY_COLUMNS = ['hotel', 'muestras', 'suma', 'suma_cuadrados', 'precio_min', 'precio_max']
+
+
+# Filas válidas (hotel, precio, hoja) de una hoja, sin recorrer fila por fila
+def sheet_prices(df, hotel_col, price_col, sheet_title):
+    hotels = df[hotel_col].astype(str).str.strip()
+    prices = normalize_prices(df[price_col])
+    valid = hotels.ne('') & ~hotels.str.lower().isin(['nan', 'none']) & prices.gt(0)
+    return pd.DataFrame({
+        'hotel': hotels[valid],
+        'precio': prices[valid],
+        'hoja': sheet_title,
+    })
+
+
+# Resumen por hotel de una hoja: muestras, suma, suma de cuadrados, mínimo y máximo
+def sheet_summary(prices):
+    """prices: filas de sheet_prices de una sola hoja."""
+    if prices.empty:
+        return pd.DataFrame(columns=SUMMARY_COLUMNS)
+    return prices.assign(cuadrado=prices['precio'] ** 2).groupby('hotel', sort=False).agg(
+        muestras=('precio', 'size'),
+        suma=('precio', 'sum'),
+        suma_cuadrados=('cuadrado', 'sum'),
+        precio_min=('precio', 'min'),
+        precio_max=('precio', 'max'),
+    ).reset_index()[SUMMARY_COLUMNS]
+
+
+class SlidingWindowAggregate:
+    """
+    Agregado de una ventana de hojas a partir de sus resúmenes por hotel.
+    Al moverse la ventana solo se suman los resúmenes que entran y se restan
+    los que salen; mínimo, máximo y última hoja se combinan de los N resúmenes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.summaries = {}   # hoja -> (versión, resumen)
+        self.order = []       # hojas de la ventana, más reciente primero
+        self.totals = pd.DataFrame(columns=['muestras', 'suma', 'suma_cuadrados', 'hojas'], dtype='float64')
+
+    @staticmethod
+    def _totals(summary):
+        return summary.set_index('hotel')[['muestras', 'suma', 'suma_cuadrados']].astype('float64').assign(hojas=1.0)
+
+    def _add(self, summary):
+        self.totals = self.totals.add(self._totals(summary), fill_value=0)
+
+    def _remove(self, summary):
+        self.totals = self.totals.sub(self._totals(summary), fill_value=0)
+        self.totals = self.totals[self.totals['muestras'] > 0.5]
+
+    @property
+    def nbytes(self):
+        with self._lock:
+            frames = [summary for _, summary in self.summaries.values()] + [self.totals]
+            return int(sum(frame.memory_usage(deep=True).sum() for frame in frames))
+
+    def update(self, sheets, load_summary):
+        """
+        sheets: [(hoja, versión)] de la ventana, más reciente primero.
+        load_summary(hoja) -> resumen; solo se llama para hojas nuevas o con otra versión.
+        Si devuelve None la hoja queda fuera y se vuelve a intentar en la siguiente llamada.
+        """
+        with self._lock:
+            wanted = dict(sheets)
+            for hoja in [h for h in self.summaries if wanted.get(h) != self.summaries[h][0]]:
+                self._remove(self.summaries.pop(hoja)[1])
+
+            for hoja, version in sheets:
+                if hoja in self.summaries:
+                    continue
+                summary = load_summary(hoja)
+                if summary is None:
+                    continue
+                self.summaries[hoja] = (version, summary)
+                self._add(summary)
+
+            self.order = [hoja for hoja, _ in sheets]
+
+    def ranking(self):
+        """Precio promedio/mínimo/máximo/desviación, muestras, hojas y última hoja de cada hotel."""
+        with self._lock:
+            parts = [self.summaries[hoja][1].assign(hoja=hoja) for hoja in self.order if hoja in self.summaries]
+            parts = [part for part in parts if not part.empty]
+            if not parts:
+                return pd.DataFrame(columns=RANKING_COLUMNS + ['precio_std'])
+
+            extremes = pd.concat(parts, ignore_index=True).groupby('hotel', sort=False).agg(
+                precio_min=('precio_min', 'min'),
+                precio_max=('precio_max', 'max'),
+                ultima_hoja=('hoja', 'first'),
+            )
+            totals = self.totals.reindex(extremes.index)
+        ranking = extremes.assign(
+            precio_promedio=totals['suma'] / totals['muestras'],
+            muestras=totals['muestras'].round().astype('int64'),
+            hojas=totals['hojas'].round().astype('int64'),
+        )
+        varianza = totals['suma_cuadrados'] / totals['muestras'] - ranking['precio_promedio'] ** 2
+        ranking['precio_std'] = np.sqrt(varianza.clip(lower=0))
+        return ranking.reset_index()[RANKING_COLUMNS + ['precio_std']]
+
+
+# Una sola agregación por hotel sobre todas las hojas
+def aggregate_hotel_prices(price_frames):
+    """
+    price_frames: DataFrames de sheet_prices, de la hoja más reciente a la más antigua.
+    Devuelve un DataFrame con precio promedio/mínimo/máximo, muestras, hojas
+    distintas y la hoja más reciente de cada hotel.
+    """
+    summaries = {}
+    for frame in price_frames:
+        if not frame.empty:
+            summaries[frame['hoja'].iloc[0]] = sheet_summary(frame)
+
+    aggregate = SlidingWindowAggregate()
+    aggregate.update([(hoja, None) for hoja in summaries], summaries.get)
+    return aggregate.ranking()
+
+
+# Top N de hoteles a partir del ranking ya calculado
+def top_hotels(ranking, top_type="min", n=10):
+    ordered = ranking.sort_values('precio_promedio', ascending=(top_type == "min"), kind='stable')
+    return ordered.head(n).to_dict('records')
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from instrumentation import count, timed
+from price_normalizer import normalize_prices
+from snapshot_store import DEFAULT_CACHE_DIR, atomic_write
+
+# Filas que se revisan para confirmar que un esquema conocido sigue siendo válido
+SAMPLE_ROWS = 20
+
+
+# Huella del encabezado de una hoja (mismas columnas en el mismo orden = mismo esquema)
+def header_fingerprint(columns):
+    header = "\x1f".join(str(col) for col in columns)
+    return hashlib.sha1(header.encode("utf-8")).hexdigest()[:16]
+
+
+# Detecta automáticamente las columnas de hotel y precio de una hoja
+@timed()
+def detect_columns(df):
+    # Buscar columna de hotel
+    hotel_keywords = ['hotel', 'nombre', 'name', 'establecimiento', 'property']
+    price_keywords = ['precio', 'price', 'costo', 'cost', 'valor', 'value', 'monto', 'amount', 'importe']
+    
+    hotel_col = None
+    price_col = None
+    
+    for col in df.columns:
+        col_lower = str(col).lower()
+        
+        # Detectar columna de hotel
+        if not hotel_col and any(keyword in col_lower for keyword in hotel_keywords):
+            hotel_col = col
+        
+        # Detectar columna de precio
+        if not price_col and any(keyword in col_lower for keyword in price_keywords):
+            # Verificar si contiene valores numéricos
+            try:
+                numeric_test = normalize_prices(df[col])
+                if numeric_test.notna().sum() > 0:
+                    price_col = col
+            except:
+                count('excepciones_ignoradas')
+                continue
+    
+    # Si no se detecta por nombre, buscar la primera columna de texto para hotel
+    if not hotel_col:
+        for col in df.columns:
+            is_text = (pd.api.types.is_object_dtype(df[col]) or pd.api.types.is_string_dtype(df[col])
+                       or isinstance(df[col].dtype, pd.CategoricalDtype))
+            if is_text and len(df[col].astype(str).str.strip().unique()) > 1:
+                hotel_col = col
+                break
+    
+    # Si no se detecta por nombre, buscar la primera columna numérica para precio
+    if not price_col:
+        numeric_cols = df.select_dtypes(include=[np.number]).columns
+        if len(numeric_cols) > 0:
+            price_col = numeric_cols[0]
+    
+    return hotel_col, price_col
+
+
+class SchemaRegistry:
+    """
+    Registro persistente de esquemas: huella del encabezado -> (columna hotel, columna precio).
+    También guarda columnas elegidas manualmente para un spreadsheet, que tienen prioridad.
+    """
+
+    def __init__(self, path=None):
+        self.path = Path(path or Path(DEFAULT_CACHE_DIR) / "schemas.json")
+        self._lock = threading.Lock()
+        self.layouts = {}
+        self.overrides = {}
+        self._load()
+
+    def _load(self):
+        try:
+            data = json.loads(self.path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return
+        self.layouts = {fp: tuple(cols) for fp, cols in data.get("layouts", {}).items()}
+        self.overrides = {sid: tuple(cols) for sid, cols in data.get("overrides", {}).items()}
+
+    def _save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        data = {
+            "layouts": {fp: list(cols) for fp, cols in self.layouts.items()},
+            "overrides": {sid: list(cols) for sid, cols in self.overrides.items()},
+        }
+        text = json.dumps(data, ensure_ascii=False, indent=1)
+        atomic_write(self.path, lambda tmp: Path(tmp).write_text(text, encoding="utf-8"))
+
+    def override_for(self, spreadsheet_id):
+        return self.overrides.get(spreadsheet_id)
+
+    def set_override(self, spreadsheet_id, hotel_col, price_col):
+        with self._lock:
+            self.overrides[spreadsheet_id] = (hotel_col, price_col)
+            self._save()
+
+    def clear_override(self, spreadsheet_id):
+        with self._lock:
+            if self.overrides.pop(spreadsheet_id, None) is not None:
+                self._save()
+
+    def lookup_header(self, header, spreadsheet_id=None):
+        """Columnas (hotel, precio) ya conocidas para un encabezado, sin leer datos; None si no hay."""
+        override = self.overrides.get(spreadsheet_id)
+        if override and override[0] in header and override[1] in header:
+            return override
+        return self.layouts.get(header_fingerprint(header))
+
+    # Un esquema conocido se acepta si sus columnas existen y la muestra tiene precios numéricos
+    @staticmethod
+    def _validate(df, hotel_col, price_col):
+        if hotel_col not in df.columns or price_col not in df.columns:
+            return False
+        return normalize_prices(df[price_col].head(SAMPLE_ROWS)).notna().any()
+
+    def resolve(self, df, detect, spreadsheet_id=None):
+        """
+        Columnas (hotel, precio) de una hoja: la selección manual del spreadsheet,
+        el esquema ya conocido para ese encabezado o, si no hay, detect(df).
+        """
+        override = self.overrides.get(spreadsheet_id)
+        if override and override[0] in df.columns and override[1] in df.columns:
+            return override
+
+        fingerprint = header_fingerprint(df.columns)
+        known = self.layouts.get(fingerprint)
+        if known and self._validate(df, *known):
+            return known
+
+        hotel_col, price_col = detect(df)
+        if hotel_col and price_col:
+            with self._lock:
+                self.layouts[fingerprint] = (hotel_col, price_col)
+                self._save()
+        return hotel_col, price_col
+
+    def sheet_columns(self, spreadsheet_id, entry, df, detect=detect_columns):
+        """
+        Columnas (hotel, precio) de una hoja ya leída: la selección manual, las
+        guardadas en su entrada de la copia local (si se guardaron con la misma
+        selección manual que la vigente) o las que resuelve el registro.
+        """
+        override = self.overrides.get(spreadsheet_id)
+        if override and override[0] in df.columns and override[1] in df.columns:
+            return override
+        same_override = entry.get('override') == (list(override) if override else None)
+        if entry.get('hotel_col') and entry.get('price_col') and same_override:
+            return entry['hotel_col'], entry['price_col']
+        return self.resolve(df, detect, spreadsheet_id)
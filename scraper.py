@@ -0,0 +1,428 @@
+import argparse
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import unquote, urlparse
+
+import pandas as pd
+
+from cities import SCRAPED_DATA_DIR
+from fetch_scheduler import FetchScheduler, TokenBucket
+from instrumentation import count, export_metrics, timed
+from price_normalizer import normalize_prices
+
+# Carpeta donde se guardan los precios capturados: una subcarpeta por ciudad con un
+# Parquet por día que la app lee como hojas extra de la ciudad, junto a las de su origen
+SCRAPER_OUTPUT_DIR = SCRAPED_DATA_DIR
+
+# Navegadores (hilos) simultáneos y páginas por segundo entre todos los dominios
+SCRAPER_WORKERS = int(os.environ.get("HOTEL_PRICES_SCRAPER_WORKERS", "4"))
+MAX_PAGES_PER_SECOND = 4.0
+
+# Segundos máximos para que cargue una página (y aparezca su primer resultado)
+PAGE_TIMEOUT = 30
+
+# Selectores de cada sitio (tarjeta de hotel, nombre y precio dentro de la tarjeta),
+# páginas simultáneas y segundos entre páginas del mismo dominio. Los selectores son
+# simples: "tag", ".clase", "[atributo=valor]" o combinaciones como "div.clase"
+SITES = {
+    'www.booking.com': {
+        'card': '[data-testid=property-card]',
+        'hotel': '[data-testid=title]',
+        'price': '[data-testid=price-and-discounted-price]',
+        'concurrency': 2,
+        'delay': 3.0,
+    },
+    'default': {
+        'card': '.hotel-card',
+        'hotel': '.hotel-name',
+        'price': '.hotel-price',
+        'concurrency': 2,
+        'delay': 2.0,
+    },
+}
+
+# Páginas locales (fixtures): sin límite por dominio
+LOCAL_DOMAIN = 'local'
+
+# Agentes de usuario que se rotan si fake-useragent no está disponible
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
+]
+
+# Columnas de cada día guardado (las que la app detecta como hotel y precio, como en las hojas)
+PRICE_COLUMNS = ['Fecha', 'Hotel', 'Precio', 'Fuente', 'Capturado']
+
+_VOID_TAGS = {'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta', 'source', 'track', 'wbr'}
+
+_SELECTOR = re.compile(
+    r"^(?P<tag>[a-zA-Z][a-zA-Z0-9]*)?(?:\.(?P<cls>[\w-]+))?"
+    r"(?:\[(?P<attr>[\w-]+)(?:=[\"']?(?P<value>[^\"'\]]*)[\"']?)?\])?$"
+)
+
+
+def _matcher(selector):
+    """Función (tag, attrs) -> bool para un selector simple."""
+    match = _SELECTOR.match(selector.strip())
+    if not match or not any(match.groupdict().values()):
+        raise ValueError(f"Selector no soportado: {selector}")
+    tag, cls, attr, value = match.group('tag', 'cls', 'attr', 'value')
+
+    def matches(element, attrs):
+        if tag and element != tag.lower():
+            return False
+        if cls and cls not in (attrs.get('class') or '').split():
+            return False
+        if attr and (attr not in attrs or (value is not None and attrs[attr] != value)):
+            return False
+        return True
+    return matches
+
+
+class _ListingParser(HTMLParser):
+    """Junta el texto del nombre y del precio de cada tarjeta de hotel de una página."""
+
+    def __init__(self, site):
+        super().__init__(convert_charrefs=True)
+        self.is_card = _matcher(site['card'])
+        self.fields = {'hotel': _matcher(site['hotel']), 'precio': _matcher(site['price'])}
+        self.stack = []      # [(tag, campo que empieza en este elemento o 'card')]
+        self.card = None     # {'hotel': [textos], 'precio': [textos]}
+        self.capturing = []  # campos abiertos
+        self.rows = []
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict((name, value or '') for name, value in attrs)
+        role = None
+        if self.card is None and self.is_card(tag, attrs):
+            self.card = {'hotel': None, 'precio': None}
+            role = 'card'
+        elif self.card is not None:
+            for field, matches in self.fields.items():
+                if self.card[field] is None and matches(tag, attrs):
+                    self.card[field] = []
+                    self.capturing.append(field)
+                    role = field
+                    break
+        if tag not in _VOID_TAGS:
+            self.stack.append((tag, role))
+
+    def handle_endtag(self, tag):
+        # HTML tolerante: se cierran también los elementos que quedaron abiertos adentro
+        if not any(open_tag == tag for open_tag, _ in self.stack):
+            return
+        while self.stack:
+            open_tag, role = self.stack.pop()
+            if role == 'card':
+                self._finish_card()
+            elif role in self.fields and role in self.capturing:
+                self.capturing.remove(role)
+            if open_tag == tag:
+                break
+
+    def handle_data(self, data):
+        for field in self.capturing:
+            self.card[field].append(data)
+
+    def _finish_card(self):
+        hotel = ' '.join(' '.join(self.card['hotel'] or []).split())
+        precio = ' '.join(' '.join(self.card['precio'] or []).split())
+        if hotel:
+            self.rows.append({'hotel': hotel, 'precio': precio})
+        self.card = None
+        self.capturing = []
+
+
+@timed('scraper.parse')
+def parse_listing(html, site):
+    """Hoteles de una página de resultados: DataFrame (hotel, precio como texto)."""
+    parser = _ListingParser(site)
+    parser.feed(html)
+    parser.close()
+    return pd.DataFrame(parser.rows, columns=['hotel', 'precio'])
+
+
+def site_config(target):
+    """Configuración del sitio de un destino: la de su 'sitio' o dominio, o la genérica."""
+    site = SITES.get(target.get('sitio') or target['dominio']) or SITES['default']
+    if target['dominio'] == LOCAL_DOMAIN:
+        site = {**site, 'concurrency': None, 'delay': 0}
+    return {**site, **target.get('selectores', {})}
+
+
+class UserAgentRotator:
+    """Un agente de usuario distinto en cada página (fake-useragent si está instalado)."""
+
+    def __init__(self, agents=USER_AGENTS):
+        self.agents = list(agents)
+        self._next = 0
+        self._lock = threading.Lock()
+        try:
+            from fake_useragent import UserAgent
+            self._fake = UserAgent()
+        except Exception:
+            self._fake = None
+
+    def next(self):
+        if self._fake is not None:
+            try:
+                return self._fake.random
+            except Exception:
+                count('excepciones_ignoradas')
+        with self._lock:
+            agent = self.agents[self._next % len(self.agents)]
+            self._next += 1
+        return agent
+
+
+class DomainLimits:
+    """Páginas simultáneas (semáforo) y espera mínima entre páginas de cada dominio."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._domains = {}
+
+    @contextmanager
+    def slot(self, domain, site):
+        with self._lock:
+            if domain not in self._domains:
+                semaphore = threading.BoundedSemaphore(site['concurrency']) if site['concurrency'] else None
+                bucket = TokenBucket(rate=1.0 / site['delay'], capacity=1) if site['delay'] else None
+                self._domains[domain] = (semaphore, bucket)
+            semaphore, bucket = self._domains[domain]
+        if semaphore is not None:
+            semaphore.acquire()
+        try:
+            if bucket is not None:
+                bucket.acquire()
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
+
+
+class FixtureFetcher:
+    """Lee páginas guardadas (file:// o rutas locales) sin navegador, para probar sin red."""
+
+    def fetch(self, url, user_agent, wait_for=None):
+        parsed = urlparse(url)
+        path = unquote(parsed.path) if parsed.scheme == 'file' else url
+        return Path(path).read_text(encoding='utf-8')
+
+    def close(self):
+        pass
+
+
+class SeleniumFetcher:
+    """
+    Chrome sin interfaz, un navegador por hilo del pool (se crea al primer uso y
+    se reutiliza). El agente de usuario se cambia en cada página; con wait_for se
+    espera a que aparezca el primer resultado antes de leer la página.
+    """
+
+    def __init__(self, headless=True, page_timeout=PAGE_TIMEOUT):
+        self.headless = headless
+        self.page_timeout = page_timeout
+        self._local = threading.local()
+        self._drivers = []
+        self._lock = threading.Lock()
+
+    def _driver(self, user_agent):
+        driver = getattr(self._local, 'driver', None)
+        if driver is None:
+            from selenium import webdriver
+
+            options = webdriver.ChromeOptions()
+            if self.headless:
+                options.add_argument('--headless=new')
+            options.add_argument('--no-sandbox')
+            options.add_argument('--disable-dev-shm-usage')
+            options.add_argument(f'--user-agent={user_agent}')
+            driver = webdriver.Chrome(options=options)
+            driver.set_page_load_timeout(self.page_timeout)
+            self._local.driver = driver
+            with self._lock:
+                self._drivers.append(driver)
+        return driver
+
+    def fetch(self, url, user_agent, wait_for=None):
+        from selenium.common.exceptions import TimeoutException
+        from selenium.webdriver.common.by import By
+        from selenium.webdriver.support import expected_conditions
+        from selenium.webdriver.support.ui import WebDriverWait
+
+        driver = self._driver(user_agent)
+        driver.execute_cdp_cmd('Network.setUserAgentOverride', {'userAgent': user_agent})
+        try:
+            driver.get(url)
+            if wait_for:
+                WebDriverWait(driver, self.page_timeout).until(
+                    expected_conditions.presence_of_element_located((By.CSS_SELECTOR, wait_for))
+                )
+        except TimeoutException as e:
+            # TimeoutError se reintenta en el scheduler
+            raise TimeoutError(f"{url}: la página no cargó en {self.page_timeout} s") from e
+        return driver.page_source
+
+    def close(self):
+        with self._lock:
+            drivers, self._drivers = self._drivers, []
+        for driver in drivers:
+            try:
+                driver.quit()
+            except Exception:
+                count('excepciones_ignoradas')
+
+
+def load_targets(path):
+    """
+    Destinos de un JSON: [{"ciudad", "fecha" (AAAA-MM-DD), "url", "sitio"?, "selectores"?}].
+    Las rutas locales se resuelven desde la carpeta del archivo.
+    """
+    path = Path(path)
+    targets = []
+    for target in json.loads(path.read_text(encoding='utf-8')):
+        target = dict(target)
+        url = target['url']
+        if not urlparse(url).scheme:
+            target['url'] = str((path.parent / url).resolve())
+        target['fecha'] = datetime.strptime(target['fecha'], '%Y-%m-%d').date()
+        target['dominio'] = urlparse(target['url']).netloc or LOCAL_DOMAIN
+        targets.append(target)
+    return targets
+
+
+@timed('scraper.scrape')
+def scrape(targets, fetcher, workers=SCRAPER_WORKERS, user_agents=None):
+    """
+    Descarga y lee las páginas en un pool de hilos (un navegador por hilo), con
+    límites por dominio y reintentos de los errores transitorios.
+    Devuelve ({índice del destino: DataFrame (hotel, precio)}, {índice: excepción}).
+    """
+    limits = DomainLimits()
+    agents = user_agents or UserAgentRotator()
+    scheduler = FetchScheduler(
+        max_workers=workers, limiter=TokenBucket(rate=MAX_PAGES_PER_SECOND, capacity=max(1, workers)),
+        max_retries=2, base_delay=2.0
+    )
+
+    def task(target):
+        site = site_config(target)
+
+        def run():
+            with limits.slot(target['dominio'], site):
+                html = fetcher.fetch(target['url'], agents.next(), site['card'])
+            count('scraper.paginas')
+            return parse_listing(html, site)
+        return run
+
+    return scheduler.run({i: task(target) for i, target in enumerate(targets)})
+
+
+def day_title(fecha):
+    """
+    Título (nombre del archivo) de un día capturado: fecha AAAA-MM-DD, que no es ambigua
+    ni cambia cómo se leen las fechas de las demás hojas, y un sufijo para no repetir el
+    título de la hoja del mismo día del spreadsheet.
+    """
+    return f"{fecha:%Y-%m-%d} capturado"
+
+
+def price_rows(target, listing, captured_at):
+    """Filas de un día (mismas columnas para todos los días) con los precios ya convertidos a número."""
+    # Cada página se normaliza por separado: la convención decimal es la de su sitio
+    precios = normalize_prices(listing['precio']) if not listing.empty else pd.Series(dtype='float64')
+    rows = pd.DataFrame({
+        'Fecha': target['fecha'].strftime('%d/%m/%Y'),
+        'Hotel': listing['hotel'],
+        'Precio': precios,
+        'Fuente': target.get('sitio') or target['dominio'],
+        'Capturado': captured_at,
+    }, columns=PRICE_COLUMNS)
+    return rows.dropna(subset=['Precio'])
+
+
+@timed('scraper.write')
+def write_prices(targets, listings, output_dir=None):
+    """
+    Guarda los precios en la carpeta de cada ciudad, un Parquet por día (ver day_title).
+    En un día ya guardado se reemplazan solo las filas de las fuentes capturadas ahora.
+    Devuelve {(ciudad, fecha): filas del día}.
+    """
+    output_dir = Path(output_dir or SCRAPER_OUTPUT_DIR)
+    captured_at = datetime.now().isoformat(timespec='seconds')
+    days = defaultdict(list)
+    for i, listing in listings.items():
+        target = targets[i]
+        days[(target['ciudad'], target['fecha'])].append(price_rows(target, listing, captured_at))
+
+    written = {}
+    for (ciudad, fecha), parts in days.items():
+        rows = pd.concat(parts, ignore_index=True)
+        path = output_dir / ciudad / f"{day_title(fecha)}.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.exists():
+            previous = pd.read_parquet(path)
+            rows = pd.concat([previous[~previous['Fuente'].isin(rows['Fuente'].unique())], rows], ignore_index=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+        os.close(fd)
+        rows.to_parquet(tmp, index=False)
+        os.replace(tmp, path)
+        count('scraper.filas', len(rows))
+        written[(ciudad, fecha)] = len(rows)
+    return written
+
+
+def run(targets, output_dir=None, fetcher=None, workers=SCRAPER_WORKERS):
+    """Captura los destinos y guarda sus precios; devuelve ({(ciudad, fecha): filas}, {índice: excepción})."""
+    fetcher = fetcher or SeleniumFetcher()
+    try:
+        listings, failures = scrape(targets, fetcher, workers)
+    finally:
+        fetcher.close()
+    return write_prices(targets, listings, output_dir), failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Captura precios de hoteles con navegadores sin interfaz y los guarda como "
+                    "hojas extra de cada ciudad (HOTEL_PRICES_SCRAPER_DIR)."
+    )
+    parser.add_argument('--targets', required=True, help="JSON con los destinos (ciudad, fecha, url)")
+    parser.add_argument('--output', default=SCRAPER_OUTPUT_DIR, help="carpeta de los precios por ciudad")
+    parser.add_argument('--workers', type=int, default=SCRAPER_WORKERS, help="navegadores simultáneos")
+    parser.add_argument('--offline', action='store_true', help="leer las páginas como archivos locales, sin navegador")
+    parser.add_argument('--show-browser', action='store_true', help="abrir el navegador con interfaz")
+    args = parser.parse_args(argv)
+
+    targets = load_targets(args.targets)
+    fetcher = FixtureFetcher() if args.offline else SeleniumFetcher(headless=not args.show_browser)
+    written, failures = run(targets, args.output, fetcher, args.workers)
+
+    for (ciudad, fecha), rows in sorted(written.items()):
+        print(f"{ciudad} {day_title(fecha)}: {rows} precios -> {Path(args.output) / ciudad}")
+    for i, error in failures.items():
+        print(f"{targets[i]['ciudad']} {targets[i]['fecha']} {targets[i]['url']}: error ({error})", file=sys.stderr)
+
+    try:
+        export_metrics({'origen': 'scraper', 'generado': datetime.now().isoformat(timespec='seconds')})
+    except OSError as e:
+        count('excepciones_ignoradas')
+        print(f"no se pudieron guardar las métricas ({e})", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,191 @@
+import re
+import unicodedata
+from collections import defaultdict
+
+import numpy as np
+
+# Puntaje mínimo para sugerir un nombre y para incluirlo en una búsqueda
+# (ver HotelSearchIndex.scores; contener la consulta siempre supera ambos)
+SUGGEST_SCORE = 0.45
+MATCH_SCORE = 0.65
+
+# Consultas cortas (hasta TYPO_MAX_LENGTH letras) con un error de tipeo por palabra: en
+# ellas casi todos los trigramas cambian y el puntaje no llega a MATCH_SCORE, así que
+# se comparan las palabras por distancia de edición y las coincidencias valen TYPO_SCORE
+TYPO_MAX_LENGTH = 20
+TYPO_MIN_WORD = 4
+TYPO_SCORE = 0.9
+
+
+# Minúsculas, sin acentos y solo letras/dígitos separados por un espacio
+def normalize_name(text):
+    text = unicodedata.normalize('NFKD', str(text))
+    text = ''.join(ch for ch in text if not unicodedata.combining(ch)).casefold()
+    return re.sub(r'[^0-9a-z]+', ' ', text).strip()
+
+
+def trigrams(text):
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# True si a y b difieren como mucho en una edición (letra cambiada, de más, de menos
+# o dos letras vecinas intercambiadas)
+def within_one_edit(a, b):
+    if a == b:
+        return True
+    if abs(len(a) - len(b)) > 1:
+        return False
+    start = 0
+    while start < min(len(a), len(b)) and a[start] == b[start]:
+        start += 1
+    if len(a) == len(b):
+        return (
+            a[start + 1:] == b[start + 1:]
+            or (a[start + 2:] == b[start + 2:] and a[start:start + 2] == b[start:start + 2][::-1])
+        )
+    shorter, longer = (a, b) if len(a) < len(b) else (b, a)
+    return shorter[start:] == longer[start + 1:]
+
+
+class HotelSearchIndex:
+    """
+    Índice invertido de trigramas sobre nombres de hotel normalizados.
+    Sirve para coincidencias aproximadas (acentos, errores de tipeo) y
+    sugerencias de autocompletado ordenadas por relevancia.
+    """
+
+    def __init__(self, names):
+        self.names = list(dict.fromkeys(str(name) for name in names))
+        self.normalized = [normalize_name(name) for name in self.names]
+
+        postings = defaultdict(list)
+        words = defaultdict(set)
+        prefixes = defaultdict(set)
+        leading = defaultdict(set)
+        sizes = np.zeros(len(self.names), dtype=np.int32)
+        for i, norm in enumerate(self.normalized):
+            grams = trigrams(norm)
+            sizes[i] = len(grams)
+            for gram in grams:
+                postings[gram].append(i)
+            for word in norm.split():
+                words[word].add(i)
+                prefixes[word[:1]].add(i)
+                prefixes[word[:2]].add(i)
+            leading[norm[:1]].add(i)
+            leading[norm[:2]].add(i)
+
+        self.sizes = sizes
+        self.lengths = np.array([len(name) for name in self.names], dtype=np.int32)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+        # Palabra -> nombres que la contienen, y palabras por su primera y segunda letra
+        # (para la tolerancia a errores de tipeo)
+        self.words = {word: np.array(sorted(ids), dtype=np.int32) for word, ids in words.items()}
+        self.words_by_letter = ({}, {})
+        for word in self.words:
+            for position, letters in enumerate(self.words_by_letter):
+                letters.setdefault(word[position:position + 1], []).append(word)
+        # Nombres con alguna palabra (o cuya primera palabra) empieza por 1 o 2 letras dadas
+        self.word_prefixes = {prefix: np.array(sorted(ids), dtype=np.int32) for prefix, ids in prefixes.items()}
+        self.leading_prefixes = {prefix: np.array(sorted(ids), dtype=np.int32) for prefix, ids in leading.items()}
+
+    def __len__(self):
+        return len(self.names)
+
+    def _substring_candidates(self, query):
+        # Un nombre que contiene la consulta contiene todos sus trigramas internos
+        inner = [query[i:i + 3] for i in range(len(query) - 2)]
+        ids = None
+        for gram in inner:
+            found = self.postings.get(gram)
+            if found is None:
+                return []
+            ids = found if ids is None else np.intersect1d(ids, found, assume_unique=True)
+            if len(ids) == 0:
+                return []
+        return ids
+
+    def _typo_candidates(self, query):
+        """
+        Nombres en los que cada palabra de la consulta es el inicio de una palabra del
+        nombre con a lo sumo un error (exacto en palabras de menos de TYPO_MIN_WORD letras).
+        Una letra de más solo se acepta contra la palabra completa: "hotl" no es "hol(iday)".
+        """
+        ids = None
+        for query_word in query.split():
+            n = len(query_word)
+            if n < TYPO_MIN_WORD:
+                close = [word for word in self.words if word.startswith(query_word)]
+            else:
+                # Con un solo error coincide la primera letra, la segunda, o una está
+                # en el lugar de la otra (letra cambiada, de más o de menos al inicio)
+                first, second = self.words_by_letter
+                candidates = set(first.get(query_word[0], [])) | set(first.get(query_word[1], []))
+                candidates |= set(second.get(query_word[0], [])) | set(second.get(query_word[1], []))
+                close = [
+                    word for word in candidates
+                    if within_one_edit(query_word, word[:n + 1] if len(word) > n else word)
+                    or (len(word) > n and within_one_edit(query_word, word[:n]))
+                ]
+            found = np.unique(np.concatenate([self.words[word] for word in close])) if close else []
+            ids = found if ids is None else np.intersect1d(ids, found, assume_unique=True)
+            if len(ids) == 0:
+                return []
+        return ids
+
+    def scores(self, query):
+        """
+        Puntaje de cada nombre: 0.75 * fracción de trigramas de la consulta presentes
+        + 0.25 * coeficiente de Dice, más un bono si el nombre contiene la consulta
+        (mayor si la contiene al inicio de una palabra). En consultas cortas, un nombre
+        que coincide salvo un error de tipeo por palabra vale al menos TYPO_SCORE.
+        """
+        query = normalize_name(query)
+        result = np.zeros(len(self.names), dtype=np.float32)
+        if not query or not self.names:
+            return query, result
+
+        grams = trigrams(query)
+        found = [self.postings[gram] for gram in grams if gram in self.postings]
+        if found:
+            hits = np.bincount(np.concatenate(found), minlength=len(self.names))
+            containment = hits / len(grams)
+            dice = 2.0 * hits / (len(grams) + self.sizes)
+            result = (0.75 * containment + 0.25 * dice).astype(np.float32)
+
+        # Consultas de 1-2 letras: solo cuentan los inicios de palabra
+        if len(query) < 3:
+            result[self.word_prefixes.get(query, [])] += 1.25
+            result[self.leading_prefixes.get(query, [])] += 0.25
+            return query, result
+
+        if len(query) <= TYPO_MAX_LENGTH:
+            typos = self._typo_candidates(query)
+            result[typos] = np.maximum(result[typos], TYPO_SCORE)
+
+        for i in self._substring_candidates(query):
+            norm = self.normalized[i]
+            position = norm.find(query)
+            if position == 0:
+                result[i] += 1.5
+            elif position > 0:
+                result[i] += 1.25 if norm[position - 1] == ' ' else 1.0
+        return query, result
+
+    def search(self, query, limit=10, min_score=SUGGEST_SCORE):
+        """[(nombre, puntaje)] ordenado de mayor a menor relevancia."""
+        _, result = self.scores(query)
+        candidates = np.flatnonzero(result >= min_score)
+        if len(candidates) == 0:
+            return []
+        if limit is not None and len(candidates) > limit:
+            candidates = candidates[np.argpartition(-result[candidates], limit - 1)[:limit]]
+        ordered = candidates[np.lexsort((self.lengths[candidates], -result[candidates]))]
+        return [(self.names[i], float(result[i])) for i in ordered]
+
+    def suggest(self, query, limit=8):
+        return [name for name, _ in self.search(query, limit=limit)]
+
+    def matches(self, query, min_score=MATCH_SCORE):
+        return [name for name, _ in self.search(query, limit=None, min_score=min_score)]
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from instrumentation import count
+from memory_manager import memory_manager, object_bytes
+
+# Entradas máximas de la caché compartida por todas las sesiones
+CACHE_MAX_ENTRIES = int(os.environ.get("HOTEL_PRICES_CACHE_ENTRIES", "512"))
+
+# Vigencia (segundos) de cada tipo de dato en la caché compartida
+CLIENT_TTL = 45 * 60
+SPREADSHEET_TTL = 60 * 60
+WORKSHEETS_TTL = 60
+SHEET_DATA_TTL = 10 * 60
+
+
+class _Flight:
+    """Carga en curso de una clave; las demás peticiones esperan su resultado."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class SharedCache:
+    """
+    Caché en memoria compartida por todas las sesiones del proceso, con vigencia
+    por entrada y expulsión de la menos usada. Las peticiones simultáneas de una
+    misma clave comparten una sola carga (las demás esperan su resultado).
+    Las claves son tuplas cuyo primer elemento es el tipo de dato; los contadores
+    de aciertos/fallos se llevan por tipo. Con memory, cada entrada se registra con
+    sus bytes y el MemoryManager puede liberarla para respetar el presupuesto.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, default_ttl=SHEET_DATA_TTL, memory=None):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.memory = memory
+        self._lock = threading.Lock()
+        self._items = OrderedDict()   # clave -> (vence, valor)
+        self._flights = {}            # clave -> _Flight
+        self.counters = Counter()     # (tipo, 'hits' | 'misses' | 'coalesced' | 'evictions') -> n
+
+    def get(self, key, loader, ttl=None, store=True):
+        """
+        Valor de key; si no está o venció se llama loader() una sola vez aunque
+        lo pidan varias sesiones a la vez. Con store=False solo se agrupan las
+        peticiones simultáneas y el resultado no se guarda.
+        Los errores de loader se propagan a todas las peticiones en espera y no se guardan.
+        """
+        kind = key[0]
+        with self._lock:
+            item = self._items.get(key)
+            hit = item is not None and item[0] > time.monotonic()
+            if hit:
+                self._items.move_to_end(key)
+                self.counters[(kind, 'hits')] += 1
+            else:
+                self._items.pop(key, None)
+                flight = self._flights.get(key)
+                leader = flight is None
+                if leader:
+                    flight = self._flights[key] = _Flight()
+                    self.counters[(kind, 'misses')] += 1
+                else:
+                    self.counters[(kind, 'coalesced')] += 1
+
+        count(f"cache.{kind}.{'hits' if hit else 'misses' if leader else 'coalesced'}")
+        if hit:
+            if self.memory is not None:
+                self.memory.touch(key)
+            return item[1]
+        if item is not None and self.memory is not None:
+            self.memory.forget(key)
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+        except BaseException as e:
+            flight.error = e
+            raise
+        else:
+            if store:
+                self._put(key, flight.value, self.default_ttl if ttl is None else ttl)
+            return flight.value
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def _put(self, key, value, ttl):
+        evicted = []
+        with self._lock:
+            self._items[key] = (time.monotonic() + ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_entries:
+                oldest, _ = self._items.popitem(last=False)
+                self.counters[(oldest[0], 'evictions')] += 1
+                evicted.append(oldest)
+
+        if self.memory is not None:
+            for oldest in evicted:
+                self.memory.forget(oldest)
+            self.memory.track(key, object_bytes(value), lambda: self._release(key))
+
+    # Liberada por el MemoryManager para respetar el presupuesto de memoria
+    def _release(self, key):
+        with self._lock:
+            if self._items.pop(key, None) is not None:
+                self.counters[(key[0], 'evictions')] += 1
+
+    def invalidate(self, predicate=None):
+        """Elimina las claves que cumplen predicate(clave) (todas si no se indica)."""
+        with self._lock:
+            removed = [key for key in self._items if predicate is None or predicate(key)]
+            for key in removed:
+                del self._items[key]
+        if self.memory is not None:
+            for key in removed:
+                self.memory.forget(key)
+
+    def stats(self):
+        """{tipo: {'hits', 'misses', 'coalesced', 'evictions'}} y el total de entradas."""
+        with self._lock:
+            kinds = {}
+            for (kind, name), count in self.counters.items():
+                kinds.setdefault(kind, Counter())[name] = count
+            return {'entries': len(self._items), 'kinds': kinds}
+
+
+# Caché compartida por todo el proceso (todas las sesiones de Streamlit)
+shared_cache = SharedCache(memory=memory_manager)
@@ -0,0 +1,141 @@
+import bisect
+import re
+from datetime import date, timedelta
+
+from cities import ANALYSIS_DAYS
+
+# Fechas en el título de la hoja: YYYY-MM-DD, DD-MM-YYYY y DD-MM-YY (separador - o /)
+_YMD = re.compile(r'(?<!\d)(\d{4})[-/](\d{1,2})[-/](\d{1,2})(?!\d)')
+_DMY = re.compile(r'(?<!\d)(\d{1,2})[-/](\d{1,2})[-/](\d{4}|\d{2})(?!\d)')
+
+
+def _safe_date(year, month, day):
+    try:
+        return date(year, month, day)
+    except ValueError:
+        return None
+
+
+def _date_parts(title):
+    """
+    ('ymd', año, mes, día) o ('dmy', primero, segundo, año) según el patrón
+    encontrado en el título; None si no hay fecha.
+    """
+    match = _YMD.search(title)
+    if match:
+        year, month, day = (int(g) for g in match.groups())
+        return 'ymd', year, month, day
+    match = _DMY.search(title)
+    if match:
+        first, second, year = match.groups()
+        year = int(year) + 2000 if len(year) == 2 else int(year)
+        return 'dmy', int(first), int(second), year
+    return None
+
+
+def _resolve(parts, dayfirst=True):
+    if parts is None:
+        return None
+    kind, a, b, c = parts
+    if kind == 'ymd':
+        return _safe_date(a, b, c)
+    # a/b/año: si uno de los dos no puede ser mes, no hay ambigüedad
+    if a > 12:
+        return _safe_date(c, b, a)
+    if b > 12:
+        return _safe_date(c, a, b)
+    return _safe_date(c, b, a) if dayfirst else _safe_date(c, a, b)
+
+
+def parse_sheet_date(title, dayfirst=True):
+    """Fecha contenida en el título de una hoja (None si no tiene)."""
+    return _resolve(_date_parts(str(title)), dayfirst)
+
+
+class WorksheetCatalog:
+    """
+    Hojas de un spreadsheet ordenadas por la fecha real de su título.
+    Los títulos ambiguos (p. ej. 03-04-2024) se interpretan con la convención
+    que muestran los títulos no ambiguos del mismo spreadsheet (día primero
+    si no hay evidencia). Las consultas devuelven [(entrada, fecha)] de la
+    más reciente a la más antigua.
+    """
+
+    def __init__(self, entries, dayfirst=None):
+        entries = list(entries)
+        parts = [_date_parts(str(entry['title'])) for entry in entries]
+
+        if dayfirst is None:
+            day_votes = sum(1 for p in parts if p and p[0] == 'dmy' and p[1] > 12)
+            month_votes = sum(1 for p in parts if p and p[0] == 'dmy' and p[2] > 12)
+            dayfirst = day_votes >= month_votes
+        self.dayfirst = dayfirst
+
+        dated = []
+        self.undated = []
+        self.dates_by_title = {}
+        for position, (entry, part) in enumerate(zip(entries, parts)):
+            sheet_date = _resolve(part, dayfirst)
+            if sheet_date is None:
+                self.undated.append(entry)
+            else:
+                dated.append((sheet_date, position, entry))
+                self.dates_by_title[entry['title']] = sheet_date
+
+        dated.sort(key=lambda item: (item[0], item[1]))
+        self._dates = [item[0] for item in dated]
+        self._entries = [item[2] for item in dated]
+        self.entries = entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def date_of(self, title):
+        return self.dates_by_title.get(title)
+
+    @property
+    def latest_date(self):
+        return self._dates[-1] if self._dates else None
+
+    def latest(self):
+        """Entrada de la hoja más reciente (la última del spreadsheet si no hay fechas)."""
+        if self._entries:
+            return self._entries[-1]
+        return self.entries[-1] if self.entries else None
+
+    def _slice(self, lo, hi):
+        return [(self._entries[i], self._dates[i]) for i in range(hi - 1, lo - 1, -1)]
+
+    def between(self, start=None, end=None):
+        """Hojas con fecha entre start y end (inclusive)."""
+        lo = 0 if start is None else bisect.bisect_left(self._dates, start)
+        hi = len(self._dates) if end is None else bisect.bisect_right(self._dates, end)
+        return self._slice(lo, hi)
+
+    def recent(self, n):
+        """Las n hojas más recientes; si faltan hojas con fecha se completa con las que no tienen."""
+        result = self._slice(max(0, len(self._dates) - n), len(self._dates))
+        for entry in reversed(self.undated):
+            if len(result) >= n:
+                break
+            result.append((entry, None))
+        return result
+
+    def last_days(self, days, today=None):
+        """
+        Hojas de los últimos `days` días contados hasta `today` (por defecto, la
+        fecha de la hoja más reciente). Sin hojas con fecha: las `days` últimas hojas.
+        """
+        reference = today or self.latest_date
+        if reference is None:
+            return self.recent(days)
+        return self.between(reference - timedelta(days=days - 1), reference)
+
+    def window(self, days=None, start=None, end=None):
+        """
+        Ventana de análisis: rango desde/hasta si se indica, si no los últimos `days`
+        días (ANALYSIS_DAYS si tampoco se indica).
+        """
+        if start is not None or end is not None:
+            return self.between(start, end)
+        return self.last_days(days or ANALYSIS_DAYS)
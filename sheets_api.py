@@ -0,0 +1,210 @@
+import json
+
+import gspread
+import pandas as pd
+from google.oauth2 import service_account
+
+from fetch_scheduler import default_scheduler
+from instrumentation import count, current_run, stage
+
+# Máximo de rangos por petición values_batch_get (los bloques se piden en paralelo)
+BATCH_CHUNK_SIZE = 10
+HEADER_CHUNK_SIZE = 100
+COLUMN_CHUNK_SIZE = 20
+
+# Permisos que pide la cuenta de servicio
+SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+# Las llamadas a la API de Google Sheets se cuentan por tipo en las métricas de la ejecución
+def count_api_call(kind, n=1):
+    count(f"api.{kind}", n)
+
+
+def api_calls():
+    """Llamadas a la API de la ejecución actual, por tipo de llamada."""
+    counters = current_run().snapshot()['counters']
+    return {name[len('api.'):]: n for name, n in counters.items() if name.startswith('api.')}
+
+
+# Cliente de gspread autenticado con los datos de la cuenta de servicio
+def authorize(creds_info):
+    creds = service_account.Credentials.from_service_account_info(creds_info, scopes=SCOPES)
+    return gspread.authorize(creds)
+
+
+# Propiedades de todas las hojas (id, título, tamaño) en una sola llamada de metadatos
+def fetch_sheet_properties(spreadsheet):
+    count_api_call('fetch_sheet_metadata')
+    with stage('api.fetch_sheet_metadata'):
+        metadata = default_scheduler.call(spreadsheet.fetch_sheet_metadata)
+
+    sheets = []
+    for sheet in metadata.get('sheets', []):
+        props = sheet.get('properties', {})
+        grid = props.get('gridProperties', {})
+        sheets.append({
+            'sheet_id': props.get('sheetId'),
+            'title': props.get('title', ''),
+            'row_count': grid.get('rowCount', 0),
+            'col_count': grid.get('columnCount', 0),
+        })
+    return sheets
+
+
+# Nombre de hoja como rango A1 ('Hoja''s' -> comillas escapadas)
+def quote_sheet_title(title):
+    return "'" + str(title).replace("'", "''") + "'"
+
+
+# Misma conversión que gspread aplica en get_all_records
+def _numericise(value):
+    if value == "" or not isinstance(value, str):
+        return value
+    if "_" in value:
+        return value
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+# Letra(s) de columna A1 para un índice (0 -> A, 26 -> AA)
+def column_letter(index):
+    letters = ""
+    index += 1
+    while index:
+        index, rem = divmod(index - 1, 26)
+        letters = chr(ord('A') + rem) + letters
+    return letters
+
+
+# Convierte la matriz de valores (primera fila = encabezados) en DataFrame
+def values_to_dataframe(values):
+    if not values or len(values) < 2:
+        return pd.DataFrame()
+
+    header = [str(h) for h in values[0]]
+    width = len(header)
+    rows = []
+    for row in values[1:]:
+        row = list(row[:width])
+        if len(row) < width:
+            row.extend([""] * (width - len(row)))
+        rows.append([_numericise(v) for v in row])
+    count('filas_parseadas', len(rows))
+
+    df = pd.DataFrame(rows, columns=header)
+    # Igual que get_all_records: si hay encabezados repetidos gana el último
+    if df.columns.duplicated().any():
+        df = df.loc[:, ~df.columns.duplicated(keep='last')]
+    return df
+
+
+def _chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# Pide una lista de rangos A1 en bloques de chunk_size, repartidos en el scheduler
+def _batch_get_ranges(spreadsheet, ranges, chunk_size, scheduler=None):
+    """
+    Devuelve ({posición_rango: valores}, {posición_rango: excepción}).
+    """
+    scheduler = scheduler or default_scheduler
+    chunks = list(_chunks(list(range(len(ranges))), max(1, chunk_size)))
+
+    def fetch_chunk(chunk):
+        def task():
+            count_api_call('values_batch_get')
+            with stage('api.values_batch_get'):
+                response = spreadsheet.values_batch_get([ranges[pos] for pos in chunk])
+            # Tamaño aproximado de la respuesta (el JSON de los valores)
+            count('bytes_api', len(json.dumps(response, ensure_ascii=False)))
+            return response
+        return task
+
+    responses, errors = scheduler.run({i: fetch_chunk(chunk) for i, chunk in enumerate(chunks)})
+
+    values = {}
+    failures = {}
+    for i, chunk in enumerate(chunks):
+        if i in errors:
+            failures.update({pos: errors[i] for pos in chunk})
+            continue
+        value_ranges = responses[i].get('valueRanges', [])
+        for pos, value_range in zip(chunk, value_ranges):
+            values[pos] = value_range.get('values', [])
+    return values, failures
+
+
+# Descarga varias hojas completas (por título) con llamadas values_batch_get en paralelo
+def fetch_titles_batch(spreadsheet, titles, chunk_size=BATCH_CHUNK_SIZE, scheduler=None):
+    """
+    Devuelve ({titulo_hoja: DataFrame}, {titulo_hoja: excepción}).
+    Las hojas se piden en bloques de chunk_size rangos por llamada; los bloques
+    se reparten en el scheduler (límite de tasa y reintentos ante 429/5xx).
+    """
+    titles = list(titles)
+    values, errors = _batch_get_ranges(
+        spreadsheet, [quote_sheet_title(title) for title in titles], chunk_size, scheduler
+    )
+    frames = {titles[pos]: values_to_dataframe(rows) for pos, rows in values.items()}
+    failures = {titles[pos]: error for pos, error in errors.items()}
+    return frames, failures
+
+
+# Solo la fila de encabezados de cada hoja (llamada barata para conocer el esquema)
+def fetch_headers_batch(spreadsheet, titles, chunk_size=HEADER_CHUNK_SIZE, scheduler=None):
+    """Devuelve ({titulo_hoja: [encabezados]}, {titulo_hoja: excepción})."""
+    titles = list(titles)
+    values, errors = _batch_get_ranges(
+        spreadsheet, [f"{quote_sheet_title(title)}!1:1" for title in titles], chunk_size, scheduler
+    )
+    headers = {titles[pos]: [str(h) for h in rows[0]] if rows else [] for pos, rows in values.items()}
+    failures = {titles[pos]: error for pos, error in errors.items()}
+    return headers, failures
+
+
+# Descarga solo algunas columnas de cada hoja (rangos A1 por columna, sin encabezado)
+def fetch_columns_batch(spreadsheet, projections, chunk_size=COLUMN_CHUNK_SIZE, scheduler=None):
+    """
+    projections: {titulo_hoja: [(nombre_columna, índice_columna)]}
+    Devuelve ({titulo_hoja: DataFrame con esas columnas}, {titulo_hoja: excepción}).
+    """
+    targets = []
+    ranges = []
+    for title, columns in projections.items():
+        for name, index in columns:
+            letter = column_letter(index)
+            targets.append((title, name))
+            ranges.append(f"{quote_sheet_title(title)}!{letter}2:{letter}")
+
+    values, errors = _batch_get_ranges(spreadsheet, ranges, chunk_size, scheduler)
+
+    failures = {}
+    for pos, error in errors.items():
+        failures[targets[pos][0]] = error
+
+    columns_by_title = {}
+    for pos, rows in values.items():
+        title, name = targets[pos]
+        if title not in failures:
+            columns_by_title.setdefault(title, {})[name] = [row[0] if row else "" for row in rows]
+
+    frames = {}
+    for title, columns in columns_by_title.items():
+        length = max((len(col) for col in columns.values()), default=0)
+        data = {
+            name: [_numericise(v) for v in col] + [""] * (length - len(col))
+            for name, col in columns.items()
+        }
+        frames[title] = pd.DataFrame(data) if length else pd.DataFrame()
+    return frames, failures
@@ -0,0 +1,355 @@
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import pandas as pd
+
+from instrumentation import count, timed
+from ranking import sheet_prices, sheet_summary
+
+# Directorio de caché local (se puede cambiar con HOTEL_PRICES_CACHE_DIR)
+DEFAULT_CACHE_DIR = os.environ.get("HOTEL_PRICES_CACHE_DIR", ".cache")
+
+# Segundos que las hojas "volátiles" (p. ej. la del día actual) se consideran
+# vigentes antes de volver a descargarlas
+VOLATILE_MAX_AGE = 600
+
+
+# Convierte columnas object con tipos mezclados a texto para poder guardarlas en Parquet
+def _to_storable(df):
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == 'object':
+            kind = pd.api.types.infer_dtype(df[col], skipna=True)
+            if kind not in ('string', 'integer', 'floating', 'boolean', 'empty'):
+                df[col] = df[col].astype(str)
+    return df
+
+
+# Escribe en un temporal único de la misma carpeta y lo renombra: escritores
+# concurrentes del mismo archivo no comparten el temporal
+def atomic_write(path, write):
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + '.', suffix='.tmp')
+    os.close(fd)
+    try:
+        write(tmp)
+        os.replace(tmp, path)
+    except BaseException:
+        Path(tmp).unlink(missing_ok=True)
+        raise
+
+
+def _override_key(override):
+    return list(override) if override else None
+
+
+def _atomic_write_bytes(path, data):
+    atomic_write(path, lambda tmp: Path(tmp).write_bytes(data))
+
+
+# Un lock por manifest, compartido por todas las instancias del proceso
+_manifest_locks = {}
+_manifest_locks_guard = threading.Lock()
+
+
+def _manifest_lock(path):
+    with _manifest_locks_guard:
+        return _manifest_locks.setdefault(str(Path(path).resolve()), threading.Lock())
+
+
+class SnapshotStore:
+    """
+    Copia local en Parquet de las hojas de cada spreadsheet (o de otro origen
+    de datos de data_sources). Clave: spreadsheet_id + sheet_id. El manifest
+    guarda título, tamaño (o versión) de la hoja y las columnas detectadas (hotel / precio).
+    """
+
+    def __init__(self, cache_dir=None):
+        self.root = Path(cache_dir or DEFAULT_CACHE_DIR) / "snapshots"
+
+    def _spreadsheet_dir(self, spreadsheet_id):
+        path = self.root / spreadsheet_id
+        path.mkdir(parents=True, exist_ok=True)
+        return path
+
+    def _manifest_path(self, spreadsheet_id):
+        return self._spreadsheet_dir(spreadsheet_id) / "manifest.json"
+
+    def load_manifest(self, spreadsheet_id):
+        path = self._manifest_path(spreadsheet_id)
+        if not path.exists():
+            return {}
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _save_manifest(self, spreadsheet_id, manifest):
+        data = json.dumps(manifest, ensure_ascii=False, indent=1).encode("utf-8")
+        _atomic_write_bytes(self._manifest_path(spreadsheet_id), data)
+
+    def _update_manifest(self, spreadsheet_id, update):
+        """
+        Relee el manifest, lo modifica con update(manifest) (True si cambió) y lo guarda,
+        todo con el lock del spreadsheet para no perder entradas de otros hilos.
+        Devuelve el manifest resultante.
+        """
+        with _manifest_lock(self._manifest_path(spreadsheet_id)):
+            manifest = self.load_manifest(spreadsheet_id)
+            if update(manifest):
+                self._save_manifest(spreadsheet_id, manifest)
+            return manifest
+
+    # Una hoja se vuelve a descargar si es nueva, cambió su título/tamaño/versión,
+    # falta su archivo, es volátil y su copia es más vieja que max_age o se guardó
+    # solo con las columnas de otra selección manual
+    def _needs_refresh(self, spreadsheet_id, props, entry, volatile, max_age, now, override=None):
+        if entry is None:
+            return True
+        if (entry.get('title'), entry.get('row_count'), entry.get('col_count'), entry.get('version')) != \
+                (props['title'], props['row_count'], props['col_count'], props.get('version')):
+            return True
+        if entry.get('file') and not (self._spreadsheet_dir(spreadsheet_id) / entry['file']).exists():
+            return True
+        if volatile and now - entry.get('synced_at', 0) > max_age:
+            return True
+        if entry.get('projected') and entry.get('override') != _override_key(override):
+            return True
+        return False
+
+    # override: selección manual de columnas vigente al sincronizar (las columnas
+    # de la entrada y su resumen solo valen mientras no cambie)
+    def _write_sheet(self, spreadsheet_id, props, df, detect, now, columns=None, override=None):
+        hotel_col, price_col = columns or (None, None)
+        if columns is None and detect is not None and df is not None and not df.empty:
+            hotel_col, price_col = detect(df)
+
+        file_name = None
+        if df is not None and not df.empty:
+            file_name = f"{props['sheet_id']}.parquet"
+            storable = _to_storable(df)
+            atomic_write(self._spreadsheet_dir(spreadsheet_id) / file_name,
+                          lambda tmp: storable.to_parquet(tmp, index=False))
+
+        entry = {
+            **props,
+            'file': file_name,
+            'rows': 0 if df is None else len(df),
+            'hotel_col': hotel_col,
+            'price_col': price_col,
+            'synced_at': now,
+            'projected': columns is not None,
+            'override': _override_key(override),
+        }
+
+        # Resumen por hotel guardado junto a la hoja
+        if file_name and hotel_col and price_col:
+            summary = sheet_summary(sheet_prices(df, hotel_col, price_col, props['title']))
+            self._write_summary(spreadsheet_id, entry, summary, (hotel_col, price_col), override)
+        return entry
+
+    def _write_summary(self, spreadsheet_id, entry, summary, columns, override=None):
+        file_name = f"{entry['sheet_id']}.summary.parquet"
+        atomic_write(self._spreadsheet_dir(spreadsheet_id) / file_name,
+                      lambda tmp: summary.to_parquet(tmp, index=False))
+        entry.update({
+            'summary': file_name,
+            'summary_columns': list(columns),
+            'summary_override': list(override) if override else None,
+        })
+
+    def load_summary(self, spreadsheet_id, entry):
+        if not entry or not entry.get('summary'):
+            return None
+        try:
+            return pd.read_parquet(self._spreadsheet_dir(spreadsheet_id) / entry['summary'])
+        except (OSError, ValueError):
+            return None
+
+    def save_summary(self, spreadsheet_id, entry, summary, columns, override=None):
+        """
+        Guarda (o reemplaza) el resumen por hotel de una hoja y lo anota en el manifest,
+        salvo que la hoja se haya vuelto a sincronizar mientras tanto (el resumen sería viejo).
+        """
+        def update(manifest):
+            current = manifest.get(str(entry['sheet_id']))
+            if current is None or (current.get('file'), current.get('synced_at')) != \
+                    (entry.get('file'), entry.get('synced_at')):
+                return False
+            self._write_summary(spreadsheet_id, entry, summary, columns, override)
+            current.update({key: entry[key] for key in ('summary', 'summary_columns', 'summary_override')})
+            return True
+
+        self._update_manifest(spreadsheet_id, update)
+        return summary
+
+    def summary_for(self, spreadsheet_id, entry, columns, override=None):
+        """
+        Resumen por hotel de una hoja: el guardado si se armó con la misma selección
+        manual de columnas o, si no, calculado desde la copia local y guardado.
+        columns(df) -> (hotel_col, price_col) de la hoja.
+        """
+        if entry.get('summary_override') == (list(override) if override else None):
+            summary = self.load_summary(spreadsheet_id, entry)
+            if summary is not None:
+                return summary
+
+        df = self.load(spreadsheet_id, entry)
+        if df is None or df.empty:
+            return sheet_summary(pd.DataFrame(columns=['hotel', 'precio', 'hoja']))
+        hotel_col, price_col = columns(df)
+        if not (hotel_col and price_col):
+            return sheet_summary(pd.DataFrame(columns=['hotel', 'precio', 'hoja']))
+        summary = sheet_summary(sheet_prices(df, hotel_col, price_col, entry['title']))
+        return self.save_summary(spreadsheet_id, entry, summary, (hotel_col, price_col), override)
+
+    # Descarga las hojas indicadas. Con known_layout se pide primero solo el encabezado
+    # y, si el esquema es conocido, únicamente las columnas de hotel y precio
+    def _fetch(self, source, titles, known_layout):
+        if known_layout is None:
+            frames, failures = source.read_sheets(titles)
+            return frames, failures, {}
+
+        headers, failures = source.read_headers(titles)
+        projections = {}
+        layouts = {}
+        full = []
+        for title in titles:
+            if title in failures:
+                continue
+            header = headers.get(title, [])
+            layout = known_layout(header) if header else None
+            if layout and layout[0] in header and layout[1] in header:
+                # Si hay encabezados repetidos gana el último (como get_all_records)
+                positions = {name: i for i, name in enumerate(header)}
+                projections[title] = [(name, positions[name]) for name in dict.fromkeys(layout)]
+                layouts[title] = tuple(layout)
+            else:
+                full.append(title)
+
+        frames, column_failures = source.read_columns(projections) if projections else ({}, {})
+        full_frames, full_failures = source.read_sheets(full) if full else ({}, {})
+        frames.update(full_frames)
+        failures.update(column_failures)
+        failures.update(full_failures)
+        return frames, failures, layouts
+
+    @staticmethod
+    def _placeholder(props):
+        return {**props, 'file': None, 'rows': 0, 'hotel_col': None, 'price_col': None, 'synced_at': 0}
+
+    # Entrada guardada con las propiedades actuales de la hoja encima (título, tamaño
+    # y versión): una hoja renombrada se ve y se pide con su título nuevo
+    def _current(self, entry, props):
+        return {**entry, **props} if entry else self._placeholder(props)
+
+    def entries(self, spreadsheet_id, sheets):
+        """
+        Entradas del manifest para las hojas dadas (propiedades de DataSource.list_sheets),
+        sin descargar nada; las hojas sin copia local llevan 'file': None.
+        """
+        manifest = self.load_manifest(spreadsheet_id)
+        return [self._current(manifest.get(str(props['sheet_id'])), props) for props in sheets]
+
+    @timed('snapshot.sync')
+    def sync(self, source, detect=None, sheets=None, titles=None, volatile_titles=(),
+             max_age=VOLATILE_MAX_AGE, known_layout=None, override=None):
+        """
+        Sincroniza la copia local con el origen de datos (data_sources): la lista
+        de hojas (se omite si se pasan las propiedades en sheets) más la descarga en
+        bloque de las hojas nuevas o modificadas. Con titles solo se descargan esas hojas.
+        known_layout(encabezado) -> (hotel_col, price_col) o None permite
+        descargar solo esas columnas de las hojas con esquema conocido.
+        Las hojas de volatile_titles se refrescan si su copia tiene más de max_age segundos.
+        override: selección manual de columnas vigente; las hojas guardadas solo con
+        las columnas de otra selección se vuelven a descargar.
+        Devuelve (entradas en el orden del spreadsheet, {titulo: error} de las
+        hojas que no se pudieron descargar; de esas se conserva la copia previa).
+        """
+        spreadsheet_id = source.id
+        now = time.time()
+        if sheets is None:
+            sheets = source.list_sheets()
+        manifest = self.load_manifest(spreadsheet_id)
+        wanted = None if titles is None else set(titles)
+        volatile_titles = set(volatile_titles)
+
+        stale = [
+            props for props in sheets
+            if (wanted is None or props['title'] in wanted)
+            and self._needs_refresh(spreadsheet_id, props, manifest.get(str(props['sheet_id'])),
+                                    props['title'] in volatile_titles, max_age, now, override)
+        ]
+
+        failures = {}
+        synced = {}
+        if stale:
+            frames, failures, layouts = self._fetch(source, [props['title'] for props in stale], known_layout)
+            for props in stale:
+                if props['title'] in failures:
+                    continue
+                df = frames.get(props['title'])
+                synced[str(props['sheet_id'])] = self._write_sheet(
+                    spreadsheet_id, props, df, detect, now, layouts.get(props['title']), override
+                )
+
+        # Se mezcla con el manifest actual (otro hilo pudo guardar otras hojas mientras
+        # se descargaba) y se eliminan del manifest (y del disco) las hojas que ya no existen
+        current_ids = {str(props['sheet_id']) for props in sheets}
+
+        def update(manifest):
+            manifest.update(synced)
+            removed = [key for key in manifest if key not in current_ids]
+            for sheet_id in removed:
+                entry = manifest.pop(sheet_id)
+                for key in ('file', 'summary'):
+                    if entry.get(key):
+                        (self._spreadsheet_dir(spreadsheet_id) / entry[key]).unlink(missing_ok=True)
+            return bool(synced or removed)
+
+        manifest = self._update_manifest(spreadsheet_id, update)
+
+        # Hojas nuevas que fallaron o no se pidieron: entrada sin archivo (no se guarda en el manifest)
+        entries = [self._current(manifest.get(str(props['sheet_id'])), props) for props in sheets]
+        return entries, failures
+
+    @timed('snapshot.fetch_full')
+    def fetch_full(self, source, entry, detect=None, override=None):
+        """
+        Descarga completa de una hoja guardada solo con algunas columnas
+        (p. ej. para mostrarla entera). Devuelve (DataFrame, entrada actualizada).
+        """
+        spreadsheet_id = source.id
+        frames, failures = source.read_sheets([entry['title']])
+        if entry['title'] in failures:
+            raise failures[entry['title']]
+
+        props = {key: entry[key] for key in ('sheet_id', 'title', 'row_count', 'col_count', 'version') if key in entry}
+        df = frames.get(entry['title'])
+        new_entry = self._write_sheet(spreadsheet_id, props, df, detect, time.time(), override=override)
+
+        def update(manifest):
+            manifest[str(entry['sheet_id'])] = new_entry
+            return True
+
+        self._update_manifest(spreadsheet_id, update)
+        return df, new_entry
+
+    @timed('snapshot.load')
+    def load(self, spreadsheet_id, entry):
+        if not entry or not entry.get('file'):
+            return pd.DataFrame()
+        path = self._spreadsheet_dir(spreadsheet_id) / entry['file']
+        try:
+            df = pd.read_parquet(path)
+        except (OSError, ValueError):
+            count('excepciones_ignoradas')
+            return None
+        count('filas_leidas_copia', len(df))
+        return df
+
+    def load_many(self, spreadsheet_id, entries):
+        return {entry['title']: self.load(spreadsheet_id, entry) for entry in entries}
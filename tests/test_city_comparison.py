@@ -0,0 +1,33 @@
+import pytest
+
+from city_comparison import hotel_chain
+
+
+@pytest.mark.parametrize("name, chain", [
+    ("Hilton Garden Inn Mérida", "Hilton Garden Inn"),
+    ("Hilton Mérida", "Hilton"),
+    ("Courtyard by Marriott Tuxtla", "Courtyard"),
+    ("JW Marriott Mérida", "Marriott"),
+    ("Hotel Fiesta Inn Mérida", "Fiesta Inn"),
+    ("Holiday Inn Express & Suites", "Holiday Inn Express"),
+    ("One Mérida Centro", "One"),
+    ("Hotel One Tuxtla", "One"),
+    ("NH Collection Mérida", "NH"),
+    ("Hotel Misión Mérida Panamericana", "Misión"),
+    ("Gamma Mérida El Castellano", "Gamma"),
+])
+def test_chain_of_known_brands(name, chain):
+    assert hotel_chain(name) == chain
+
+
+@pytest.mark.parametrize("name", [
+    "Hotel Number One",
+    "Casa One Love",
+    "Posada NH Centro",
+    "Hostal del Camino Real",
+    "Villa Gamma Radiación",
+    "Antigua Misión de San Cristóbal",
+    "Hotel Caribe",
+])
+def test_generic_words_are_not_chains(name):
+    assert hotel_chain(name) is None
@@ -0,0 +1,45 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from city_reports import CityReport, sheet_versions
+from ranking import aggregate_hotel_prices
+
+ENTRIES = [
+    {'title': "06-04-2024", 'sheet_id': 2, 'row_count': 50, 'col_count': 4, 'version': "b"},
+    {'title': "05-04-2024", 'sheet_id': 1, 'row_count': 50, 'col_count': 4, 'version': "a"},
+]
+
+
+def make_report(generated_at=None, **manifest):
+    prices = pd.DataFrame({'hotel': ["Caribe", "Hilton"], 'precio': [900.0, 2100.0], 'hoja': "06-04-2024"})
+    series = pd.DataFrame({
+        'hotel': ["Caribe", "Hilton"], 'fecha_hoja': pd.to_datetime(["2024-04-06"] * 2), 'precio': [900.0, 2100.0]
+    })
+    manifest = {
+        'titles': [entry['title'] for entry in ENTRIES], 'sheets': sheet_versions(ENTRIES),
+        'override': None, 'failed': {}, 'volatile': False, 'hotels': 2,
+        'generated_at': time.time() if generated_at is None else generated_at, **manifest,
+    }
+    return CityReport(manifest, aggregate_hotel_prices([prices]), series)
+
+
+def test_concurrent_writes_to_the_same_directory(tmp_path):
+    reports = [make_report(hotels=i) for i in range(8)]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda report: report.write(tmp_path), reports))
+
+    assert not [path for path in tmp_path.iterdir() if path.suffix == '.tmp']
+    read = CityReport.read(tmp_path)
+    assert read.manifest['hotels'] in range(8)
+    assert read.ranking['hotel'].tolist() == ["Caribe", "Hilton"]
+
+
+def test_is_fresh():
+    assert make_report().is_fresh(ENTRIES)
+    assert not make_report(generated_at=0).is_fresh(ENTRIES)
+    assert not make_report(failed={"05-04-2024": "error"}).is_fresh(ENTRIES)
+    assert not make_report().is_fresh(ENTRIES[:1])
+    assert not make_report().is_fresh([ENTRIES[0], {**ENTRIES[1], 'version': "c"}])
+    assert not make_report().is_fresh(ENTRIES, override=("Nombre", "Precio"))
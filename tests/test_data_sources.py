@@ -0,0 +1,61 @@
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from data_sources import DataSource, LocalDirectorySource, SQLiteSource
+
+PROJECTION = {"05-04-2024": [("Hotel", 0), ("Precio", 2), ("No existe", 5)]}
+
+
+def test_subclass_without_reads_cannot_be_instantiated():
+    class Incomplete(DataSource):
+        def describe(self):
+            return "incompleto"
+
+    with pytest.raises(TypeError):
+        Incomplete("x")
+
+
+@pytest.fixture
+def sqlite_source(tmp_path):
+    path = tmp_path / "ciudad.sqlite"
+    with sqlite3.connect(path) as conn:
+        conn.execute('CREATE TABLE "05-04-2024" (Hotel TEXT, Zona TEXT, Precio REAL)')
+        conn.executemany('INSERT INTO "05-04-2024" VALUES (?, ?, ?)', [("Caribe", "Centro", 900.0), ("Hilton", "Norte", 2100.0)])
+    conn.close()
+    return SQLiteSource(path, "ciudad")
+
+
+@pytest.fixture(params=['.sqlite', '.csv', '.parquet'])
+def source(tmp_path, request):
+    if request.param == '.sqlite':
+        return request.getfixturevalue('sqlite_source')
+    df = pd.DataFrame({'Hotel': ["Caribe", "Hilton"], 'Zona': ["Centro", "Norte"], 'Precio': [900.0, 2100.0]})
+    path = tmp_path / f"05-04-2024{request.param}"
+    df.to_csv(path, index=False) if request.param == '.csv' else df.to_parquet(path, index=False)
+    return LocalDirectorySource(tmp_path, "ciudad")
+
+
+def test_read_columns_skips_missing_columns(source):
+    frames, failures = source.read_columns(PROJECTION)
+    assert not failures
+    assert list(frames["05-04-2024"].columns) == ["Hotel", "Precio"]
+    assert frames["05-04-2024"]['Hotel'].tolist() == ["Caribe", "Hilton"]
+
+
+def test_sqlite_projection_without_existing_columns_keeps_rows(sqlite_source):
+    frames, failures = sqlite_source.read_columns({"05-04-2024": [("No existe", 0)]})
+    assert not failures
+    assert len(frames["05-04-2024"]) == 2
+
+
+def test_sqlite_missing_table_is_reported(sqlite_source):
+    frames, failures = sqlite_source.read_columns({"06-04-2024": [("Hotel", 0)]})
+    assert frames == {}
+    assert isinstance(failures["06-04-2024"], sqlite3.OperationalError)
+
+
+def test_sqlite_lists_tables_as_sheets(sqlite_source):
+    sheets = sqlite_source.list_sheets()
+    assert [(s['title'], s['row_count'], s['col_count']) for s in sheets] == [("05-04-2024", 3, 3)]
@@ -0,0 +1,63 @@
+import socket
+
+import pytest
+import requests
+
+from fetch_scheduler import FetchScheduler, TokenBucket, is_retryable
+
+
+class HTTPError(Exception):
+    def __init__(self, status):
+        super().__init__(status)
+        self.response = type('Response', (), {'status_code': status})()
+
+
+@pytest.mark.parametrize("exc", [
+    HTTPError(429), HTTPError(503), ConnectionResetError(), TimeoutError(), socket.gaierror(),
+    requests.exceptions.ConnectionError(), requests.exceptions.ReadTimeout(),
+])
+def test_transient_errors_are_retried(exc):
+    assert is_retryable(exc)
+
+
+@pytest.mark.parametrize("exc", [
+    HTTPError(400), HTTPError(403), HTTPError(404), FileNotFoundError(), PermissionError(),
+    IsADirectoryError(), OSError(), ValueError(),
+])
+def test_permanent_errors_are_not_retried(exc):
+    assert not is_retryable(exc)
+
+
+def scheduler():
+    return FetchScheduler(max_workers=2, limiter=TokenBucket(rate=1000, capacity=1000), max_retries=3, base_delay=0)
+
+
+def failing(errors):
+    calls = []
+
+    def fn():
+        calls.append(1)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return "ok"
+    return fn, calls
+
+
+def test_call_retries_transient_errors():
+    fn, calls = failing([HTTPError(429), TimeoutError()])
+    assert scheduler().call(fn) == "ok"
+    assert len(calls) == 3
+
+
+def test_call_fails_fast_on_missing_file():
+    fn, calls = failing([FileNotFoundError("fixtures/no-existe.html")])
+    with pytest.raises(FileNotFoundError):
+        scheduler().call(fn)
+    assert len(calls) == 1
+
+
+def test_run_reports_failures():
+    missing, _ = failing([PermissionError()])
+    results, failures = scheduler().run({'a': lambda: 1, 'b': missing})
+    assert results == {'a': 1}
+    assert isinstance(failures['b'], PermissionError)
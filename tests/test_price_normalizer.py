@@ -0,0 +1,63 @@
+import math
+
+import pandas as pd
+import pytest
+
+from price_normalizer import detect_decimal_separator, normalize_prices
+
+
+def parse(values, decimal='auto'):
+    return normalize_prices(pd.Series(values, dtype=object), decimal).tolist()
+
+
+def same(values, expected):
+    assert len(values) == len(expected)
+    for value, want in zip(values, expected):
+        assert (math.isnan(value) and math.isnan(want)) or value == pytest.approx(want)
+
+
+def test_currency_symbols_and_thousands():
+    same(parse(["$1,850", "MXN 1,120", "1,234.50 pesos", "US$ 99.90"]), [1850.0, 1120.0, 1234.5, 99.9])
+
+
+def test_comma_decimal_column():
+    same(parse(["1.234,50", "980,00", "2.100,75"]), [1234.5, 980.0, 2100.75])
+
+
+def test_ranges_take_the_middle():
+    same(parse(["1,200 - 1,500", "1200 a 1500", "$900~$1,100"]), [1350.0, 1350.0, 1000.0])
+
+
+@pytest.mark.parametrize("cell", ["2024-04-05", "05/04/2024", "5-4-24"])
+def test_dates_are_not_prices(cell):
+    same(parse([cell, "1,200.50"]), [math.nan, 1200.5])
+
+
+@pytest.mark.parametrize("cell", ["5-1200", "1500 - 1200"])
+def test_implausible_ranges_are_rejected(cell):
+    same(parse([cell]), [math.nan])
+
+
+@pytest.mark.parametrize("cell", ["-500", "$-500", "- 500", "−1,200.00"])
+def test_negative_prices_are_nan(cell):
+    same(parse([cell]), [math.nan])
+
+
+def test_negative_numbers_are_nan():
+    same(normalize_prices(pd.Series([1200.0, -5.0])).tolist(), [1200.0, math.nan])
+    same(parse([850, -20, "300"]), [850.0, math.nan, 300.0])
+
+
+def test_cell_with_both_separators_uses_its_own_convention():
+    # La mayoría de la columna usa punto decimal; "1.234,50" no pasa a 1.2345
+    same(parse(["1,234.50", "1,000.25", "2,000.75", "1.234,50"]), [1234.5, 1000.25, 2000.75, 1234.5])
+
+
+def test_empty_and_text_cells():
+    same(parse([None, "", "sin precio", "N/D"]), [math.nan] * 4)
+
+
+def test_detect_decimal_separator():
+    assert detect_decimal_separator(["1.234,50", "99,5"]) == ','
+    assert detect_decimal_separator(["1,234.50", "99.5"]) == '.'
+    assert detect_decimal_separator(["1,200", "1.500"]) is None
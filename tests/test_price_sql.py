@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+import pytest
+
+from price_sql import PriceSQLEngine
+
+RUNAWAY = "WITH RECURSIVE n(i) AS (SELECT 1 UNION ALL SELECT i + 1 FROM n) SELECT COUNT(*) FROM n"
+
+
+def rows(hotels, fechas, precio=1000.0):
+    return pd.DataFrame([
+        {'hotel': hotel, 'precio': precio + k, 'hoja': fecha, 'fecha_hoja': pd.Timestamp(fecha)}
+        for k, (hotel, fecha) in enumerate((h, f) for h in hotels for f in fechas)
+    ])
+
+
+@pytest.fixture
+def engine():
+    engine = PriceSQLEngine(timeout=0.3)
+    engine.load_city("Mérida", rows(["Caribe", "Hilton"], ["2024-04-05", "2024-04-06"]))
+    engine.load_city("Tuxtla", rows(["Marriott"], ["2024-04-06"], precio=2000.0))
+    return engine
+
+
+def test_query_reads_loaded_rows(engine):
+    assert engine.cities() == ["Mérida", "Tuxtla"]
+    assert engine.hotels(["Mérida"]) == ["Caribe", "Hilton"]
+    result = engine.query("SELECT ciudad, COUNT(*) AS n FROM precios GROUP BY ciudad ORDER BY ciudad")
+    assert result.to_dict('list') == {'ciudad': ["Mérida", "Tuxtla"], 'n': [4, 1]}
+
+
+def test_query_limits_rows(engine):
+    assert len(engine.query("SELECT * FROM precios", max_rows=2)) == 2
+
+
+def test_load_city_replaces_its_rows(engine):
+    engine.load_city("Mérida", rows(["Fiesta Inn"], ["2024-04-07"]))
+    assert engine.hotels(["Mérida"]) == ["Fiesta Inn"]
+    assert engine.hotels(["Tuxtla"]) == ["Marriott"]
+
+
+@pytest.mark.parametrize("sql", [
+    "DELETE FROM precios",
+    "INSERT INTO precios VALUES ('X', NULL, 'h', 'hotel', 1)",
+    "UPDATE precios SET precio = 0",
+    "DROP TABLE precios",
+    "CREATE TABLE otra (x)",
+    "ATTACH DATABASE ':memory:' AS otra",
+    "PRAGMA journal_mode=DELETE",
+])
+def test_writes_are_rejected(engine, sql):
+    with pytest.raises(sqlite3.DatabaseError):
+        engine.query(sql)
+    assert len(engine.query("SELECT * FROM precios")) == 5
+
+
+def test_runaway_query_is_interrupted(engine):
+    start = time.monotonic()
+    with pytest.raises(sqlite3.OperationalError, match="límite"):
+        engine.query(RUNAWAY)
+    assert time.monotonic() - start < 5
+    # La conexión de lectura vuelve a servir para otras consultas
+    assert len(engine.query("SELECT * FROM precios")) == 5
+
+
+def test_runaway_query_does_not_block_writes_or_reads():
+    engine = PriceSQLEngine(timeout=2.0)
+    engine.load_city("Tuxtla", rows(["Marriott"], ["2024-04-06"]))
+    errors = []
+
+    def runaway():
+        try:
+            engine.query(RUNAWAY)
+        except sqlite3.OperationalError as e:
+            errors.append(e)
+
+    thread = threading.Thread(target=runaway)
+    thread.start()
+    time.sleep(0.1)
+    start = time.monotonic()
+    engine.load_city("Tuxtla", rows(["Camino Real"], ["2024-04-07"]))
+    assert engine.hotels(["Tuxtla"]) == ["Camino Real"]
+    assert thread.is_alive()
+    assert time.monotonic() - start < 1.0
+    thread.join()
+    assert len(errors) == 1
+
+
+def test_weekday_averages(engine):
+    result = engine.weekday_averages(["Mérida"])
+    assert result['dia_semana'].tolist() == ["Viernes", "Sábado"]
+    assert result['precios'].tolist() == [2, 2]
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from ranking import SlidingWindowAggregate, aggregate_hotel_prices, sheet_prices, sheet_summary, top_hotels
+
+HOTELS = [f"Hotel {i}" for i in range(12)]
+
+
+def random_sheets(n, seed=0):
+    """{hoja: filas de sheet_prices} con hoteles que entran y salen entre hojas."""
+    rng = np.random.default_rng(seed)
+    sheets = {}
+    for k in range(n):
+        hotels = rng.choice(HOTELS, size=rng.integers(1, 20))
+        sheets[f"h{k:02d}"] = pd.DataFrame({
+            'hotel': hotels,
+            'precio': rng.integers(500, 4000, size=len(hotels)).astype('float64'),
+            'hoja': f"h{k:02d}",
+        })
+    return sheets
+
+
+def naive_ranking(frames):
+    """Ranking calculado de cero con un groupby sobre todas las filas (más reciente primero)."""
+    rows = pd.concat(frames, ignore_index=True)
+    grouped = rows.groupby('hotel', sort=False)
+    return pd.DataFrame({
+        'precio_promedio': grouped['precio'].mean(),
+        'precio_min': grouped['precio'].min(),
+        'precio_max': grouped['precio'].max(),
+        'muestras': grouped['precio'].size(),
+        'hojas': grouped['hoja'].nunique(),
+        'ultima_hoja': grouped['hoja'].first(),
+        'precio_std': grouped['precio'].std(ddof=0),
+    })
+
+
+def assert_same_ranking(ranking, expected):
+    ranking = ranking.set_index('hotel').sort_index()
+    expected = expected.sort_index()
+    assert list(ranking.index) == list(expected.index)
+    for column in ['precio_promedio', 'precio_min', 'precio_max', 'precio_std']:
+        np.testing.assert_allclose(ranking[column].astype(float), expected[column].astype(float), atol=1e-6)
+    for column in ['muestras', 'hojas']:
+        assert list(ranking[column]) == list(expected[column])
+    assert list(ranking['ultima_hoja']) == list(expected['ultima_hoja'])
+
+
+def test_sliding_window_matches_naive_groupby():
+    sheets = random_sheets(40)
+    titles = sorted(sheets, reverse=True)
+    summaries = {title: sheet_summary(frame) for title, frame in sheets.items()}
+    aggregate = SlidingWindowAggregate()
+
+    # La ventana de 10 hojas se desliza de la más antigua a la más reciente
+    for end in range(10, len(titles) + 1):
+        window = titles[len(titles) - end:len(titles) - end + 10]
+        aggregate.update([(title, 1) for title in window], summaries.get)
+        assert_same_ranking(aggregate.ranking(), naive_ranking([sheets[title] for title in window]))
+
+
+def test_only_new_or_changed_sheets_are_loaded():
+    sheets = random_sheets(5)
+    loaded = []
+
+    def load(title):
+        loaded.append(title)
+        return sheet_summary(sheets[title])
+
+    aggregate = SlidingWindowAggregate()
+    aggregate.update([("h04", 1), ("h03", 1), ("h02", 1)], load)
+    aggregate.update([("h04", 1), ("h03", 1), ("h02", 1)], load)
+    assert loaded == ["h04", "h03", "h02"]
+
+    # h03 cambia de versión: se resta el resumen anterior y se suma el nuevo
+    sheets["h03"] = sheets["h03"].assign(precio=sheets["h03"]['precio'] * 2)
+    aggregate.update([("h04", 1), ("h03", 2), ("h02", 1)], load)
+    assert loaded == ["h04", "h03", "h02", "h03"]
+    assert_same_ranking(aggregate.ranking(), naive_ranking([sheets[t] for t in ["h04", "h03", "h02"]]))
+
+
+def test_failed_summary_is_retried():
+    sheets = random_sheets(3)
+    failing = {"h01"}
+
+    def load(title):
+        return None if title in failing else sheet_summary(sheets[title])
+
+    aggregate = SlidingWindowAggregate()
+    window = [("h02", 1), ("h01", 1), ("h00", 1)]
+    aggregate.update(window, load)
+    assert_same_ranking(aggregate.ranking(), naive_ranking([sheets["h02"], sheets["h00"]]))
+
+    failing.clear()
+    aggregate.update(window, load)
+    assert_same_ranking(aggregate.ranking(), naive_ranking([sheets[t] for t, _ in window]))
+
+
+def test_aggregate_hotel_prices_matches_naive_groupby():
+    sheets = random_sheets(8, seed=3)
+    frames = [sheets[title] for title in sorted(sheets, reverse=True)]
+    assert_same_ranking(aggregate_hotel_prices(frames), naive_ranking(frames))
+
+
+def test_empty_window():
+    ranking = SlidingWindowAggregate().ranking()
+    assert ranking.empty
+    assert 'precio_promedio' in ranking.columns
+
+
+def test_sheet_prices_drops_rows_without_hotel_or_price():
+    df = pd.DataFrame({'Hotel': ["Caribe", "", "nan", "Hilton", "Fiesta"], 'Precio': ["$1,200", "900", "800", "N/D", "0"]})
+    prices = sheet_prices(df, 'Hotel', 'Precio', "h00")
+    assert prices.to_dict('list') == {'hotel': ["Caribe"], 'precio': [1200.0], 'hoja': ["h00"]}
+
+
+def test_top_hotels():
+    ranking = aggregate_hotel_prices([pd.DataFrame({'hotel': ["A", "B", "C"], 'precio': [300.0, 100.0, 200.0], 'hoja': "h"})])
+    assert [row['hotel'] for row in top_hotels(ranking, "min", 2)] == ["B", "C"]
+    assert [row['hotel'] for row in top_hotels(ranking, "max", 2)] == ["A", "C"]
+    assert top_hotels(ranking, "min", 2)[0]['precio_promedio'] == pytest.approx(100.0)
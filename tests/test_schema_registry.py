@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from schema_registry import SchemaRegistry
+
+
+def test_concurrent_saves_from_separate_registries(tmp_path):
+    path = tmp_path / "schemas.json"
+    # Una instancia por escritor, como la app, city_reports y la comparación en procesos distintos
+    registries = [SchemaRegistry(path) for _ in range(8)]
+
+    def save(i):
+        for k in range(20):
+            registries[i].set_override(f"sheet{i}", "Hotel", f"Precio {k}")
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(save, range(8)))
+
+    # Sin temporales sueltos y con un archivo completo (el del último escritor)
+    assert list(tmp_path.iterdir()) == [path]
+    assert SchemaRegistry(path).overrides
+
+
+def test_override_round_trip(tmp_path):
+    path = tmp_path / "schemas.json"
+    SchemaRegistry(path).set_override("abc", "Nombre", "Precio")
+    assert SchemaRegistry(path).override_for("abc") == ("Nombre", "Precio")
+    SchemaRegistry(path).clear_override("abc")
+    assert SchemaRegistry(path).override_for("abc") is None
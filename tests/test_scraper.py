@@ -0,0 +1,61 @@
+from datetime import date
+from pathlib import Path
+
+import pandas as pd
+
+from data_sources import CombinedSource, LocalDirectorySource
+from scraper import SITES, FixtureFetcher, day_title, load_targets, parse_listing, scrape, write_prices
+
+FIXTURES = Path(__file__).resolve().parent.parent / "fixtures" / "scraper"
+
+
+def test_parse_listing_booking():
+    html = (FIXTURES / "booking-merida-2024-04-05.html").read_text(encoding="utf-8")
+    listing = parse_listing(html, SITES['www.booking.com'])
+    assert list(listing['hotel']) == [
+        "Fiesta Inn Mérida", "Hyatt Regency Mérida", "Hotel Casa Lecanda", "City Express by Marriott Mérida"
+    ]
+    assert listing['precio'].iloc[0] == "MXN 1,850"
+
+
+def test_write_prices_from_fixtures(tmp_path):
+    targets = load_targets(FIXTURES / "targets.json")
+    listings, failures = scrape(targets, FixtureFetcher(), workers=2)
+    assert not failures
+
+    written = write_prices(targets, listings, tmp_path)
+    assert set(written) == {("Mérida", date(2024, 4, 5)), ("Mérida", date(2024, 4, 6))}
+
+    rows = pd.read_parquet(tmp_path / "Mérida" / f"{day_title(date(2024, 4, 5))}.parquet")
+    precios = dict(zip(rows['Hotel'], rows['Precio']))
+    # Sin precio (Casa Lecanda) no se guarda; cada sitio con su convención decimal
+    assert precios == {
+        "Fiesta Inn Mérida": 1850.0,
+        "Hyatt Regency Mérida": 3420.0,
+        "City Express by Marriott Mérida": 1120.0,
+        "Holiday Inn Mérida": 2150.0,
+        "Hotel Caribe": 890.5,
+    }
+    assert set(rows['Fecha']) == {"05/04/2024"}
+
+
+def test_scraped_days_join_city_sheets(tmp_path):
+    primary = tmp_path / "sheets"
+    primary.mkdir()
+    pd.DataFrame({'Hotel': ["Hotel Caribe"], 'Precio': [900.0]}).to_parquet(primary / "04-04-2024.parquet")
+
+    targets = load_targets(FIXTURES / "targets.json")
+    listings, _ = scrape(targets, FixtureFetcher(), workers=2)
+    write_prices(targets, listings, tmp_path / "capturados")
+
+    source = CombinedSource(
+        LocalDirectorySource(primary, "merida"), [LocalDirectorySource(tmp_path / "capturados" / "Mérida", "merida")]
+    )
+    titles = [props['title'] for props in source.list_sheets()]
+    assert titles[0] == "04-04-2024"
+    assert set(titles[1:]) == {day_title(date(2024, 4, 5)), day_title(date(2024, 4, 6))}
+
+    frames, failures = source.read_sheets(["04-04-2024", day_title(date(2024, 4, 5))])
+    assert not failures
+    assert list(frames["04-04-2024"]['Hotel']) == ["Hotel Caribe"]
+    assert "Fiesta Inn Mérida" in set(frames[day_title(date(2024, 4, 5))]['Hotel'])
@@ -0,0 +1,69 @@
+import pytest
+
+from search_index import HotelSearchIndex, normalize_name, within_one_edit
+
+NAMES = [
+    "Hotel Fiesta Inn Mérida", "Hotel Caribe", "Hilton Mérida", "Holiday Inn Express",
+    "Posada Real", "Hostal Ñandú", "City Express Mérida", "Hyatt Regency",
+]
+
+
+@pytest.fixture(scope="module")
+def index():
+    return HotelSearchIndex(NAMES)
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("hotl", {"Hotel Fiesta Inn Mérida", "Hotel Caribe"}),
+    ("hiltn", {"Hilton Mérida"}),
+    ("hilotn", {"Hilton Mérida"}),
+    ("posda", {"Posada Real"}),
+    ("hyat regncy", {"Hyatt Regency"}),
+])
+def test_matches_with_one_typo(index, query, expected):
+    assert set(index.matches(query)) == expected
+
+
+@pytest.mark.parametrize("query", ["merida", "MÉRIDA", "Mérida"])
+def test_matches_ignore_accents_and_case(index, query):
+    assert set(index.matches(query)) == {
+        "Hotel Fiesta Inn Mérida", "Hilton Mérida", "City Express Mérida"
+    }
+
+
+def test_matches_accented_name_without_accents(index):
+    assert index.matches("nandu") == ["Hostal Ñandú"]
+
+
+@pytest.mark.parametrize("query, expected", [
+    ("hil", ["Hilton Mérida"]),
+    ("fiest", ["Hotel Fiesta Inn Mérida"]),
+    ("holid", ["Holiday Inn Express"]),
+])
+def test_matches_prefixes(index, query, expected):
+    assert index.matches(query) == expected
+
+
+def test_typo_does_not_match_shorter_prefix(index):
+    # "hotl" sin la t sería el inicio de "holiday": no cuenta como error de tipeo
+    assert "Holiday Inn Express" not in index.matches("hotl")
+
+
+def test_unrelated_query_matches_nothing(index):
+    assert index.matches("xyz") == []
+
+
+def test_suggest_prefers_exact_prefix(index):
+    assert index.suggest("hotel")[:2] == ["Hotel Caribe", "Hotel Fiesta Inn Mérida"]
+
+
+def test_within_one_edit():
+    assert within_one_edit("hotl", "hote")
+    assert within_one_edit("hiltn", "hilton")
+    assert within_one_edit("hilotn", "hilton")
+    assert not within_one_edit("abc", "cab")
+    assert not within_one_edit("hotel", "hostal")
+
+
+def test_normalize_name():
+    assert normalize_name("  Hostal Ñandú - Mérida ") == "hostal nandu merida"
@@ -0,0 +1,88 @@
+from datetime import date
+
+import pytest
+
+from cities import ANALYSIS_DAYS
+from sheet_catalog import WorksheetCatalog, parse_sheet_date
+
+
+def daily_catalog(days, start=date(2024, 3, 1)):
+    return WorksheetCatalog(
+        {'title': date.fromordinal(start.toordinal() + k).strftime('%d-%m-%Y')} for k in range(days)
+    )
+
+
+def titles(result):
+    return [entry['title'] for entry, _ in result]
+
+
+@pytest.mark.parametrize("title, expected", [
+    ("2024-04-05", date(2024, 4, 5)),
+    ("2024-04-05 capturado", date(2024, 4, 5)),
+    ("25-03-2024", date(2024, 3, 25)),
+    ("Precios 25/03/24", date(2024, 3, 25)),
+    ("03-25-2024", date(2024, 3, 25)),
+    ("31-02-2024", None),
+    ("Resumen", None),
+])
+def test_parse_sheet_date(title, expected):
+    assert parse_sheet_date(title) == expected
+
+
+def test_ambiguous_titles_follow_the_spreadsheet_convention():
+    month_first = WorksheetCatalog([{'title': "03-25-2024"}, {'title': "04-03-2024"}])
+    assert not month_first.dayfirst
+    assert month_first.date_of("04-03-2024") == date(2024, 4, 3)
+
+    day_first = WorksheetCatalog([{'title': "25-03-2024"}, {'title': "04-03-2024"}])
+    assert day_first.dayfirst
+    assert day_first.date_of("04-03-2024") == date(2024, 3, 4)
+
+
+def test_sheets_are_ordered_by_date_not_position():
+    catalog = WorksheetCatalog([{'title': "02-03-2024"}, {'title': "10-03-2024"}, {'title': "05-03-2024"}])
+    assert titles(catalog.recent(3)) == ["10-03-2024", "05-03-2024", "02-03-2024"]
+
+
+def test_latest():
+    catalog = WorksheetCatalog([{'title': "10-03-2024"}, {'title': "Resumen"}, {'title': "02-03-2024"}])
+    assert catalog.latest()['title'] == "10-03-2024"
+    assert catalog.latest_date == date(2024, 3, 10)
+    assert WorksheetCatalog([{'title': "A"}, {'title': "B"}]).latest()['title'] == "B"
+    assert WorksheetCatalog([]).latest() is None
+
+
+def test_undated_sheets_fill_recent_only():
+    catalog = WorksheetCatalog([{'title': "Resumen"}, {'title': "02-03-2024"}])
+    assert catalog.undated == [{'title': "Resumen"}]
+    assert titles(catalog.recent(2)) == ["02-03-2024", "Resumen"]
+    assert titles(catalog.last_days(30)) == ["02-03-2024"]
+
+
+def test_last_days_counts_from_the_newest_sheet():
+    catalog = daily_catalog(60)
+    result = catalog.last_days(7)
+    assert [fecha for _, fecha in result] == [date(2024, 4, 29 - k) for k in range(7)]
+
+
+def test_last_days_without_dates_takes_the_last_sheets():
+    catalog = WorksheetCatalog([{'title': t} for t in "ABCD"])
+    assert titles(catalog.last_days(2)) == ["D", "C"]
+
+
+def test_window_with_range():
+    catalog = daily_catalog(60)
+    assert titles(catalog.window(start=date(2024, 3, 3), end=date(2024, 3, 5))) == [
+        "05-03-2024", "04-03-2024", "03-03-2024"
+    ]
+    assert len(catalog.window(start=date(2024, 4, 25))) == 5
+    assert len(catalog.window(end=date(2024, 3, 2))) == 2
+    assert catalog.window(days=10) == catalog.last_days(10)
+
+
+def test_window_without_bounds_uses_default_days():
+    catalog = daily_catalog(60)
+    expected = catalog.last_days(ANALYSIS_DAYS)
+    assert len(expected) == ANALYSIS_DAYS
+    assert catalog.window(start=None, end=None) == expected
+    assert catalog.window() == expected